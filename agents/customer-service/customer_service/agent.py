@@ -31,27 +31,32 @@ from .tools.tools import (
     # approve_discount, # Commented out in tools.py
     # sync_ask_for_approval, # Commented out in tools.py
     # update_salesforce_crm, # Commented out in tools.py
-    access_cart_information,
-    modify_cart,
-    get_product_recommendations,
-    check_product_availability,
+    get_customer_profile,
     schedule_planting_service,
     get_available_planting_times,
     send_care_instructions,
     generate_qr_code,
-    search_products, # Added import for the new tool
     set_website_theme, # Added import for the new theme tool
-    initiate_checkout_ui, # Added for checkout UI
+    cached_recommendation_card,
     initiate_shipping_ui, # Added for shipping UI
     initiate_payment_ui, # Added for payment UI
     agent_processes_shipping_choice, # Added for processing shipping choices
-    submit_order_and_clear_cart, # Added for final order submission
     # display_checkout_item_selection_ui, # REMOVED
     # display_shipping_options_ui, # REMOVED
     # display_pickup_locations_ui, # REMOVED
     # display_payment_methods_ui, # REMOVED
     # display_order_confirmation_ui, # REMOVED
 )
+# Tools that call the storefront backend are awaited on the event loop instead of blocking it.
+from .tools.async_tools import (
+    access_cart_information,
+    modify_cart,
+    get_product_recommendations,
+    check_product_availability,
+    search_products,
+    submit_order_and_clear_cart,
+    initiate_checkout_ui,
+)
 
 warnings.filterwarnings("ignore", category=UserWarning, module=".*pydantic.*")
 
@@ -71,13 +76,19 @@ def _prepare_product_recommendation_payload(products: list[dict], original_query
     """
     product_list_for_payload = []
     for product in products:
+        # The model's copy of get_product_recommendations has no image or page
+        # links (see response_shaping.py); the cards get them from the product cache.
+        card = product
+        if product.get("id") and not (product.get("image_url") and product.get("product_url")):
+            card = {**(cached_recommendation_card(product["id"]) or {"product_url": f"/products/{product['id']}"}),
+                    **{key: value for key, value in product.items() if value}}
         # Ensure 'formatted_price' from get_product_recommendations is used for 'price' key
         product_list_for_payload.append({
-            "id": product.get("id"),
-            "name": product.get("name"),
-            "price": product.get("formatted_price"), # Price pre-formatted by get_product_recommendations tool
-            "image_url": product.get("image_url"),
-            "product_url": product.get("product_url")
+            "id": card.get("id"),
+            "name": card.get("name"),
+            "price": card.get("formatted_price"), # Price pre-formatted by get_product_recommendations tool
+            "image_url": card.get("image_url"),
+            "product_url": card.get("product_url")
         })
 
     return {
@@ -96,9 +107,9 @@ def format_product_recommendations_for_display(
     Formats a list of product details and an original search query into a structured
     JSON payload for displaying product recommendation cards on the frontend.
     The 'product_details_list' argument should be the list of product dictionaries
-    (each containing id, name, formatted_price, image_url, product_url)
-    which is typically the 'recommendations' field from the output of the
-    'get_product_recommendations' tool.
+    (each containing id, name and formatted_price; missing image_url and
+    product_url are filled in from the product cache) which is typically the
+    'recommendations' field from the output of the 'get_product_recommendations' tool.
     The 'original_search_query' is the user's original search query string that
     led to these recommendations.
     """
@@ -144,6 +155,7 @@ root_agent = Agent(
         modify_cart,
         get_product_recommendations,
         check_product_availability,
+        get_customer_profile,
         schedule_planting_service,
         get_available_planting_times,
         send_care_instructions,
@@ -49,3 +49,65 @@ class Config(BaseSettings):
     # The GEMINI_API_KEY is used by our new, separate image identification endpoint.
     GEMINI_API_KEY: str | None = Field(default="")
     BACKEND_API_BASE_URL: str = Field(default="http://127.0.0.1:5000/api")
+    # Serve the storefront API and pages from the streaming server's own uvicorn
+    # process (storefront_asgi.py) instead of the separate Flask app. Point
+    # BACKEND_API_BASE_URL at the streaming server (e.g. http://127.0.0.1:8001/api) when enabled.
+    SERVE_STOREFRONT_API: bool = Field(default=False)
+    # Shared keep-alive HTTP client used by the tools (tools/http_client.py).
+    BACKEND_HTTP_POOL_SIZE: int = Field(default=10)
+    BACKEND_HTTP_MAX_RETRIES: int = Field(default=2) # Failed connects; for GETs also 502/503/504, with backoff
+    BACKEND_HTTP_RETRY_BACKOFF_SECS: float = Field(default=0.2)
+    BACKEND_HTTP_CONNECT_TIMEOUT_SECS: float = Field(default=3.05)
+    BACKEND_HTTP_READ_TIMEOUT_SECS: float = Field(default=5.0)
+    BACKEND_HTTP_SLOW_READ_TIMEOUT_SECS: float = Field(default=10.0) # Search and checkout
+    # get_product_recommendations: ids per /products/batch request, requests in flight at once,
+    # and the overall deadline after which unresolved ids are reported in the errors.
+    RECOMMENDATION_BATCH_SIZE: int = Field(default=10)
+    RECOMMENDATION_CONCURRENCY: int = Field(default=4)
+    RECOMMENDATION_DEADLINE_SECS: float = Field(default=3.0)
+    # Product detail cache shared by the tools (tools/product_cache.py). Entries are
+    # fresh for PRODUCT_CACHE_TTL_SECS, then served stale while refreshing in the
+    # background for up to PRODUCT_CACHE_STALE_SECS more.
+    PRODUCT_CACHE_MAX_ENTRIES: int = Field(default=512)
+    PRODUCT_CACHE_TTL_SECS: float = Field(default=300.0)
+    PRODUCT_CACHE_STALE_SECS: float = Field(default=3600.0)
+    # How the tools reach the storefront API: "http" (BACKEND_API_BASE_URL over the
+    # network) or "inprocess", which calls the storefront service functions directly
+    # when the agent runs on the same host as the backend (tools/inprocess_transport.py).
+    BACKEND_TRANSPORT: str = Field(default="http")
+    # Tool responses sent back to the model are cut down to the fields declared in
+    # shared_libraries/response_shaping.py, with strings capped at this many
+    # characters; the UI still receives the full responses.
+    TOOL_RESPONSE_SHAPING_ENABLED: bool = Field(default=True)
+    TOOL_RESPONSE_MAX_TEXT_CHARS: int = Field(default=160)
+    # Model calls per session and model (shared_libraries/rate_limiter.py): a token
+    # bucket refilled at RATE_LIMIT_RPM requests per minute, or at the model's entry
+    # in RATE_LIMIT_MODEL_RPM (JSON, e.g. {"gemini-2.0-flash": 30}), holding up to
+    # RATE_LIMIT_BURST requests. The client is told it is being throttled when a
+    # call has to wait at least RATE_LIMIT_NOTIFY_AFTER_SECS.
+    RATE_LIMIT_RPM: int = Field(default=10)
+    RATE_LIMIT_BURST: int = Field(default=10)
+    RATE_LIMIT_MODEL_RPM: dict[str, int] = Field(default_factory=dict)
+    RATE_LIMIT_NOTIFY_AFTER_SECS: float = Field(default=1.0)
+    # Process-wide budget for model calls shared by all sessions (shared_libraries/admission.py),
+    # in requests and estimated tokens per minute (0 turns a limit off). A call's
+    # token cost is its request text plus MODEL_ADMISSION_OUTPUT_TOKENS for the reply.
+    MODEL_ADMISSION_RPM: int = Field(default=60)
+    MODEL_ADMISSION_TPM: int = Field(default=1_000_000)
+    MODEL_ADMISSION_OUTPUT_TOKENS: int = Field(default=256)
+    # A session keeps checkout priority for at most this long after initiate_checkout_ui,
+    # so an abandoned checkout drops back to browsing.
+    MODEL_ADMISSION_CHECKOUT_TTL_SECS: float = Field(default=600.0)
+    # Diagnostic traces of model requests and tool calls (shared_libraries/tracing.py):
+    # off by default, TRACE_SAMPLE_RATE of the calls kept in a ring buffer of the
+    # last TRACE_BUFFER_SIZE traces (GET /debug/traces on the streaming server).
+    TRACE_ENABLED: bool = Field(default=False)
+    TRACE_SAMPLE_RATE: float = Field(default=1.0)
+    TRACE_BUFFER_SIZE: int = Field(default=200)
+    # Customer profiles (entities/customer_repository.py), stored in the storefront's
+    # SQLite database (the repository root's ecommerce.db when empty). Up to
+    # CUSTOMER_CACHE_MAX_ENTRIES hydrated profiles are cached; the streaming server
+    # preloads CUSTOMER_PRELOAD_IDS at startup.
+    CUSTOMER_DB_PATH: str = Field(default="")
+    CUSTOMER_CACHE_MAX_ENTRIES: int = Field(default=10000)
+    CUSTOMER_PRELOAD_IDS: list[str] = Field(default_factory=lambda: ["123"])
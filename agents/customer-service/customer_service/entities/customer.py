@@ -13,9 +13,16 @@
 # limitations under the License.
 """Customer entity module."""
 
+import logging
+import sqlite3
 from typing import List, Dict, Optional
 from pydantic import BaseModel, Field, ConfigDict
 
+logger = logging.getLogger(__name__)
+
+# Purchases listed in Customer.llm_view(), most recent last.
+LLM_VIEW_RECENT_PURCHASES = 3
+
 
 class Address(BaseModel):
     """
@@ -106,19 +113,65 @@ class Customer(BaseModel):
         """
         return self.model_dump_json(indent=4)
 
+    def to_compact_json(self) -> str:
+        """
+        Converts the Customer object to the JSON kept in the session state:
+        no indentation, and fields left at their defaults are omitted.
+
+        Returns:
+            A compact JSON string that parses back into the same Customer.
+        """
+        return self.model_dump_json(exclude_defaults=True)
+
+    def llm_view(self) -> dict:
+        """
+        The part of the profile the agent's instructions include: name, tenure,
+        loyalty points, preferred store, garden profile and the items of the most
+        recent purchases. The full record is available from get_customer_profile.
+
+        Returns:
+            A dictionary with the trimmed profile.
+        """
+        return {
+            "customer_id": self.customer_id,
+            "first_name": self.customer_first_name,
+            "last_name": self.customer_last_name,
+            "years_as_customer": self.years_as_customer,
+            "loyalty_points": self.loyalty_points,
+            "preferred_store": self.preferred_store,
+            "garden_profile": self.garden_profile.model_dump(),
+            "recent_purchases": [
+                {"date": purchase.date, "items": [item.name for item in purchase.items]}
+                for purchase in self.purchase_history[-LLM_VIEW_RECENT_PURCHASES:]
+            ],
+        }
+
     @staticmethod
     def get_customer(current_customer_id: str) -> Optional["Customer"]:
         """
         Retrieves a customer based on their ID.
 
+        Profiles are read from the customer repository (customer_repository.py).
+        A customer that is not stored there gets the demo profile below.
+
         Args:
             customer_id: The ID of the customer to retrieve.
 
         Returns:
             The Customer object if found, None otherwise.
         """
-        # In a real application, this would involve a database lookup.
-        # For this example, we'll just return a dummy customer.
+        from customer_service.entities.customer_repository import repository
+
+        try:
+            customer = repository.get(current_customer_id)
+        except sqlite3.Error as e:
+            logger.error(f"Could not read customer {current_customer_id} from the customer repository: {e}")
+            customer = None
+        return customer if customer is not None else Customer.demo_customer(current_customer_id)
+
+    @staticmethod
+    def demo_customer(current_customer_id: str) -> "Customer":
+        """The demo profile used for customers the repository does not have."""
         return Customer(
             customer_id=current_customer_id,
             account_number="428765091",
@@ -0,0 +1,309 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Customer profiles stored in the storefront's SQLite database.
+
+Profiles are normalized over five tables (customers, customer_addresses,
+garden_profiles, customer_purchases, customer_purchase_items) in ecommerce.db,
+created by the storefront's database_setup.py and seeded by its
+sample_data_importer.py. Triggers bump customers.version on every write to a
+customer's rows, whichever process makes it.
+
+Nothing is created here: a database that is missing, or has no customer
+tables, raises sqlite3.Error (Customer.get_customer then falls back to the
+demo profile).
+
+CustomerRepository keeps a bounded LRU of hydrated Customer objects. A cached
+profile is revalidated on every get() with one primary-key lookup of its
+version, so a hit costs microseconds and an update made elsewhere (another
+process, the import script) is never served stale; save() also drops the
+entry right away. preload() hydrates many customers with one query per table.
+
+Cached Customers are shared between callers and must be treated as read-only.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+from urllib.request import pathname2url
+
+from customer_service.entities.customer import (
+    Address,
+    CommunicationPreferences,
+    Customer,
+    GardenProfile,
+    Product,
+    Purchase,
+)
+
+logger = logging.getLogger(__name__)
+
+# Defaults used when Config cannot be imported; see the CUSTOMER_* fields in config.py.
+DEFAULT_DB_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "..", "ecommerce.db")
+)
+DEFAULT_CACHE_MAX_ENTRIES = 10000
+
+try:
+    from customer_service.config import Config
+    _configs = Config()
+    DB_PATH = _configs.CUSTOMER_DB_PATH or DEFAULT_DB_PATH
+    CACHE_MAX_ENTRIES = _configs.CUSTOMER_CACHE_MAX_ENTRIES
+except ImportError:
+    logger.error("Could not import Config from customer_service.config. Using default customer repository settings.")
+    DB_PATH = DEFAULT_DB_PATH
+    CACHE_MAX_ENTRIES = DEFAULT_CACHE_MAX_ENTRIES
+
+# SQLite's default limit on host parameters is 999; preload() chunks below it.
+_PRELOAD_CHUNK = 500
+
+
+def _placeholders(count: int) -> str:
+    return ", ".join("?" * count)
+
+
+class CustomerRepository:
+    """Loads and saves Customers, with a bounded LRU of hydrated profiles."""
+
+    def __init__(self, db_path: str = None, max_entries: int = None):
+        self.db_path = db_path or DB_PATH
+        self.max_entries = max_entries or CACHE_MAX_ENTRIES
+        self._conn = None
+        self._lock = threading.RLock()
+        self._cache = OrderedDict() # customer_id -> (version, Customer)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection, used under self._lock: every query here is a few
+        # indexed lookups, far shorter than the cost of a pool.
+        if self._conn is None:
+            # mode=rw: a missing database is an error, not a new empty file.
+            conn = sqlite3.connect(f"file:{pathname2url(self.db_path)}?mode=rw", uri=True,
+                                   check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # Reads
+
+    def get(self, customer_id: str) -> Optional[Customer]:
+        """The customer's profile, or None if there is no such customer."""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT version FROM customers WHERE customer_id = ?", (customer_id,)).fetchone()
+            if row is None:
+                self._drop(customer_id)
+                return None
+            cached = self._cache.get(customer_id)
+            if cached is not None and cached[0] == row["version"]:
+                self._cache.move_to_end(customer_id)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+            customers = self._load(conn, [customer_id])
+            return customers.get(customer_id)
+
+    def preload(self, customer_ids: Iterable[str]) -> int:
+        """Hydrates and caches these customers (e.g. those of active sessions) in a few batch queries.
+
+        Customers already cached are reloaded. Returns how many were found.
+        """
+        customer_ids = list(dict.fromkeys(customer_ids))
+        found = 0
+        with self._lock:
+            conn = self._connection()
+            for start in range(0, len(customer_ids), _PRELOAD_CHUNK):
+                found += len(self._load(conn, customer_ids[start:start + _PRELOAD_CHUNK]))
+        return found
+
+    def _load(self, conn: sqlite3.Connection, customer_ids: List[str]) -> Dict[str, Customer]:
+        """Hydrates the given customers with one query per table and caches them."""
+        marks = _placeholders(len(customer_ids))
+        # One read transaction, so all tables are read at the same version.
+        conn.execute("BEGIN")
+        try:
+            rows = conn.execute(f"SELECT * FROM customers WHERE customer_id IN ({marks})", customer_ids).fetchall()
+            addresses = {
+                row["customer_id"]: row for row in conn.execute(
+                    f"SELECT * FROM customer_addresses WHERE kind = 'billing' AND customer_id IN ({marks})", customer_ids)
+            }
+            gardens = {
+                row["customer_id"]: row for row in conn.execute(
+                    f"SELECT * FROM garden_profiles WHERE customer_id IN ({marks})", customer_ids)
+            }
+            purchases = {}
+            items = {}
+            for row in conn.execute(
+                f"SELECT * FROM customer_purchases WHERE customer_id IN ({marks}) ORDER BY customer_id, date, id", customer_ids
+            ):
+                purchases.setdefault(row["customer_id"], []).append(row)
+            for row in conn.execute(
+                f"""SELECT i.* FROM customer_purchase_items i JOIN customer_purchases p ON p.id = i.purchase_id
+                    WHERE p.customer_id IN ({marks}) ORDER BY i.purchase_id, i.line""", customer_ids
+            ):
+                items.setdefault(row["purchase_id"], []).append(row)
+        finally:
+            conn.execute("COMMIT")
+
+        customers = {}
+        for row in rows:
+            customer_id = row["customer_id"]
+            customer = self._hydrate(row, addresses.get(customer_id), gardens.get(customer_id),
+                                     purchases.get(customer_id, []), items)
+            if customer is None:
+                continue
+            customers[customer_id] = customer
+            self._cache[customer_id] = (row["version"], customer)
+            self._cache.move_to_end(customer_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return customers
+
+    @staticmethod
+    def _hydrate(row, address, garden, purchases, items) -> Optional[Customer]:
+        if address is None or garden is None:
+            logger.error(f"Customer {row['customer_id']} is missing its billing address or garden profile.")
+            return None
+        # model_construct: the rows were validated when saved, and skipping
+        # validation keeps a cache miss well under a millisecond.
+        return Customer.model_construct(
+            customer_id=row["customer_id"],
+            account_number=row["account_number"],
+            customer_first_name=row["first_name"],
+            customer_last_name=row["last_name"],
+            email=row["email"],
+            phone_number=row["phone_number"],
+            customer_start_date=row["customer_start_date"],
+            years_as_customer=row["years_as_customer"],
+            billing_address=Address.model_construct(
+                street=address["street"], city=address["city"], state=address["state"], zip=address["zip"],
+            ),
+            purchase_history=[
+                Purchase.model_construct(
+                    date=purchase["date"],
+                    items=[
+                        Product.model_construct(product_id=item["product_id"], name=item["name"], quantity=item["quantity"])
+                        for item in items.get(purchase["id"], [])
+                    ],
+                    total_amount=purchase["total_amount"],
+                )
+                for purchase in purchases
+            ],
+            loyalty_points=row["loyalty_points"],
+            preferred_store=row["preferred_store"],
+            communication_preferences=CommunicationPreferences.model_construct(
+                email=bool(row["email_opt_in"]), sms=bool(row["sms_opt_in"]), push_notifications=bool(row["push_opt_in"]),
+            ),
+            garden_profile=GardenProfile.model_construct(
+                type=garden["type"], size=garden["size"], sun_exposure=garden["sun_exposure"],
+                soil_type=garden["soil_type"], interests=json.loads(garden["interests"]),
+            ),
+            scheduled_appointments=json.loads(row["scheduled_appointments"]),
+        )
+
+    # Writes
+
+    def save(self, customer: Customer):
+        """Inserts or replaces the customer's profile, address, garden profile and purchase history."""
+        customer = Customer.model_validate(customer)
+        customer_id = customer.customer_id
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    """INSERT INTO customers (customer_id, account_number, first_name, last_name, email, phone_number,
+                           customer_start_date, years_as_customer, loyalty_points, preferred_store,
+                           email_opt_in, sms_opt_in, push_opt_in, scheduled_appointments)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                       ON CONFLICT (customer_id) DO UPDATE SET
+                           account_number = excluded.account_number, first_name = excluded.first_name,
+                           last_name = excluded.last_name, email = excluded.email,
+                           phone_number = excluded.phone_number, customer_start_date = excluded.customer_start_date,
+                           years_as_customer = excluded.years_as_customer, loyalty_points = excluded.loyalty_points,
+                           preferred_store = excluded.preferred_store, email_opt_in = excluded.email_opt_in,
+                           sms_opt_in = excluded.sms_opt_in, push_opt_in = excluded.push_opt_in,
+                           scheduled_appointments = excluded.scheduled_appointments""",
+                    (customer_id, customer.account_number, customer.customer_first_name, customer.customer_last_name,
+                     customer.email, customer.phone_number, customer.customer_start_date, customer.years_as_customer,
+                     customer.loyalty_points, customer.preferred_store,
+                     customer.communication_preferences.email, customer.communication_preferences.sms,
+                     customer.communication_preferences.push_notifications,
+                     json.dumps(customer.scheduled_appointments)),
+                )
+                address = customer.billing_address
+                conn.execute(
+                    "INSERT OR REPLACE INTO customer_addresses (customer_id, kind, street, city, state, zip) VALUES (?, 'billing', ?, ?, ?, ?)",
+                    (customer_id, address.street, address.city, address.state, address.zip),
+                )
+                garden = customer.garden_profile
+                conn.execute(
+                    "INSERT OR REPLACE INTO garden_profiles (customer_id, type, size, sun_exposure, soil_type, interests) VALUES (?, ?, ?, ?, ?, ?)",
+                    (customer_id, garden.type, garden.size, garden.sun_exposure, garden.soil_type, json.dumps(garden.interests)),
+                )
+                conn.execute(
+                    "DELETE FROM customer_purchase_items WHERE purchase_id IN (SELECT id FROM customer_purchases WHERE customer_id = ?)",
+                    (customer_id,),
+                )
+                conn.execute("DELETE FROM customer_purchases WHERE customer_id = ?", (customer_id,))
+                for purchase in customer.purchase_history:
+                    purchase_id = conn.execute(
+                        "INSERT INTO customer_purchases (customer_id, date, total_amount) VALUES (?, ?, ?)",
+                        (customer_id, purchase.date, purchase.total_amount),
+                    ).lastrowid
+                    conn.executemany(
+                        "INSERT INTO customer_purchase_items (purchase_id, line, product_id, name, quantity) VALUES (?, ?, ?, ?, ?)",
+                        [(purchase_id, line, item.product_id, item.name, item.quantity)
+                         for line, item in enumerate(purchase.items)],
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self.invalidate(customer_id)
+
+    def invalidate(self, customer_id: str):
+        """Drops the cached profile; the next get() reloads it."""
+        with self._lock:
+            self._drop(customer_id)
+
+    def _drop(self, customer_id: str):
+        if self._cache.pop(customer_id, None) is not None:
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "size": len(self._cache),
+                "max_entries": self.max_entries,
+            }
+
+
+repository = CustomerRepository()
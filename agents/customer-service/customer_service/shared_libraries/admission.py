@@ -0,0 +1,288 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Process-wide admission of model calls against the shared RPM/TPM budget.
+
+The per-session buckets in rate_limiter.py stop one session from flooding the
+model; this scheduler keeps all sessions together inside the project quota, so
+a burst queues here instead of coming back as 429s from upstream.
+
+rate_limit_callback (callbacks.py) awaits scheduler.admit() after the session's
+own bucket. Calls wait in one of two classes:
+
+- CHECKOUT: sessions that have called initiate_checkout_ui in the last
+  MODEL_ADMISSION_CHECKOUT_TTL_SECS and not yet submitted their order
+  (CHECKOUT_STATE_KEY in the session state, set and cleared by after_tool).
+- BROWSING: everyone else, including checkouts that were abandoned.
+
+Checkout calls always go first: a browsing call is only admitted while no
+checkout call is waiting. Within a class, sessions take turns one call at a
+time (round robin), so one busy session cannot hold back the rest.
+
+A call's token cost is estimated from the request text plus
+MODEL_ADMISSION_OUTPUT_TOKENS for the reply, since the real count is only known
+afterwards. token_estimator keeps a running count per session, so the history
+is not measured again on every call.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+from customer_service.shared_libraries.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Defaults used when Config cannot be imported; see the MODEL_ADMISSION_* fields in config.py.
+DEFAULT_RPM = 60
+DEFAULT_TPM = 1_000_000
+DEFAULT_OUTPUT_TOKENS = 256
+DEFAULT_CHECKOUT_TTL_SECS = 600.0
+
+try:
+    from customer_service.config import Config
+    _configs = Config()
+    RPM = _configs.MODEL_ADMISSION_RPM
+    TPM = _configs.MODEL_ADMISSION_TPM
+    OUTPUT_TOKENS = _configs.MODEL_ADMISSION_OUTPUT_TOKENS
+    CHECKOUT_TTL_SECS = _configs.MODEL_ADMISSION_CHECKOUT_TTL_SECS
+except ImportError:
+    logger.error("Could not import Config from customer_service.config. Using default model admission settings.")
+    RPM = DEFAULT_RPM
+    TPM = DEFAULT_TPM
+    OUTPUT_TOKENS = DEFAULT_OUTPUT_TOKENS
+    CHECKOUT_TTL_SECS = DEFAULT_CHECKOUT_TTL_SECS
+
+CHECKOUT = "checkout"
+BROWSING = "browsing"
+_CLASSES = (CHECKOUT, BROWSING)
+
+# Session state key for sessions in checkout: the wall-clock time (time.time(),
+# as session state may outlive the process) the checkout started, set and
+# cleared by after_tool.
+CHECKOUT_STATE_KEY = "checkout_in_progress"
+
+# Rough characters per token, for the request cost estimate.
+CHARS_PER_TOKEN = 4
+
+
+def priority_for(state, now: float = None) -> str:
+    """CHECKOUT for a session whose checkout started less than CHECKOUT_TTL_SECS ago, else BROWSING."""
+    started = state.get(CHECKOUT_STATE_KEY)
+    # Anything but a timestamp (e.g. the True/False flag older sessions stored) counts as no checkout.
+    if isinstance(started, bool) or not isinstance(started, (int, float)):
+        return BROWSING
+    now = time.time() if now is None else now
+    return CHECKOUT if now - started < CHECKOUT_TTL_SECS else BROWSING
+
+
+def _system_chars(llm_request) -> int:
+    config = getattr(llm_request, "config", None)
+    system_instruction = getattr(config, "system_instruction", None)
+    return len(system_instruction) if isinstance(system_instruction, str) else 0
+
+
+def _content_chars(content) -> int:
+    chars = 0
+    for part in content.parts or []:
+        if part.text:
+            chars += len(part.text)
+        elif part.function_call:
+            chars += len(json.dumps(part.function_call.args or {}, default=str))
+        elif part.function_response:
+            chars += len(json.dumps(part.function_response.response or {}, default=str))
+    return chars
+
+
+def estimate_tokens(llm_request) -> int:
+    """Estimated tokens for an LlmRequest: its text, function calls/responses and system instruction."""
+    chars = _system_chars(llm_request) + sum(_content_chars(content) for content in llm_request.contents or [])
+    return chars // CHARS_PER_TOKEN + OUTPUT_TOKENS
+
+
+class TokenEstimator:
+    """estimate_tokens() with a running count per session, so each call only measures the new history.
+
+    A session's request repeats its whole history, which only grows between
+    model calls, so the character count of the contents already seen is kept
+    and only the contents added since are measured. If the history no longer
+    matches (shorter, or its last counted content changed size), it is counted
+    again from the start. Bounded LRU by session.
+    """
+
+    def __init__(self, max_sessions: int = 1024):
+        self.max_sessions = max_sessions
+        # session id -> (contents counted, their chars, chars of the last one)
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def estimate(self, session_id: str, llm_request) -> int:
+        contents = llm_request.contents or []
+        with self._lock:
+            counted, chars, last_chars = self._sessions.get(session_id, (0, 0, 0))
+        if counted > len(contents) or (counted and _content_chars(contents[counted - 1]) != last_chars):
+            counted, chars = 0, 0
+        for content in contents[counted:]:
+            last_chars = _content_chars(content)
+            chars += last_chars
+        with self._lock:
+            self._sessions[session_id] = (len(contents), chars, last_chars if contents else 0)
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return (_system_chars(llm_request) + chars) // CHARS_PER_TOKEN + OUTPUT_TOKENS
+
+
+class _Ticket:
+    def __init__(self, session_id: str, priority: str, tokens: int):
+        self.session_id = session_id
+        self.priority = priority
+        self.tokens = tokens
+        self.enqueued = time.monotonic()
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+
+    def wake(self):
+        self.loop.call_soon_threadsafe(self.wakeup.set)
+
+
+class _ClassStats:
+    def __init__(self):
+        self.admitted = 0
+        self.total_wait_secs = 0.0
+        self.max_wait_secs = 0.0
+
+    def record(self, wait_secs: float):
+        self.admitted += 1
+        self.total_wait_secs += wait_secs
+        self.max_wait_secs = max(self.max_wait_secs, wait_secs)
+
+    def snapshot(self) -> dict:
+        return {
+            "admitted": self.admitted,
+            "total_wait_secs": round(self.total_wait_secs, 3),
+            "max_wait_secs": round(self.max_wait_secs, 3),
+            "avg_wait_secs": round(self.total_wait_secs / self.admitted, 3) if self.admitted else 0.0,
+        }
+
+
+class AdmissionScheduler:
+    """Admits model calls within a shared RPM/TPM budget, checkout first, round robin across sessions.
+
+    A limit of 0 turns that budget off.
+    """
+
+    def __init__(self, rpm: int = None, tpm: int = None):
+        rpm = RPM if rpm is None else rpm
+        tpm = TPM if tpm is None else tpm
+        # A minute's worth of budget can be spent at once, as upstream counts per minute.
+        self._requests = TokenBucket(rpm, rpm) if rpm else None
+        self._tokens = TokenBucket(tpm, tpm) if tpm else None
+        # Per class: session id -> that session's waiting tickets. The first
+        # session is next; after each admission it moves to the back.
+        self._queues = {priority: OrderedDict() for priority in _CLASSES}
+        self._stats = {priority: _ClassStats() for priority in _CLASSES}
+        self._lock = threading.Lock()
+
+    def _head(self) -> Optional[_Ticket]:
+        for priority in _CLASSES:
+            queue = self._queues[priority]
+            if queue:
+                return next(iter(queue.values()))[0]
+        return None
+
+    def _budget_wait(self, tokens: int) -> float:
+        """0.0 if the budget covers the call now (and takes it), else seconds until it could."""
+        waits = [bucket.wait_time(amount) for bucket, amount in ((self._requests, 1), (self._tokens, tokens)) if bucket]
+        if any(waits):
+            return max(waits)
+        for bucket, amount in ((self._requests, 1), (self._tokens, tokens)):
+            if bucket:
+                bucket.try_take(amount)
+        return 0.0
+
+    def _remove(self, ticket: _Ticket):
+        queue = self._queues[ticket.priority]
+        tickets = queue[ticket.session_id]
+        tickets.remove(ticket)
+        if not tickets:
+            del queue[ticket.session_id]
+
+    async def admit(self, session_id: str, priority: str = BROWSING, tokens: int = 1) -> float:
+        """Waits until the call is at the head of the queue and the budget covers it.
+
+        Returns the seconds waited.
+        """
+        ticket = _Ticket(session_id, priority, tokens)
+        with self._lock:
+            self._queues[priority].setdefault(session_id, deque()).append(ticket)
+        # A browsing head overtaken by a checkout call finds out when its budget wait ends.
+        admitted = False
+        try:
+            while True:
+                ticket.wakeup.clear()
+                with self._lock:
+                    is_head = self._head() is ticket
+                    wait_secs = self._budget_wait(tokens) if is_head else None
+                    if wait_secs == 0.0:
+                        queue = self._queues[priority]
+                        queue[session_id].popleft()
+                        if queue[session_id]:
+                            queue.move_to_end(session_id)
+                        else:
+                            del queue[session_id]
+                        waited = time.monotonic() - ticket.enqueued
+                        self._stats[priority].record(waited)
+                        next_head = self._head()
+                        admitted = True
+                if admitted:
+                    if next_head is not None:
+                        next_head.wake()
+                    if waited > 0.01:
+                        logger.info(f"admission: {priority} call for session {session_id} admitted after {waited:.2f}s.")
+                    return waited
+                try:
+                    await asyncio.wait_for(ticket.wakeup.wait(), timeout=wait_secs)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if not admitted:
+                with self._lock:
+                    self._remove(ticket)
+                    next_head = self._head()
+                if next_head is not None:
+                    next_head.wake()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queue_depth": {
+                    priority: sum(len(tickets) for tickets in self._queues[priority].values()) for priority in _CLASSES
+                },
+                "queued_sessions": {priority: len(self._queues[priority]) for priority in _CLASSES},
+                "requests_remaining": self._requests.remaining() if self._requests else None,
+                "tokens_remaining": self._tokens.remaining() if self._tokens else None,
+                "admitted": {priority: self._stats[priority].snapshot() for priority in _CLASSES},
+                "oldest_wait_secs": {
+                    priority: round(max((time.monotonic() - tickets[0].enqueued for tickets in self._queues[priority].values()), default=0.0), 3)
+                    for priority in _CLASSES
+                },
+            }
+
+
+scheduler = AdmissionScheduler()
+token_estimator = TokenEstimator()
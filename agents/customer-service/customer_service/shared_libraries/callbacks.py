@@ -25,56 +25,27 @@ from google.adk.agents.invocation_context import InvocationContext
 from google.adk.sessions.state import State # Added State
 from google.adk.tools.tool_context import ToolContext # Added ToolContext
 from jsonschema import ValidationError # Added ValidationError
-from customer_service.entities.customer import Customer
+from customer_service.shared_libraries import admission, profile_cache, rate_limiter, response_shaping, tracing
 
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
-RATE_LIMIT_SECS = 60
-RPM_QUOTA = 10
 
-
-def rate_limit_callback(
+async def rate_limit_callback(
     callback_context: CallbackContext, llm_request: LlmRequest
 ) -> None:
     """Callback function that implements a query rate limit.
 
+    Waits (asynchronously) while the session is over its model call quota.
+
     Args:
       callback_context: A CallbackContext obj representing the active callback
         context.
       llm_request: A LlmRequest obj representing the active LLM request.
     """
-    # DIAGNOSTIC LOG: Log content being sent to LLM
-    try:
-        llm_request_summary = "LLM Request Contents: "
-        for i, content_item in enumerate(llm_request.contents):
-            llm_request_summary += f"\n  Content Item {i} (role: {content_item.role}):"
-            for j, part_item in enumerate(content_item.parts):
-                part_summary = str(part_item) # Default str representation
-                if hasattr(part_item, 'text') and part_item.text:
-                    part_summary = f"TextPart(text='{part_item.text[:100]}...')" if len(part_item.text) > 100 else f"TextPart(text='{part_item.text}')"
-                elif hasattr(part_item, 'inline_data') and part_item.inline_data:
-                    part_summary = f"InlineDataPart(mime_type='{part_item.inline_data.mime_type}', data_len={len(part_item.inline_data.data)})"
-                    if 'audio' in part_item.inline_data.mime_type and hasattr(part_item.inline_data, 'data') and isinstance(part_item.inline_data.data, bytes) and len(part_item.inline_data.data) > 0:
-                        # Log first up to 16 bytes as hex to help identify audio format issues
-                        first_bytes_hex = part_item.inline_data.data[:16].hex()
-                        part_summary += f", first_16_bytes_hex='{first_bytes_hex}'"
-                elif hasattr(part_item, 'function_call') and part_item.function_call:
-                    part_summary = f"FunctionCallPart(name='{part_item.function_call.name}')"
-                elif hasattr(part_item, 'function_response') and part_item.function_response:
-                     part_summary = f"FunctionResponsePart(name='{part_item.function_response.name}')"
-                else: # Fallback for other part types or if text/data is empty
-                    part_summary = f"UnknownPartType(type='{type(part_item).__name__}')"
-
-
-                llm_request_summary += f"\n    Part {j}: {part_summary}"
-        
-        # Truncate if overall summary is too long
-        if len(llm_request_summary) > 1000: # Increased limit for better context
-            llm_request_summary = llm_request_summary[:1000] + "\n  ... (summary truncated)"
-        logger.info(f"[DIAG_LOG LLM_REQUEST] before_model_callback (rate_limit_callback): {llm_request_summary}")
-    except Exception as e:
-        logger.error(f"[DIAG_LOG LLM_REQUEST] before_model_callback: Error serializing LlmRequest for logging: {e}", exc_info=True)
+    # Diagnostic trace of the request (tracing.py); nothing is built unless tracing is on.
+    if tracing.ENABLED:
+        tracing.trace("llm_request", tracing.summarize_llm_request, llm_request,
+                      session_id=callback_context.session.id)
 
     for content in llm_request.contents: # Existing loop
         for part in content.parts:
@@ -84,37 +55,14 @@ def rate_limit_callback(
     
     
 
-    now = time.time()
-    if "timer_start" not in callback_context.state:
-
-        callback_context.state["timer_start"] = now
-        callback_context.state["request_count"] = 1
-        logger.debug(
-            "rate_limit_callback [timestamp: %i, "
-            "req_count: 1, elapsed_secs: 0]",
-            now,
-        )
-        return
-
-    request_count = callback_context.state["request_count"] + 1
-    elapsed_secs = now - callback_context.state["timer_start"]
-    logger.debug(
-        "rate_limit_callback [timestamp: %i, request_count: %i,"
-        " elapsed_secs: %i]",
-        now,
-        request_count,
-        elapsed_secs,
-    )
-
-    if request_count > RPM_QUOTA:
-        delay = RATE_LIMIT_SECS - elapsed_secs + 1
-        if delay > 0:
-            logger.debug("Sleeping for %i seconds", delay)
-            time.sleep(delay)
-        callback_context.state["timer_start"] = now
-        callback_context.state["request_count"] = 1
-    else:
-        callback_context.state["request_count"] = request_count
+    # Per session and model token bucket (rate_limiter.py). Awaiting it delays
+    # only this session's model call; the event loop keeps serving the others.
+    await rate_limiter.limiter.acquire(callback_context.session.id, llm_request.model or "default")
+    # Then the process-wide RPM/TPM budget (admission.py), where sessions in
+    # checkout are admitted ahead of browsing ones.
+    priority = admission.priority_for(callback_context.state)
+    tokens = admission.token_estimator.estimate(callback_context.session.id, llm_request)
+    await admission.scheduler.admit(callback_context.session.id, priority, tokens)
 
     # Check for a pending UI command and set it in the current turn's state_delta
     if 'current_ui_command_for_frontend' in callback_context.state:
@@ -152,8 +100,9 @@ def validate_customer_id(customer_id: str, session_state: State) -> Tuple[bool,
 
     try:
         # We read the profile from the state, where it is set deterministically
-        # at the beginning of the session.
-        c = Customer.model_validate_json(session_state['customer_profile'])
+        # at the beginning of the session. It is parsed once per distinct profile
+        # JSON (profile_cache.py), not on every tool call.
+        c = profile_cache.profiles.parsed(session_state['customer_profile'])
         logger.debug(f"Customer profile loaded from state: {c.customer_id}")
         if customer_id == c.customer_id:
             logger.info(f"Customer ID {customer_id} validated successfully.")
@@ -185,26 +134,25 @@ def lowercase_value(value):
 def before_tool(
     tool: BaseTool, args: Dict[str, Any], tool_context: CallbackContext
 ) -> Optional[Dict[str, Any]]:
-    # DIAGNOSTIC LOG: Log tool input arguments
-    args_summary = str(args)
-    if len(args_summary) > 300: args_summary = args_summary[:300] + "..."
-    logger.info(f"[DIAG_LOG TOOL_INPUT] before_tool: Tool: {tool.name}, Args: {args_summary}")
+    if tracing.ENABLED:
+        tracing.trace("tool_input", tracing.summarize_tool_call, tool.name, args,
+                      session_id=tool_context.session.id)
 
     # Ensure customer_profile is loaded in the state
     if "customer_profile" not in tool_context.state:
         logger.info("before_tool: 'customer_profile' not found in state. Attempting to load.")
         try:
-            customer_profile_json = Customer.get_customer("123").to_json()
+            customer_profile_json = profile_cache.default_profile_json("123")
             tool_context.state["customer_profile"] = customer_profile_json
             logger.info("before_tool: 'customer_profile' successfully loaded and set in state.")
-            logger.debug(f"before_tool: Loaded customer_profile data: {customer_profile_json}")
+            logger.debug("before_tool: Loaded customer_profile data: %s", customer_profile_json)
         except Exception as e:
             logger.error(f"before_tool: Failed to load or set 'customer_profile'. Error: {e}", exc_info=True)
             # Optionally, return an error if profile loading is critical for all tools
             # return {"error": "Failed to load critical customer profile."}
     else:
         logger.info("before_tool: 'customer_profile' already exists in state.")
-        logger.debug(f"before_tool: Existing customer_profile data: {tool_context.state['customer_profile']}")
+        logger.debug("before_tool: Existing customer_profile data: %s", tool_context.state['customer_profile'])
 
     # i make sure all values that the agent is sending to tools are lowercase
     # Note: The original lowercase_value function returns a generator for dicts,
@@ -212,7 +160,7 @@ def before_tool(
     # or used as a standard dict later. Assuming it works as expected for now.
     # For safety, one might consider: args = lowercase_value(args) if it returns a new dict.
     lowercase_value(args) # Assuming this modifies in-place or its return is handled
-    logger.debug(f"Arguments after attempting to lowercase: {args}")
+    logger.debug("Arguments after attempting to lowercase: %s", args)
 
     # Several tools require customer_id as input. We don't want to rely
     # solely on the model picking the right customer id. We validate it.
@@ -241,7 +189,7 @@ def before_tool(
         # Add more logic checks here as needed for your tools.
 
     if tool.name == "modify_cart":
-        logger.debug(f"Tool 'modify_cart' called with args: {args}")
+        logger.debug("Tool 'modify_cart' called with args: %s", args)
         if (
             args.get("items_added") is True
             and args.get("items_removed") is True
@@ -256,10 +204,9 @@ def before_tool(
 def after_tool(
     tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext, tool_response: Dict
 ) -> Optional[Dict]:
-    # DIAGNOSTIC LOG: Log tool output response
-    response_summary = str(tool_response)
-    if len(response_summary) > 300: response_summary = response_summary[:300] + "..."
-    logger.info(f"[DIAG_LOG TOOL_OUTPUT] after_tool: Tool: {tool.name}, Response: {response_summary}")
+    if tracing.ENABLED:
+        tracing.trace("tool_output", tracing.summarize_tool_call, tool.name, tool_response,
+                      session_id=tool_context.session.id)
 
     # After approvals, we perform operations deterministically in the callback
     # to apply the discount in the cart.
@@ -282,6 +229,13 @@ def after_tool(
         else:
             logger.info(f"Tool 'approve_discount' status not 'ok' or unknown. Response: {tool_response}")
     
+    # Sessions in checkout get priority for model calls (admission.py) until the
+    # order is submitted, successfully or not, or MODEL_ADMISSION_CHECKOUT_TTL_SECS pass.
+    if tool.name == "initiate_checkout_ui" and isinstance(tool_response, dict) and tool_response.get("action") == "show_checkout_ui":
+        tool_context.state[admission.CHECKOUT_STATE_KEY] = time.time()
+    elif tool.name == "submit_order_and_clear_cart":
+        tool_context.state[admission.CHECKOUT_STATE_KEY] = None
+
     logger.debug(f"after_tool for {tool.name} completed.")
 
     # If the tool response is intended for UI display,
@@ -296,37 +250,43 @@ def after_tool(
         #     del tool_context.state['customer_profile'] # Example: remove if it's not needed with UI command
         return None # Signal that the tool's effect is a state change
 
-    # For other tools that might return data for the LLM, pass it through.
+    # For other tools that might return data for the LLM, pass it through,
+    # cut down to the fields the model needs where the tool declares a view.
+    # The UI handlers in streaming_server.py read the full response back by
+    # function call id; without an id it could not be found, so nothing is cut.
     # If a non-UI tool also modifies state, that's fine, ADK handles state changes.
+    function_call_id = getattr(tool_context, "function_call_id", None)
+    if response_shaping.SHAPING_ENABLED and function_call_id:
+        compact = response_shaping.shape(tool.name, tool_response)
+        if compact is not None:
+            response_shaping.remember_full_response(function_call_id, tool_response)
+            if tracing.ENABLED:
+                tracing.trace("tool_shaping", lambda: {
+                    "tool": tool.name,
+                    "full_chars": response_shaping.size_of(tool_response),
+                    "shaped_chars": response_shaping.size_of(compact),
+                }, session_id=tool_context.session.id)
+            return compact
     return tool_response
 
 # checking that the customer profile is loaded as state.
 def before_agent(callback_context: InvocationContext):
     logger.debug("before_agent: Callback triggered.")
-    # DIAGNOSTIC LOG: Log ADK Input (request to agent)
-    if callback_context.request and callback_context.request.content:
-        try:
-            # Attempt to serialize content for logging, be mindful of complex objects
-            request_content_summary = str(callback_context.request.content)
-            if len(request_content_summary) > 300: # Avoid excessively long logs
-                request_content_summary = request_content_summary[:300] + "..."
-            logger.info(f"[DIAG_LOG ADK_INPUT] before_agent: Request content to agent: {request_content_summary}")
-        except Exception as e:
-            logger.error(f"[DIAG_LOG ADK_INPUT] before_agent: Error serializing request content for logging: {e}")
-    else:
-        logger.info("[DIAG_LOG ADK_INPUT] before_agent: No request content found in callback_context.")
+    if tracing.ENABLED:
+        tracing.trace("agent_input", tracing.summarize_content, callback_context.user_content,
+                      session_id=callback_context.session.id)
 
     if "customer_profile" not in callback_context.state:
         logger.info("before_agent: 'customer_profile' not found in state. Attempting to load.")
         try:
-            customer_profile_json = Customer.get_customer("123").to_json()
+            customer_profile_json = profile_cache.default_profile_json("123")
             callback_context.state["customer_profile"] = customer_profile_json
             logger.info("before_agent: 'customer_profile' successfully loaded and set in state.")
-            logger.debug(f"before_agent: Loaded customer_profile data: {customer_profile_json}")
+            logger.debug("before_agent: Loaded customer_profile data: %s", customer_profile_json)
         except Exception as e:
             logger.error(f"before_agent: Failed to load or set 'customer_profile'. Error: {e}", exc_info=True)
     else:
         logger.info("before_agent: 'customer_profile' already exists in state.")
-        logger.debug(f"before_agent: Existing customer_profile data: {callback_context.state['customer_profile']}")
+        logger.debug("before_agent: Existing customer_profile data: %s", callback_context.state['customer_profile'])
 
     # logger.info(callback_context.state["customer_profile"])
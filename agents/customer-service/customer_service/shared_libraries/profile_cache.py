@@ -0,0 +1,159 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Parsed customer profiles, keyed by a hash of the profile JSON in session state.
+
+before_tool validates the customer_id of every tool call against the
+customer_profile JSON string kept in the session state. Parsing that string
+into a Customer (nested purchase history and all) on every call is wasted
+work, as the string only changes when the profile is (re)loaded. The parsed
+Customer is kept here under a digest of the string, so each distinct profile
+is parsed once and a changed profile is simply a new key.
+
+The session state holds the compact full profile (no indentation, defaults
+omitted); the agent's instructions include only the trimmed llm_view(), and the
+get_customer_profile tool returns the full record on demand.
+
+Cached Customers are shared between callers and must be treated as read-only.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+from customer_service.entities.customer import Customer
+from customer_service.shared_libraries.admission import CHARS_PER_TOKEN
+
+logger = logging.getLogger(__name__)
+
+
+def profile_key(profile_json: str) -> str:
+    return hashlib.blake2b(profile_json.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ProfileCache:
+    """Bounded LRU of parsed Customers by profile_key()."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, profile_json: str, customer: Customer):
+        key = profile_key(profile_json)
+        with self._lock:
+            self._entries[key] = customer
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def parsed(self, profile_json: str) -> Customer:
+        """The Customer for this profile JSON, parsed on first sight.
+
+        Raises pydantic's ValidationError for a profile that does not parse;
+        failures are not cached.
+        """
+        key = profile_key(profile_json)
+        with self._lock:
+            customer = self._entries.get(key)
+            if customer is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return customer
+            self.misses += 1
+        customer = Customer.model_validate_json(profile_json)
+        self.put(profile_json, customer)
+        return customer
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+profiles = ProfileCache()
+
+
+def llm_profile_json(customer_id: str) -> str:
+    """The trimmed profile (Customer.llm_view) the agent's instructions include, as compact JSON."""
+    return _llm_json(Customer.get_customer(customer_id))
+
+
+def _llm_json(customer: Customer) -> str:
+    return json.dumps(customer.llm_view(), separators=(",", ":"))
+
+
+class ProfileSavings:
+    """Bytes and estimated tokens saved by the compact profile encodings, per session and in total.
+
+    Compared against the old encoding: the indented full profile, which was
+    both the session state value and the profile text in every prompt.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sessions = 0
+        self.bytes_before = 0
+        self.state_bytes = 0
+        self.prompt_bytes = 0
+
+    def record(self, customer: Customer, state_json: str) -> dict:
+        before = len(customer.to_json().encode("utf-8"))
+        report = {
+            "customer_id": customer.customer_id,
+            "state_bytes": len(state_json.encode("utf-8")),
+            "prompt_bytes": len(_llm_json(customer).encode("utf-8")),
+            "bytes_before": before,
+        }
+        report["state_bytes_saved"] = before - report["state_bytes"]
+        report["prompt_tokens_saved_per_call"] = (before - report["prompt_bytes"]) // CHARS_PER_TOKEN
+        with self._lock:
+            self.sessions += 1
+            self.bytes_before += before
+            self.state_bytes += report["state_bytes"]
+            self.prompt_bytes += report["prompt_bytes"]
+        return report
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": self.sessions,
+                "state_bytes": self.state_bytes,
+                "state_bytes_saved": self.bytes_before - self.state_bytes,
+                "prompt_bytes": self.prompt_bytes,
+                "prompt_tokens_saved_per_call": (self.bytes_before - self.prompt_bytes) // CHARS_PER_TOKEN,
+            }
+
+
+savings = ProfileSavings()
+
+
+def default_profile_json(customer_id: str) -> str:
+    """The profile JSON callbacks load into a new session's state (Customer.to_compact_json).
+
+    Also seeds the parsed-profile cache, so the first validation is a hit, and
+    logs what the compact encodings save for the session.
+    """
+    customer = Customer.get_customer(customer_id)
+    profile_json = customer.to_compact_json()
+    profiles.put(profile_json, customer)
+    report = savings.record(customer, profile_json)
+    logger.info(
+        "customer_profile for %s: %d bytes in session state (%d saved), %d bytes in the prompt "
+        "(~%d tokens saved per model call).", customer_id, report["state_bytes"], report["state_bytes_saved"],
+        report["prompt_bytes"], report["prompt_tokens_saved_per_call"],
+    )
+    return profile_json
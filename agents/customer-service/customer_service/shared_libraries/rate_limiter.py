@@ -0,0 +1,205 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Token-bucket limit on model calls, per session and model.
+
+rate_limit_callback (callbacks.py) awaits limiter.acquire() before every model
+call. Each (session, model) pair has a bucket refilled at the model's requests
+per minute, holding up to RATE_LIMIT_BURST requests. Over the limit the caller
+waits with asyncio.sleep, so only that session's turn is delayed, never the
+event loop the other sessions share. Each call reserves its slot up front, so
+waiters are served in arrival order.
+
+The streaming server registers a throttle listener per session to tell the
+client when a reply is being held back, and serves stats() for monitoring.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+# Defaults used when Config cannot be imported; see the RATE_LIMIT_* fields in config.py.
+DEFAULT_RPM = 10
+DEFAULT_BURST = 10
+DEFAULT_NOTIFY_AFTER_SECS = 1.0
+
+try:
+    from customer_service.config import Config
+    _configs = Config()
+    RPM = _configs.RATE_LIMIT_RPM
+    BURST = _configs.RATE_LIMIT_BURST
+    MODEL_RPM = dict(_configs.RATE_LIMIT_MODEL_RPM)
+    NOTIFY_AFTER_SECS = _configs.RATE_LIMIT_NOTIFY_AFTER_SECS
+except ImportError:
+    logger.error("Could not import Config from customer_service.config. Using default rate limit settings.")
+    RPM = DEFAULT_RPM
+    BURST = DEFAULT_BURST
+    MODEL_RPM = {}
+    NOTIFY_AFTER_SECS = DEFAULT_NOTIFY_AFTER_SECS
+
+# Called with (wait_secs, model) when a session's model call is held back.
+ThrottleListener = Callable[[float, str], Awaitable[None]]
+
+
+class TokenBucket:
+    """Requests-per-minute bucket. Not thread-safe on its own; RateLimiter locks around it."""
+
+    def __init__(self, rpm: float, burst: int):
+        self.rate = rpm / 60.0
+        self.capacity = float(max(burst, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.waiting = 0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        """Takes a token and returns how long to wait before using it (0.0 if one was available).
+
+        The balance goes negative while calls are queued, so a later call waits
+        behind the earlier ones.
+        """
+        self._refill(time.monotonic())
+        self.tokens -= 1.0
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self):
+        """Gives back a token reserved by a call that gave up waiting."""
+        self.tokens = min(self.capacity, self.tokens + 1.0)
+
+    def try_take(self, amount: float = 1.0) -> bool:
+        """Takes `amount` tokens if they are all there; never goes negative."""
+        self._refill(time.monotonic())
+        if self.tokens < min(amount, self.capacity):
+            return False
+        self.tokens -= min(amount, self.capacity)
+        return True
+
+    def wait_time(self, amount: float = 1.0) -> float:
+        """Seconds until try_take(amount) can succeed (amounts over capacity count as a full bucket)."""
+        self._refill(time.monotonic())
+        return max(min(amount, self.capacity) - self.tokens, 0.0) / self.rate
+
+    def remaining(self) -> int:
+        self._refill(time.monotonic())
+        return max(int(self.tokens), 0)
+
+
+class RateLimiter:
+    """Token buckets by (session id, model), plus the metrics and throttle listeners."""
+
+    def __init__(self, rpm: float = None, burst: int = None, model_rpm: Dict[str, float] = None,
+                 notify_after_secs: float = None, max_buckets: int = 4096):
+        self.rpm = rpm or RPM
+        self.burst = burst or BURST
+        self.model_rpm = MODEL_RPM if model_rpm is None else model_rpm
+        self.notify_after_secs = NOTIFY_AFTER_SECS if notify_after_secs is None else notify_after_secs
+        # Bounded, so sessions that never call forget_session (e.g. under `adk web`) cannot pile up.
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()
+        self._listeners: Dict[str, ThrottleListener] = {}
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.throttled = 0
+        self.total_wait_secs = 0.0
+        self.max_wait_secs = 0.0
+
+    def _bucket(self, session_id: str, model: str) -> TokenBucket:
+        key = (session_id, model)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.model_rpm.get(model, self.rpm), self.burst)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    async def acquire(self, session_id: str, model: str) -> float:
+        """Waits, without blocking the event loop, until this session may call the model.
+
+        Returns the seconds waited.
+        """
+        with self._lock:
+            bucket = self._bucket(session_id, model)
+            wait_secs = bucket.reserve()
+            self.acquired += 1
+            if wait_secs > 0:
+                self.throttled += 1
+                bucket.waiting += 1
+        if wait_secs <= 0:
+            return 0.0
+
+        logger.info(f"rate_limit: session {session_id} over its {model} quota, waiting {wait_secs:.1f}s.")
+        started = time.monotonic()
+        try:
+            listener = self._listeners.get(session_id)
+            if listener is not None and wait_secs >= self.notify_after_secs:
+                try:
+                    await listener(wait_secs, model)
+                except Exception as e:
+                    logger.warning(f"rate_limit: throttle listener for session {session_id} failed: {e}")
+            await asyncio.sleep(max(wait_secs - (time.monotonic() - started), 0.0))
+        except asyncio.CancelledError:
+            with self._lock:
+                bucket.refund()
+            raise
+        finally:
+            waited = time.monotonic() - started
+            with self._lock:
+                bucket.waiting -= 1
+                self.total_wait_secs += waited
+                self.max_wait_secs = max(self.max_wait_secs, waited)
+        return wait_secs
+
+    def remaining(self, session_id: str, model: str) -> int:
+        """Model calls this session can make right now without waiting."""
+        with self._lock:
+            return self._bucket(session_id, model).remaining()
+
+    def add_throttle_listener(self, session_id: str, listener: ThrottleListener):
+        self._listeners[session_id] = listener
+
+    def forget_session(self, session_id: str):
+        """Drops the session's buckets and listener once it has ended."""
+        with self._lock:
+            for key in [key for key in self._buckets if key[0] == session_id]:
+                del self._buckets[key]
+        self._listeners.pop(session_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions = {}
+            for (session_id, model), bucket in self._buckets.items():
+                sessions.setdefault(session_id, {})[model] = {
+                    "remaining": bucket.remaining(), "waiting": bucket.waiting,
+                }
+            return {
+                "acquired": self.acquired,
+                "throttled": self.throttled,
+                "waiting": sum(bucket.waiting for bucket in self._buckets.values()),
+                "total_wait_secs": round(self.total_wait_secs, 3),
+                "max_wait_secs": round(self.max_wait_secs, 3),
+                "avg_wait_secs": round(self.total_wait_secs / self.throttled, 3) if self.throttled else 0.0,
+                "sessions": sessions,
+            }
+
+
+limiter = RateLimiter()
@@ -0,0 +1,134 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Compact, model-facing views of tool responses.
+
+after_tool (callbacks.py) replaces the responses of the tools listed in
+LLM_VIEWS with a view that keeps only the declared fields, with long strings
+cut to TOOL_RESPONSE_MAX_TEXT_CHARS. The full response is kept here under the
+function call id, and the streaming server's UI handlers read it back with
+full_response(), so the page still gets image URLs, per-line totals and so on.
+"""
+
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Defaults used when Config cannot be imported; see the TOOL_RESPONSE_* fields in config.py.
+DEFAULT_MAX_TEXT_CHARS = 160
+
+try:
+    from customer_service.config import Config
+    _configs = Config()
+    SHAPING_ENABLED = _configs.TOOL_RESPONSE_SHAPING_ENABLED
+    MAX_TEXT_CHARS = _configs.TOOL_RESPONSE_MAX_TEXT_CHARS
+except ImportError:
+    logger.error("Could not import Config from customer_service.config. Using default tool response shaping settings.")
+    SHAPING_ENABLED = True
+    MAX_TEXT_CHARS = DEFAULT_MAX_TEXT_CHARS
+
+# A view is a dict of the keys the model sees. The value says how to shape the
+# field: KEEP keeps it (strings capped), a dict selects keys of a nested dict,
+# and a one-element list applies its view to every item of a list. Keys missing
+# from the response are skipped.
+KEEP = True
+
+_CART_LINE = {"product_id": KEEP, "name": KEEP, "quantity": KEEP, "price_per_unit": KEEP, "item_total": KEEP}
+_CART = {"items": [_CART_LINE], "subtotal": KEEP, "error": KEEP}
+
+LLM_VIEWS = {
+    "access_cart_information": _CART,
+    "modify_cart": {
+        "action": KEEP, "status": KEEP, "message": KEEP, "items_added": KEEP, "items_removed": KEEP,
+        "items": [_CART_LINE], "subtotal": KEEP, "added_item": {"product_id": KEEP, "name": KEEP},
+    },
+    "initiate_checkout_ui": {"action": KEEP, "cart_data": _CART},
+    "get_product_recommendations": {
+        # The card's image_url/product_url are filled back in by format_product_recommendations_for_display.
+        "recommendations": [{
+            "id": KEEP, "name": KEEP, "formatted_price": KEEP,
+            "attributes": {
+                "plant_type": KEEP, "light_requirement": KEEP, "water_needs": KEEP, "care_level": KEEP,
+                "hardiness_zone": KEEP, "pet_safe": KEEP, "recommended_soil_ids": KEEP,
+                "recommended_fertilizer_ids": KEEP, "companion_plants_ids": KEEP,
+            },
+        }],
+        "errors_fetching_recommendations": [{"product_id": KEEP, "error": KEEP}],
+    },
+    "search_products": {
+        "results": [{"product_id": KEEP, "name": KEEP, "description": KEEP}],
+        "error": KEEP, "details": KEEP,
+    },
+}
+
+
+def _shape(value: Any, view: Any, max_text_chars: int) -> Any:
+    if isinstance(view, dict) and isinstance(value, dict):
+        return {key: _shape(value[key], sub_view, max_text_chars) for key, sub_view in view.items() if key in value}
+    if isinstance(view, list) and isinstance(value, list):
+        return [_shape(item, view[0], max_text_chars) for item in value]
+    if isinstance(value, str) and len(value) > max_text_chars:
+        return value[:max_text_chars - 1].rstrip() + "…"
+    return value
+
+
+def shape(tool_name: str, response: dict, max_text_chars: int = None) -> Optional[dict]:
+    """The model's view of a tool response, or None if the tool has no declared view."""
+    view = LLM_VIEWS.get(tool_name)
+    if view is None or not isinstance(response, dict):
+        return None
+    return _shape(response, view, max_text_chars or MAX_TEXT_CHARS)
+
+
+def size_of(response: Any) -> int:
+    """Serialized size in characters, roughly what the response costs in the model's context."""
+    return len(json.dumps(response, default=str))
+
+
+class _FullResponses:
+    """Full tool responses by function call id, until the streaming server takes them.
+
+    Bounded, so responses nobody reads (e.g. under `adk web`) cannot pile up.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, function_call_id: str, response: dict):
+        with self._lock:
+            self._entries[function_call_id] = response
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def take(self, function_call_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._entries.pop(function_call_id, None)
+
+
+_full_responses = _FullResponses()
+
+
+def remember_full_response(function_call_id: str, response: dict):
+    _full_responses.put(function_call_id, response)
+
+
+def full_response(function_response) -> Any:
+    """The full response behind a FunctionResponse part (its shaped response if none was kept)."""
+    full = _full_responses.take(function_response.id) if function_response.id else None
+    return full if full is not None else function_response.response
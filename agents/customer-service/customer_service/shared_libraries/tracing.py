@@ -0,0 +1,152 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Diagnostic traces of model requests, tool calls and agent input.
+
+Call sites guard on the module flag and hand over a summarizer instead of a
+summary, so nothing is built unless the trace is actually kept:
+
+    if tracing.ENABLED:
+        tracing.trace("tool_input", summarize_tool_call, tool.name, args, session_id=...)
+
+With tracing off (TRACE_ENABLED=False, the default) that is one attribute
+check per callback. When on, TRACE_SAMPLE_RATE of the calls are summarized
+into a ring buffer of the last TRACE_BUFFER_SIZE traces, which the streaming
+server dumps on demand (GET /debug/traces) and can switch on at runtime.
+Traces are also logged at DEBUG.
+
+Summaries stay bounded: strings are cut at _MAX_CHARS and a model request is
+summarized by its last content only, so tracing cost does not grow with the
+conversation.
+"""
+
+import itertools
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Defaults used when Config cannot be imported; see the TRACE_* fields in config.py.
+DEFAULT_BUFFER_SIZE = 200
+
+try:
+    from customer_service.config import Config
+    _configs = Config()
+    ENABLED = _configs.TRACE_ENABLED
+    SAMPLE_RATE = _configs.TRACE_SAMPLE_RATE
+    BUFFER_SIZE = _configs.TRACE_BUFFER_SIZE
+except ImportError:
+    logger.error("Could not import Config from customer_service.config. Tracing is off.")
+    ENABLED = False
+    SAMPLE_RATE = 1.0
+    BUFFER_SIZE = DEFAULT_BUFFER_SIZE
+
+_MAX_CHARS = 300
+
+_traces = deque(maxlen=BUFFER_SIZE)
+_lock = threading.Lock()
+_ids = itertools.count(1)
+
+
+def configure(enabled: bool, sample_rate: Optional[float] = None, buffer_size: Optional[int] = None):
+    """Switches tracing on or off at runtime; a new buffer size drops the kept traces."""
+    global ENABLED, SAMPLE_RATE, _traces
+    with _lock:
+        if sample_rate is not None:
+            SAMPLE_RATE = min(max(sample_rate, 0.0), 1.0)
+        if buffer_size is not None and buffer_size != _traces.maxlen:
+            _traces = deque(maxlen=max(buffer_size, 1))
+        ENABLED = enabled
+
+
+def trace(kind: str, summarize: Callable[..., Any], *args, session_id: Optional[str] = None):
+    """Keeps summarize(*args) as a trace of `kind`, if this call is sampled.
+
+    Never raises: a summarizer error is recorded in place of the summary.
+    """
+    if not ENABLED or (SAMPLE_RATE < 1.0 and random.random() >= SAMPLE_RATE):
+        return
+    try:
+        data = summarize(*args)
+    except Exception as e:
+        data = {"summary_error": repr(e)}
+    entry = {"id": next(_ids), "ts": time.time(), "kind": kind, "session_id": session_id, "data": data}
+    with _lock:
+        _traces.append(entry)
+    logger.debug("[TRACE %s] session=%s %s", kind, session_id, data)
+
+
+def recent(limit: Optional[int] = None, kind: Optional[str] = None, session_id: Optional[str] = None) -> List[dict]:
+    """The kept traces, oldest first, optionally filtered and cut to the last `limit`."""
+    with _lock:
+        entries = list(_traces)
+    if kind:
+        entries = [entry for entry in entries if entry["kind"] == kind]
+    if session_id:
+        entries = [entry for entry in entries if entry["session_id"] == session_id]
+    return entries[-limit:] if limit else entries
+
+
+def clear():
+    with _lock:
+        _traces.clear()
+
+
+def status() -> dict:
+    with _lock:
+        return {"enabled": ENABLED, "sample_rate": SAMPLE_RATE, "buffer_size": _traces.maxlen, "kept": len(_traces)}
+
+
+# Summarizers. Only called for sampled traces.
+
+def truncate(value: Any, max_chars: int = _MAX_CHARS) -> str:
+    text = value if isinstance(value, str) else repr(value)
+    return text if len(text) <= max_chars else text[:max_chars] + "..."
+
+
+def summarize_part(part) -> dict:
+    if part.text:
+        return {"text": truncate(part.text, 100)}
+    if part.inline_data:
+        return {"inline_data": part.inline_data.mime_type, "bytes": len(part.inline_data.data or b"")}
+    if part.function_call:
+        return {"function_call": part.function_call.name}
+    if part.function_response:
+        return {"function_response": part.function_response.name}
+    return {"part": type(part).__name__}
+
+
+def summarize_llm_request(llm_request) -> dict:
+    """Model, number of contents, and the parts of the last one (the new turn)."""
+    contents = llm_request.contents or []
+    last = contents[-1] if contents else None
+    return {
+        "model": llm_request.model,
+        "contents": len(contents),
+        "last_role": last.role if last else None,
+        "last_parts": [summarize_part(part) for part in (last.parts or [])[:10]] if last else [],
+    }
+
+
+def summarize_tool_call(tool_name: str, payload: Any) -> dict:
+    return {"tool": tool_name, "payload": truncate(payload)}
+
+
+def summarize_content(content) -> dict:
+    if content is None:
+        return {"content": None}
+    return {"role": content.role, "parts": [summarize_part(part) for part in (content.parts or [])[:10]]}
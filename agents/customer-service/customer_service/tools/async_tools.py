@@ -0,0 +1,525 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""The tools that call the storefront backend, as coroutines.
+
+ADK awaits them directly on the live streaming event loop, so a slow backend
+call does not block other sessions. They are the only implementation of these
+tools; tools.py holds the ones that never leave the process.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Optional
+
+import httpx
+from google.adk.tools.tool_context import ToolContext
+
+from customer_service.tools import cart_state, http_client
+from customer_service.tools.product_cache import MISS, STALE, product_cache
+from customer_service.tools.tools import _format_recommendation
+
+logger = logging.getLogger(__name__)
+
+# Import Config and instantiate it to access settings
+try:
+    from customer_service.config import Config
+    configs = Config()
+    BACKEND_API_BASE_URL = configs.BACKEND_API_BASE_URL
+    RECOMMENDATION_BATCH_SIZE = configs.RECOMMENDATION_BATCH_SIZE
+    RECOMMENDATION_CONCURRENCY = configs.RECOMMENDATION_CONCURRENCY
+    RECOMMENDATION_DEADLINE_SECS = configs.RECOMMENDATION_DEADLINE_SECS
+except ImportError:
+    logger.error("Could not import Config from customer_service.config. Using default URL.")
+    # Fallback in case of import issues, though ideally this shouldn't happen
+    BACKEND_API_BASE_URL = "http://127.0.0.1:5000/api"
+    RECOMMENDATION_BATCH_SIZE = 10
+    RECOMMENDATION_CONCURRENCY = 4
+    RECOMMENDATION_DEADLINE_SECS = 3.0
+
+# Background refreshes of stale product cache entries; referenced here so they are not garbage-collected mid-flight.
+_refresh_tasks = set()
+
+
+async def access_cart_information(customer_id: str, tool_context: Optional[ToolContext] = None) -> dict:
+    """
+    Args:
+        customer_id (str): The ID of the customer.
+        tool_context: Supplied by ADK; holds the session's cart copy (see cart_state.py).
+
+    Returns:
+        dict: A dictionary representing the cart contents.
+
+    Example:
+        >>> access_cart_information(customer_id='123')
+        {'items': [{'product_id': 'soil-123', 'name': 'Standard Potting Soil', 'quantity': 1}, {'product_id': 'fert-456', 'name': 'General Purpose Fertilizer', 'quantity': 1}], 'subtotal': 25.98}
+    """
+    logger.info("Accessing cart information for customer ID: %s", customer_id)
+
+    api_url = f"{BACKEND_API_BASE_URL}/cart/{customer_id}"
+    snapshot = cart_state.lookup(tool_context, customer_id)
+    try:
+        # Not coalesced: a GET already in flight may predate this session's last cart write.
+        response = await http_client.async_get(api_url, coalesce=False,
+                                               headers=cart_state.revalidation_headers(snapshot))
+        if snapshot and response.status_code == 304:
+            logger.info("Cart for customer %s unchanged since last read (ETag %s).", customer_id, snapshot["etag"])
+            return cart_state.cart_of(snapshot)
+        response.raise_for_status()
+        cart_data = response.json()
+        cart_state.store(tool_context, customer_id, response.headers.get("ETag"), cart_data)
+        logger.info("Successfully retrieved cart data for customer %s: %s", customer_id, cart_data)
+        return cart_data
+    except httpx.HTTPStatusError as http_err:
+        logger.error(f"HTTP error occurred while accessing cart for {customer_id}: {http_err} - Response: {response.text}")
+        return {"items": [], "subtotal": 0.0, "error": f"Failed to retrieve cart: {response.status_code}"}
+    except httpx.RequestError as req_err:
+        logger.error(f"Request exception occurred while accessing cart for {customer_id}: {req_err}")
+        return {"items": [], "subtotal": 0.0, "error": "Failed to connect to cart service."}
+    except json.JSONDecodeError as json_err:
+        logger.error(f"Failed to decode JSON response from cart API for {customer_id}: {json_err} - Response: {response.text}")
+        return {"items": [], "subtotal": 0.0, "error": "Invalid response from cart service."}
+
+
+def _write_through_cart(tool_context: Optional[ToolContext], customer_id: str, etag: Optional[str], modification_status: dict):
+    """Stores the cart returned by the modify endpoint; older backends without cart lines drop the copy."""
+    if "items" in modification_status:
+        cart_state.store(tool_context, customer_id, etag, modification_status)
+    else:
+        cart_state.forget(tool_context)
+
+
+def _added_item_details(modification_status: dict, product_id: str) -> Optional[dict]:
+    """The `added_item` of a refresh_cart payload, from the cart lines the modify endpoint returns."""
+    for line in modification_status.get("items") or []:
+        if line.get("product_id") == product_id:
+            return {"product_id": product_id, "name": line.get("name"), "image_url": line.get("image_url")}
+    return None
+
+
+async def modify_cart(
+    customer_id: str, items_to_add: list[dict], items_to_remove: list[dict], tool_context: Optional[ToolContext] = None
+) -> dict:
+    """Modifies the user's shopping cart by adding and/or removing items.
+
+    Args:
+        customer_id (str): The ID of the customer.
+        items_to_add (list): A list of dictionaries, each with 'product_id' and 'quantity'.
+        items_to_remove (list): A list of product_ids to remove.
+        tool_context: Supplied by ADK; the updated cart is written through to the session.
+
+    Returns:
+        dict: A dictionary indicating the status of the cart modification.
+    Example:
+        >>> modify_cart(customer_id='123', items_to_add=[{'product_id': 'soil-456', 'quantity': 1}, {'product_id': 'fert-789', 'quantity': 1}], items_to_remove=[{'product_id': 'fert-112', 'quantity': 1}])
+        {'status': 'success', 'message': 'Cart updated successfully.', 'items_added': True, 'items_removed': True, 'items': [{'product_id': 'soil-456', 'name': 'Standard Potting Soil', 'quantity': 1, 'price_per_unit': 12.99, 'item_total': 12.99, 'image_url': '...'}, ...], 'subtotal': 25.98}
+    """
+    logger.info("Modifying cart for customer ID: %s", customer_id)
+    logger.info("Adding items: %s", items_to_add)
+    logger.info("Removing items: %s", items_to_remove)
+
+    api_url = f"{BACKEND_API_BASE_URL}/cart/modify/{customer_id}"
+    payload = {
+        "items_to_add": items_to_add if items_to_add is not None else [],
+        "items_to_remove": items_to_remove if items_to_remove is not None else []
+    }
+
+    try:
+        response = await http_client.async_post(api_url, json=payload)
+        response.raise_for_status()
+        modification_status = response.json()
+        logger.info("Successfully modified cart for customer %s: %s", customer_id, modification_status)
+        _write_through_cart(tool_context, customer_id, response.headers.get("ETag"), modification_status)
+        added_item_details_for_payload = None
+        if items_to_add and modification_status.get("items_added") is True:
+            # The add-to-cart animation uses the first item added.
+            added_product_id = items_to_add[0].get("product_id")
+            if added_product_id:
+                # The response carries the updated cart lines; no product lookup needed.
+                added_item_details_for_payload = _added_item_details(modification_status, added_product_id)
+                logger.info(f"Details for added item for refresh_cart: {added_item_details_for_payload}")
+
+        return_value = {"action": "refresh_cart", **modification_status}
+        if added_item_details_for_payload:
+            return_value["added_item"] = added_item_details_for_payload
+
+        logger.info(f"modify_cart returning: {return_value}")
+        return return_value
+    except httpx.HTTPStatusError as http_err:
+        logger.error(f"HTTP error occurred while modifying cart for {customer_id}: {http_err} - Response: {response.text}")
+        return {"status": "error", "message": f"Failed to modify cart: {response.status_code}", "items_added": False, "items_removed": False}
+    except httpx.RequestError as req_err:
+        logger.error(f"Request exception occurred while modifying cart for {customer_id}: {req_err}")
+        return {"status": "error", "message": "Failed to connect to cart modification service.", "items_added": False, "items_removed": False}
+    except json.JSONDecodeError as json_err:
+        logger.error(f"Failed to decode JSON response from cart modification API for {customer_id}: {json_err} - Response: {response.text}")
+        return {"status": "error", "message": "Invalid response from cart modification service.", "items_added": False, "items_removed": False}
+
+
+# Flipped the first time /products/batch answers 404/405 (a backend without the
+# batch endpoint); lookups then go out one product per request.
+_backend_features = {"products_batch": True}
+
+# Statuses meaning the backend has no POST /products/batch route.
+_BATCH_UNSUPPORTED_STATUSES = (404, 405)
+
+def _chunks(ids: list[str]) -> list[list[str]]:
+    """Splits ids into the lookups to issue concurrently: batch-sized chunks, or single ids without the batch endpoint."""
+    size = max(1, RECOMMENDATION_BATCH_SIZE) if _backend_features["products_batch"] else 1
+    return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+
+def _plan_recommendation_lookups(product_ids: list[str]) -> tuple[list[str], dict, list[str], list[list[str]]]:
+    """Answers what it can from the product cache.
+
+    Returns the de-duplicated ids, the cached payloads found, the ids among them
+    that are stale and should be refreshed in the background, and the chunks of
+    uncached ids that have to be fetched now.
+    """
+    ids = list(dict.fromkeys(product_ids))
+    found, stale_ids, missing_ids = {}, [], []
+    for product_id in ids:
+        payload, state = product_cache.lookup(product_id)
+        if state == MISS:
+            missing_ids.append(product_id)
+        else:
+            found[product_id] = payload
+            if state == STALE:
+                stale_ids.append(product_id)
+    return ids, found, stale_ids, _chunks(missing_ids)
+
+
+def _record_lookup_errors(errors: dict, ids: list[str], error: str, status_code: Optional[int] = None):
+    for product_id in ids:
+        entry = {"product_id": product_id, "error": error}
+        if status_code is not None:
+            entry["status_code"] = status_code
+        errors[product_id] = entry
+
+
+def _record_product(product_id: str, product_data: dict, found: dict):
+    found[product_id] = product_data
+    product_cache.put(product_id, product_data)
+
+
+def _record_batch_result(batch_data: dict, found: dict, errors: dict):
+    for product_data in batch_data.get("products", []):
+        _record_product(product_data.get("id"), product_data, found)
+    _record_lookup_errors(errors, batch_data.get("missing_ids", []), "Product not found", 404)
+
+
+def _recommendations_result(ids: list[str], found: dict, errors: dict) -> dict:
+    """Builds the tool result in request order; ids resolved by neither dict missed the deadline."""
+    found, errors = dict(found), dict(errors) # Late lookups may still be writing
+    timed_out = [product_id for product_id in ids if product_id not in found and product_id not in errors]
+    _record_lookup_errors(errors, timed_out, f"Lookup did not finish within {RECOMMENDATION_DEADLINE_SECS:.1f}s.")
+    recommendations = []
+    for product_id in ids:
+        if product_id in found:
+            formatted_product = _format_recommendation(found[product_id])
+            logger.info(f"Product ID {formatted_product.get('id')} generated product_url: {formatted_product.get('product_url')}")
+            recommendations.append(formatted_product)
+    error_list = [errors[product_id] for product_id in ids if product_id in errors]
+    if error_list:
+        logger.warning(f"Encountered errors while fetching details for some products: {error_list}")
+    logger.info("Returning formatted details for %d products.", len(recommendations))
+    return {"recommendations": recommendations, "errors_fetching_recommendations": error_list if error_list else None}
+
+
+def _refresh_failures(claimed: list[str], found: dict) -> list[str]:
+    return [product_id for product_id in claimed if product_id not in found]
+
+
+async def _fetch_product_detail(limiter: asyncio.Semaphore, product_id: str, found: dict, errors: dict):
+    response = None
+    try:
+        async with limiter:
+            response = await http_client.async_get(f"{BACKEND_API_BASE_URL}/products/{product_id}")
+        response.raise_for_status()
+        _record_product(product_id, response.json(), found)
+    except httpx.HTTPStatusError as http_err:
+        logger.error(f"HTTP error for product ID {product_id}: {http_err} - Response: {response.text}")
+        error = "Product not found" if response.status_code == 404 else str(http_err)
+        _record_lookup_errors(errors, [product_id], error, response.status_code)
+    except httpx.RequestError as req_err:
+        logger.error(f"Request exception for product ID {product_id}: {req_err}")
+        _record_lookup_errors(errors, [product_id], str(req_err))
+    except json.JSONDecodeError as json_err:
+        logger.error(f"Failed to decode JSON for product ID {product_id}: {json_err}")
+        _record_lookup_errors(errors, [product_id], "Invalid JSON response from product API.")
+
+
+async def _fetch_recommendation_unit(limiter: asyncio.Semaphore, ids: list[str], found: dict, errors: dict):
+    """Resolves one chunk of ids into `found`/`errors` with a batch request (or per-product GETs)."""
+    if _backend_features["products_batch"]:
+        response = None
+        try:
+            async with limiter:
+                response = await http_client.async_post(f"{BACKEND_API_BASE_URL}/products/batch", coalesce=True, json={"ids": ids})
+            if response.status_code in _BATCH_UNSUPPORTED_STATUSES:
+                logger.warning("Backend has no /products/batch endpoint; fetching products individually.")
+                _backend_features["products_batch"] = False
+            else:
+                response.raise_for_status()
+                _record_batch_result(response.json(), found, errors)
+                return
+        except httpx.HTTPStatusError as http_err:
+            logger.error(f"HTTP error for product IDs {ids}: {http_err} - Response: {response.text}")
+            _record_lookup_errors(errors, ids, str(http_err), response.status_code)
+            return
+        except httpx.RequestError as req_err:
+            logger.error(f"Request exception for product IDs {ids}: {req_err}")
+            _record_lookup_errors(errors, ids, str(req_err))
+            return
+        except json.JSONDecodeError as json_err:
+            logger.error(f"Failed to decode JSON for product IDs {ids}: {json_err} - Response: {response.text}")
+            _record_lookup_errors(errors, ids, "Invalid JSON response from product batch API.")
+            return
+    await asyncio.gather(*(_fetch_product_detail(limiter, product_id, found, errors) for product_id in ids))
+
+
+def _refresh_stale_products(stale_ids: list[str]):
+    """Re-fetches stale cached products in a background task; callers keep the stale copies meanwhile."""
+    claimed = product_cache.begin_refresh(stale_ids)
+    if not claimed:
+        return
+
+    async def refresh():
+        found = {}
+        try:
+            limiter = asyncio.Semaphore(max(1, RECOMMENDATION_CONCURRENCY))
+            await asyncio.gather(*(_fetch_recommendation_unit(limiter, unit, found, {}) for unit in _chunks(claimed)))
+        finally:
+            product_cache.end_refresh(claimed, _refresh_failures(claimed, found))
+    task = asyncio.create_task(refresh())
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+
+
+async def get_product_recommendations(product_ids: list[str], customer_id: str) -> dict:
+    """Retrieves and formats specific product details for a list of product IDs for recommendation cards.
+
+    Args:
+        product_ids: A list of product IDs.
+        customer_id: The ID of the customer (currently unused by this tool but kept for consistency).
+
+    Returns:
+        A dictionary containing a list of product dictionaries, each with
+        id, name, formatted_price, image_url, and product_url.
+        {'recommendations': [
+            {'id': 'SKU_123', 'name': 'Product Name', 'formatted_price': '$19.99', 'image_url': '...', 'product_url': '...'},
+            ...
+        ]}
+    """
+    logger.info(
+        "Getting and formatting product details for recommendation cards for IDs: %s for customer %s",
+        product_ids,
+        customer_id,
+    )
+
+    if not product_ids:
+        logger.info("No product IDs provided for recommendations.")
+        return {"recommendations": []}
+
+    # Cached products are answered immediately (stale ones are refreshed in the
+    # background). The rest is looked up in concurrent chunks; whatever has not
+    # resolved by the deadline is cancelled and reported in the errors.
+    ids, found, stale_ids, units = _plan_recommendation_lookups(product_ids)
+    errors = {}
+    if stale_ids:
+        _refresh_stale_products(stale_ids)
+    if not units:
+        return _recommendations_result(ids, found, errors)
+    limiter = asyncio.Semaphore(max(1, RECOMMENDATION_CONCURRENCY))
+    tasks = [asyncio.create_task(_fetch_recommendation_unit(limiter, unit, found, errors)) for unit in units]
+    _, pending = await asyncio.wait(tasks, timeout=RECOMMENDATION_DEADLINE_SECS)
+    for task in pending:
+        task.cancel()
+    return _recommendations_result(ids, found, errors)
+
+
+async def check_product_availability(product_id: str, store_id: str) -> dict:
+    """Checks the availability of a product at a specified store (or for pickup).
+
+    Args:
+        product_id: The ID of the product to check.
+        store_id: The ID of the store (or 'pickup' for pickup availability).
+
+    Returns:
+        A dictionary indicating availability.  Example:
+        {'available': True, 'quantity': 10, 'store': 'Main Store'}
+
+    Example:
+        >>> check_product_availability(product_id='soil-456', store_id='pickup')
+        {'available': True, 'quantity': 10, 'store': 'pickup'}
+    """
+    logger.info("Checking availability of product ID: %s at store: %s", product_id, store_id)
+    api_url = f"{BACKEND_API_BASE_URL}/products/availability/{product_id}/{store_id}"
+    try:
+        response = await http_client.async_get(api_url)
+        response.raise_for_status()
+        availability_data = response.json()
+        logger.info("Successfully retrieved availability for product %s at store %s: %s", product_id, store_id, availability_data)
+        return availability_data
+    except httpx.HTTPStatusError as http_err:
+        logger.error(f"HTTP error occurred while checking availability for product {product_id} at store {store_id}: {http_err} - Response: {response.text}")
+        if response.status_code == 404:
+            try:
+                return response.json() # The API's own 404 error structure
+            except json.JSONDecodeError:
+                return {"available": False, "quantity": 0, "store": store_id, "error": "Product not found and error response unparseable."}
+        return {"available": False, "quantity": 0, "store": store_id, "error": f"Failed to check availability: {response.status_code}"}
+    except httpx.RequestError as req_err:
+        logger.error(f"Request exception occurred while checking availability for product {product_id} at store {store_id}: {req_err}")
+        return {"available": False, "quantity": 0, "store": store_id, "error": "Failed to connect to availability service."}
+    except json.JSONDecodeError as json_err:
+        logger.error(f"Failed to decode JSON response from availability API for {product_id} at store {store_id}: {json_err} - Response: {response.text}")
+        return {"available": False, "quantity": 0, "store": store_id, "error": "Invalid response from availability service."}
+
+
+async def search_products(query: str, customer_id: str) -> dict:
+    """Searches for products based on a query string using the retail search backend.
+
+    Args:
+        query: The search term (e.g., "rosemary", "red pots").
+        customer_id: The ID of the customer (used as visitor_id for the search API).
+
+    Returns:
+        A dictionary containing a list of search results (products). Example:
+        {'results': [
+            {'product_id': 'SKU_PLANT_ROSEMARY_001', 'name': 'Rosemary \'Arp\'', 'description': '...'},
+            {'product_id': 'SKU_SOIL_HERB_MIX_001', 'name': 'Rosemary Herb Mix Soil', 'description': '...'}
+        ]}
+
+    Example:
+        >>> search_products(query='rosemary', customer_id='123')
+        {'results': [{'product_id': 'SKU_PLANT_ROSEMARY_001', 'name': 'Rosemary \'Arp\'', 'description': 'Upright, aromatic herb...'}]}
+    """
+    logger.info(f"Searching products with query: '{query}' for customer_id (visitor_id): {customer_id}")
+    api_url = f"{BACKEND_API_BASE_URL}/retail/search-products"
+    payload = {"query": query, "visitor_id": customer_id}
+
+    try:
+        response = await http_client.async_post(api_url, coalesce=True, json=payload, timeout=http_client.SLOW_TIMEOUT)
+        response.raise_for_status()
+        search_results = response.json()
+        # The backend endpoint returns {'recommendations': [...]}; the tool reports them as 'results'.
+        if "recommendations" in search_results:
+            search_results["results"] = search_results.pop("recommendations")
+        logger.info(f"Successfully retrieved search results for query '{query}': {search_results}")
+        return search_results
+    except httpx.HTTPStatusError as http_err:
+        logger.error(f"HTTP error occurred during product search for query '{query}': {http_err} - Response: {response.text}")
+        try:
+            error_details = response.json()
+        except json.JSONDecodeError:
+            error_details = {"error": f"Failed to search products: {response.status_code}"}
+        return {"results": [], **error_details}
+    except httpx.RequestError as req_err:
+        logger.error(f"Request exception occurred during product search for query '{query}': {req_err}")
+        return {"results": [], "error": "Failed to connect to product search service."}
+    except json.JSONDecodeError as json_err:
+        logger.error(f"Failed to decode JSON response from product search API for query '{query}': {json_err} - Response: {response.text}")
+        return {"results": [], "error": "Invalid response from product search service."}
+
+
+async def submit_order_and_clear_cart(customer_id: str, cart_items: list[dict], shipping_details: dict, total_amount: float,
+                                      tool_context: Optional[ToolContext] = None) -> dict:
+    """
+    Submits the order to the backend, which includes clearing the cart.
+
+    Args:
+        customer_id (str): The ID of the customer.
+        cart_items (list[dict]): List of items in the cart (e.g., from access_cart_information).
+        shipping_details (dict): Shipping information collected.
+        total_amount (float): The final total amount for the order.
+        tool_context: Supplied by ADK; the emptied cart is written through to the session.
+
+    Returns:
+        dict: A dictionary with the status of the order submission.
+              Example: {'status': 'success', 'message': 'Order submitted...', 'order_id': 'SIM_123', 'action': 'refresh_cart_and_show_confirmation'}
+    """
+    logger.info(f"Submitting order for customer ID: {customer_id}")
+    api_url = f"{BACKEND_API_BASE_URL}/checkout/place_order"
+    payload = {
+        "customer_id": customer_id,
+        "items": cart_items,
+        "shipping_details": shipping_details,
+        "total_amount": total_amount
+    }
+    logger.info(f"Order submission payload: {json.dumps(payload, indent=2)}")
+
+    response = None
+    try:
+        response = await http_client.async_post(api_url, json=payload, timeout=http_client.SLOW_TIMEOUT)
+        response.raise_for_status()
+        order_status = response.json()
+
+        if order_status.get("status") == "success":
+            logger.info(f"Order successfully submitted for customer {customer_id}: {order_status}")
+            cart_state.store(tool_context, customer_id, response.headers.get("X-Cart-ETag"), cart_state.EMPTY_CART)
+            return {
+                "status": "success",
+                "message": order_status.get("message", "Order submitted and cart cleared."),
+                "order_id": order_status.get("order_id"),
+                "action": "refresh_cart_and_show_confirmation" # Action for UI
+            }
+        logger.error(f"Order submission reported failure by API for customer {customer_id}: {order_status}")
+        return {
+            "status": "error",
+            "message": order_status.get("message", "Order submission failed at API level."),
+            "details": order_status
+        }
+    except httpx.HTTPStatusError as http_err:
+        logger.error(f"HTTP error occurred while submitting order for {customer_id}: {http_err} - Response: {response.text}")
+        if response.status_code == 409:
+            # Stock could not be reserved for some lines; nothing was charged or cleared.
+            try:
+                conflict = response.json()
+            except json.JSONDecodeError:
+                conflict = {}
+            return {
+                "status": "error",
+                "message": conflict.get("message", "Some items are no longer available in the requested quantity."),
+                "failed_items": conflict.get("failed_items", []),
+            }
+        return {"status": "error", "message": f"Failed to submit order due to HTTP error: {response.status_code}"}
+    except httpx.RequestError as req_err:
+        logger.error(f"Request exception occurred while submitting order for {customer_id}: {req_err}")
+        return {"status": "error", "message": "Failed to connect to order submission service."}
+    except json.JSONDecodeError as json_err:
+        logger.error(f"Failed to decode JSON response from order submission API for {customer_id}: {json_err} - Response: {response.text if response is not None else 'N/A'}")
+        return {"status": "error", "message": "Invalid response from order submission service."}
+
+
+async def initiate_checkout_ui(customer_id: str, tool_context: Optional[ToolContext] = None) -> dict:
+    """
+    Fetches cart information and signals the intent to show the checkout UI.
+
+    Args:
+        customer_id (str): The ID of the customer.
+        tool_context: Supplied by ADK; lets the cart read revalidate the session's copy.
+
+    Returns:
+        dict: A dictionary with the action 'show_checkout_ui' and the cart_data.
+              Example: {'action': 'show_checkout_ui', 'cart_data': {'items': [...], 'subtotal': ...}}
+    """
+    logger.info(f"Initiating checkout UI for customer ID: {customer_id}")
+
+    cart_data = await access_cart_information(customer_id=customer_id, tool_context=tool_context)
+
+    action_payload = {"action": "show_checkout_ui", "cart_data": cart_data}
+
+    logger.info(f"Returning action payload for initiate_checkout_ui: {action_payload}")
+    return action_payload
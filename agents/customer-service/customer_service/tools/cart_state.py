@@ -0,0 +1,70 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Versioned copy of the customer's cart kept in the ADK session state.
+
+The cart tools write it through: modify_cart stores the cart the backend
+returns, submit_order_and_clear_cart stores the emptied cart, each with the
+backend's cart ETag. access_cart_information then revalidates the copy with
+If-None-Match; a 304 means the copy is current and the cart is neither re-read
+by the backend nor sent again. The copy is never served without revalidation,
+since the cart can also change outside the conversation (e.g. the web page).
+"""
+
+import copy
+from typing import Optional
+
+from google.adk.tools.tool_context import ToolContext
+
+CART_STATE_KEY = "cart_snapshot"
+
+EMPTY_CART = {"items": [], "subtotal": 0.0}
+
+
+def lookup(tool_context: Optional[ToolContext], customer_id: str) -> Optional[dict]:
+    """The stored {"customer_id", "etag", "cart"} for this customer, or None."""
+    if tool_context is None:
+        return None
+    snapshot = tool_context.state.get(CART_STATE_KEY)
+    if not snapshot or snapshot.get("customer_id") != customer_id or not snapshot.get("etag"):
+        return None
+    return snapshot
+
+
+def revalidation_headers(snapshot: Optional[dict]) -> Optional[dict]:
+    """Request headers for a conditional cart GET, or None without a stored copy."""
+    return {"If-None-Match": snapshot["etag"]} if snapshot else None
+
+
+def cart_of(snapshot: dict) -> dict:
+    """A copy of the stored cart, safe to hand to the model or the UI."""
+    return copy.deepcopy(snapshot["cart"])
+
+
+def store(tool_context: Optional[ToolContext], customer_id: str, etag: Optional[str], cart: dict):
+    """Writes the cart through to the session; without an ETag the copy is dropped instead."""
+    if tool_context is None:
+        return
+    if not etag:
+        forget(tool_context)
+        return
+    tool_context.state[CART_STATE_KEY] = {
+        "customer_id": customer_id,
+        "etag": etag,
+        "cart": {"items": copy.deepcopy(cart.get("items") or []), "subtotal": cart.get("subtotal", 0.0)},
+    }
+
+
+def forget(tool_context: Optional[ToolContext]):
+    if tool_context is not None and tool_context.state.get(CART_STATE_KEY):
+        tool_context.state[CART_STATE_KEY] = None
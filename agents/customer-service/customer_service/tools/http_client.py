@@ -0,0 +1,224 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Shared keep-alive HTTP client for calls from the agent tools (async_tools.py) to the storefront backend."""
+
+import asyncio
+import json
+import logging
+import threading
+import weakref
+
+import httpx
+
+from customer_service.tools import inprocess_transport
+from customer_service.tools.single_flight import AsyncSingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Defaults used when Config cannot be imported; see the BACKEND_HTTP_* fields in config.py.
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_RETRY_BACKOFF_SECS = 0.2
+DEFAULT_CONNECT_TIMEOUT_SECS = 3.05
+DEFAULT_READ_TIMEOUT_SECS = 5.0
+DEFAULT_SLOW_READ_TIMEOUT_SECS = 10.0
+
+# Transient statuses worth retrying; the backend answers 503 when its DB pool is exhausted.
+RETRY_STATUSES = (502, 503, 504)
+
+try:
+    from customer_service.config import Config
+    _configs = Config()
+    POOL_SIZE = _configs.BACKEND_HTTP_POOL_SIZE
+    MAX_RETRIES = _configs.BACKEND_HTTP_MAX_RETRIES
+    RETRY_BACKOFF_SECS = _configs.BACKEND_HTTP_RETRY_BACKOFF_SECS
+    CONNECT_TIMEOUT_SECS = _configs.BACKEND_HTTP_CONNECT_TIMEOUT_SECS
+    READ_TIMEOUT_SECS = _configs.BACKEND_HTTP_READ_TIMEOUT_SECS
+    SLOW_READ_TIMEOUT_SECS = _configs.BACKEND_HTTP_SLOW_READ_TIMEOUT_SECS
+    BACKEND_API_BASE_URL = _configs.BACKEND_API_BASE_URL
+    BACKEND_TRANSPORT = _configs.BACKEND_TRANSPORT
+except ImportError:
+    logger.error("Could not import Config from customer_service.config. Using default HTTP client settings.")
+    POOL_SIZE = DEFAULT_POOL_SIZE
+    MAX_RETRIES = DEFAULT_MAX_RETRIES
+    RETRY_BACKOFF_SECS = DEFAULT_RETRY_BACKOFF_SECS
+    CONNECT_TIMEOUT_SECS = DEFAULT_CONNECT_TIMEOUT_SECS
+    READ_TIMEOUT_SECS = DEFAULT_READ_TIMEOUT_SECS
+    SLOW_READ_TIMEOUT_SECS = DEFAULT_SLOW_READ_TIMEOUT_SECS
+    BACKEND_API_BASE_URL = "http://127.0.0.1:5000/api"
+    BACKEND_TRANSPORT = "http"
+
+# (connect, read) timeouts for ordinary backend calls and for the slower ones (search, checkout).
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT_SECS, READ_TIMEOUT_SECS)
+SLOW_TIMEOUT = (CONNECT_TIMEOUT_SECS, SLOW_READ_TIMEOUT_SECS)
+
+
+class _ConnectionCounters:
+    """Counts backend responses that came over a kept-alive connection versus a new one."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.new = 0
+
+    def record(self, reused: bool):
+        with self._lock:
+            if reused:
+                self.reused += 1
+            else:
+                self.new += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total = self.reused + self.new
+            return {
+                "requests": total,
+                "connections_reused": self.reused,
+                "connections_new": self.new,
+                "reuse_ratio": round(self.reused / total, 3) if total else 0.0,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.reused = 0
+            self.new = 0
+
+
+_counters = _ConnectionCounters()
+
+
+# Identical reads in flight at the same time (many sessions asking for the same
+# popular product at once) share one backend request; see single_flight.py.
+_async_reads = AsyncSingleFlight()
+
+
+def _read_key(method: str, url: str, kwargs: dict):
+    """Coalescing key for a read, or None if the call carries options that could make it differ."""
+    if {name for name, value in kwargs.items() if value is not None} - {"params", "json"}:
+        return None
+    return method, url, json.dumps([kwargs.get("params"), kwargs.get("json")], sort_keys=True, default=str)
+
+
+def stats() -> dict:
+    """Connection reuse and coalescing counters since startup or the last reset_stats()."""
+    return {
+        "pool_size": POOL_SIZE,
+        "max_retries": MAX_RETRIES,
+        **_counters.snapshot(),
+        "coalesced_reads": _async_reads.counters.snapshot()["shared"],
+    }
+
+
+def reset_stats():
+    _counters.reset()
+    _async_reads.counters.reset()
+
+
+_async_client = None
+_async_client_loop = None
+_async_streams_seen = weakref.WeakSet()
+
+
+async def _count_async_connection(response: httpx.Response):
+    """Response hook: a network stream seen before means the connection was kept alive and reused."""
+    stream = response.extensions.get("network_stream")
+    if stream is None:
+        return
+    _counters.record(reused=stream in _async_streams_seen)
+    _async_streams_seen.add(stream)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """The shared httpx.AsyncClient for the running event loop.
+
+    httpx connection pools are bound to the loop that opened them, so a new
+    client is created if the loop changes (e.g. between asyncio.run() calls).
+    The transport retries failed connects; async_get() also retries RETRY_STATUSES.
+    """
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop or _async_client.is_closed:
+        transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+            retries=MAX_RETRIES,
+        )
+        if BACKEND_TRANSPORT == "inprocess":
+            transport = inprocess_transport.InProcessAsyncTransport(
+                BACKEND_API_BASE_URL, transport, inprocess_transport.load_storefront())
+        _async_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(READ_TIMEOUT_SECS, connect=CONNECT_TIMEOUT_SECS),
+            transport=transport,
+            event_hooks={"response": [_count_async_connection]},
+        )
+        _async_client_loop = loop
+    return _async_client
+
+
+def async_timeout(timeout=DEFAULT_TIMEOUT) -> httpx.Timeout:
+    """Converts a (connect, read) tuple like SLOW_TIMEOUT into an httpx.Timeout."""
+    connect, read = timeout
+    return httpx.Timeout(read, connect=connect)
+
+
+async def _get_with_retries(url: str, **kwargs) -> httpx.Response:
+    """GET, retried up to MAX_RETRIES times on RETRY_STATUSES with exponential backoff.
+
+    The last response is returned either way, so raise_for_status() reports it.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        response = await get_async_client().get(url, **kwargs)
+        if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            return response
+        delay = RETRY_BACKOFF_SECS * 2 ** attempt
+        logger.warning(f"GET {url} returned {response.status_code}; retrying in {delay:.2f}s.")
+        await asyncio.sleep(delay)
+
+
+async def async_get(url: str, timeout=None, coalesce: bool = True, **kwargs) -> httpx.Response:
+    """GET through the shared async client; identical concurrent GETs share one request.
+
+    Pass coalesce=False for reads that must see every write that finished
+    before the call (the cart): a shared GET may have started before it.
+    Transient errors (RETRY_STATUSES) are retried; see _get_with_retries().
+    `timeout` is a (connect, read) tuple like SLOW_TIMEOUT; None uses the client default.
+    """
+    key = _read_key("GET", url, kwargs) if coalesce else None
+    if timeout is not None:
+        kwargs["timeout"] = async_timeout(timeout)
+    if key is None:
+        return await _get_with_retries(url, **kwargs)
+    return await _async_reads.do(key, lambda: _get_with_retries(url, **kwargs))
+
+
+async def async_post(url: str, timeout=None, coalesce: bool = False, **kwargs) -> httpx.Response:
+    """POST through the shared async client. POSTs are not retried.
+
+    Pass coalesce=True for read-only POSTs (batch lookups, search) to share one
+    request between identical concurrent calls. Never for writes.
+    """
+    key = _read_key("POST", url, kwargs) if coalesce else None
+    if timeout is not None:
+        kwargs["timeout"] = async_timeout(timeout)
+    if key is None:
+        return await get_async_client().post(url, **kwargs)
+    return await _async_reads.do(key, lambda: get_async_client().post(url, **kwargs))
+
+
+async def aclose():
+    """Closes the shared async client; streaming_server.py calls this on shutdown."""
+    global _async_client, _async_client_loop
+    if _async_client is not None:
+        await _async_client.aclose()
+    _async_client = None
+    _async_client_loop = None
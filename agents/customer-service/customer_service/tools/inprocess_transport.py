@@ -0,0 +1,114 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""In-process transport for the tools' HTTP client (BACKEND_TRANSPORT="inprocess").
+
+When the agent runs in the same process as the storefront backend, requests to
+BACKEND_API_BASE_URL are answered by calling the storefront service functions
+directly (storefront_local.py at the repository root) instead of going through
+a socket and Flask. Responses are real httpx responses, so the tools' status
+and error handling is unchanged; json() returns a copy of the
+service payload without a decode. The payload can be shared (coalesced reads,
+the catalog snapshot), so each json() call gets its own copy that the tools
+are free to modify. Routes the backend does not serve in process
+(e.g. the Retail API search) fall through to the network transport.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", ".."))
+
+
+def load_storefront():
+    """Imports storefront_local from the repository root (this also initializes the backend app)."""
+    if _REPO_ROOT not in sys.path:
+        sys.path.insert(0, _REPO_ROOT)
+    import storefront_local
+    return storefront_local
+
+
+def _route(url: str, base_url: str):
+    """(path, query pairs) for a URL under base_url, or None for any other URL."""
+    if not url.startswith(base_url):
+        return None
+    parts = urlsplit(url)
+    return unquote(parts.path), parse_qsl(parts.query, keep_blank_values=True)
+
+
+def _decode_body(body):
+    if not body:
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def _json_copy(value):
+    """A copy of a JSON-shaped value: new dicts and lists, shared strings and numbers."""
+    if isinstance(value, dict):
+        return {key: _json_copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_json_copy(item) for item in value]
+    return value
+
+
+class _InProcessHttpxResponse(httpx.Response):
+    """An httpx.Response carrying the service payload, so json() needs no decode.
+
+    httpx reads the body of every response it returns, so the payload is still
+    serialized here.
+    """
+
+    def __init__(self, status_code, payload, headers=None, request=None):
+        content = b"" if payload is None else json.dumps(payload).encode() # None: a bodyless 304
+        super().__init__(status_code, headers=headers, content=content, request=request)
+        self.payload = payload
+
+    def json(self, **kwargs):
+        return _json_copy(self.payload)
+
+
+class InProcessAsyncTransport(httpx.AsyncBaseTransport):
+    """httpx transport answering storefront API URLs in process.
+
+    Service calls may touch SQLite, so they run on a worker thread to keep the
+    event loop free.
+    """
+
+    def __init__(self, base_url: str, network_transport: httpx.AsyncBaseTransport, storefront_local):
+        self.base_url = base_url.rstrip("/")
+        self.network_transport = network_transport
+        self.storefront_local = storefront_local
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        route = _route(str(request.url), self.base_url)
+        if route is None or not self.storefront_local.handles(request.method, route[0]):
+            return await self.network_transport.handle_async_request(request)
+        path, params = route
+        body = _decode_body(await request.aread())
+        result = await asyncio.to_thread(self.storefront_local.call, request.method, path, params, body, request.headers)
+        headers = {"Content-Type": "application/json", **(result.headers or {})}
+        return _InProcessHttpxResponse(result.status, result.payload, headers=headers, request=request)
+
+    async def aclose(self):
+        await self.network_transport.aclose()
@@ -0,0 +1,135 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Process-wide LRU+TTL cache of product detail payloads for the agent tools."""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Defaults used when Config cannot be imported; see the PRODUCT_CACHE_* fields in config.py.
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_TTL_SECS = 300.0
+DEFAULT_STALE_SECS = 3600.0
+
+# Lookup outcomes returned by ProductCache.lookup().
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+class ProductCache:
+    """A bounded LRU of product detail payloads with a freshness TTL.
+
+    Entries younger than `ttl_secs` are served as fresh. For a further
+    `stale_secs` they are still served, but reported as STALE so the caller can
+    refresh them in the background (stale-while-revalidate); only after that
+    are they treated as missing. begin_refresh()/end_refresh() make sure a stale
+    product is refreshed by one caller at a time.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_secs=DEFAULT_TTL_SECS, stale_secs=DEFAULT_STALE_SECS):
+        if max_entries < 1:
+            raise ValueError("Product cache must hold at least one entry.")
+        self.max_entries = max_entries
+        self.ttl_secs = ttl_secs
+        self.stale_secs = stale_secs
+        self._entries = OrderedDict() # product_id -> (stored_at, payload), least recently used first
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._refreshes = 0
+        self._refresh_failures = 0
+
+    def lookup(self, product_id: str) -> tuple[Optional[dict], str]:
+        """Returns (payload, FRESH | STALE) for a cached product, or (None, MISS)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(product_id)
+            if entry is not None:
+                stored_at, payload = entry
+                age = now - stored_at
+                if age <= self.ttl_secs:
+                    self._entries.move_to_end(product_id)
+                    self._hits += 1
+                    return payload, FRESH
+                if age <= self.ttl_secs + self.stale_secs:
+                    self._entries.move_to_end(product_id)
+                    self._stale_hits += 1
+                    return payload, STALE
+                del self._entries[product_id]
+            self._misses += 1
+            return None, MISS
+
+    def put(self, product_id: str, payload: dict):
+        with self._lock:
+            self._entries[product_id] = (time.monotonic(), payload)
+            self._entries.move_to_end(product_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def begin_refresh(self, product_ids: list[str]) -> list[str]:
+        """Claims the ids no other caller is already refreshing; pass them to end_refresh() when done."""
+        with self._lock:
+            claimed = [product_id for product_id in product_ids if product_id not in self._refreshing]
+            self._refreshing.update(claimed)
+            self._refreshes += len(claimed)
+            return claimed
+
+    def end_refresh(self, product_ids: list[str], failed_ids=()):
+        with self._lock:
+            self._refreshing.difference_update(product_ids)
+            self._refresh_failures += len(failed_ids)
+        if failed_ids:
+            logger.warning(f"Background refresh failed for cached products {list(failed_ids)}; still serving stale copies.")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters since startup."""
+        with self._lock:
+            lookups = self._hits + self._stale_hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "stale_hits": self._stale_hits,
+                "misses": self._misses,
+                "hit_ratio": round((self._hits + self._stale_hits) / lookups, 3) if lookups else 0.0,
+                "evictions": self._evictions,
+                "refreshes": self._refreshes,
+                "refresh_failures": self._refresh_failures,
+            }
+
+
+try:
+    from customer_service.config import Config
+    _configs = Config()
+    product_cache = ProductCache(
+        max_entries=_configs.PRODUCT_CACHE_MAX_ENTRIES,
+        ttl_secs=_configs.PRODUCT_CACHE_TTL_SECS,
+        stale_secs=_configs.PRODUCT_CACHE_STALE_SECS,
+    )
+except ImportError:
+    logger.error("Could not import Config from customer_service.config. Using default product cache settings.")
+    product_cache = ProductCache()
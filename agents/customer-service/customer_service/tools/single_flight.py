@@ -0,0 +1,125 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Request coalescing ("single-flight") for identical concurrent backend reads.
+
+While a call for a key is in flight, further calls with the same key do not
+start their own; they wait for the first one and get its result (or its
+exception). Nothing is kept once the call finishes, so this is not a cache:
+a caller arriving after completion starts a new call. The result object is
+shared between the callers, so they must treat it as read-only.
+
+The storefront backend uses these classes too (single_flight.py at the
+repository root loads this file), for its SQLite read endpoints.
+"""
+
+import asyncio
+import threading
+
+
+class _Counters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.shared = 0
+
+    def record(self, shared: bool):
+        with self._lock:
+            if shared:
+                self.shared += 1
+            else:
+                self.executions += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"executions": self.executions, "shared": self.shared}
+
+    def reset(self):
+        with self._lock:
+            self.executions = 0
+            self.shared = 0
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls made from different threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.counters = _Counters()
+
+    def do(self, key, fn):
+        """Returns fn(), or the result of the identical call already in flight for `key`."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        self.counters.record(shared=not leader)
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        return self.counters.snapshot()
+
+
+class AsyncSingleFlight:
+    """Coalesces identical concurrent calls made from coroutines.
+
+    The shared call runs as its own task, so a waiter that is cancelled (e.g. by
+    a deadline) does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self.counters = _Counters()
+
+    async def do(self, key, coro_fn):
+        """Returns await coro_fn(), or the result of the identical call already in flight for `key`."""
+        task = self._tasks.get(key)
+        # Tasks are bound to their loop; one left behind by a closed loop is never shared.
+        leader = task is None or task.get_loop() is not asyncio.get_running_loop()
+        if leader:
+            task = self._tasks[key] = asyncio.ensure_future(coro_fn())
+            task.add_done_callback(lambda done: self._forget(key, done))
+        self.counters.record(shared=not leader)
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception() # Retrieved here too, in case every waiter was cancelled
+
+    def stats(self) -> dict:
+        return self.counters.snapshot()
@@ -48,16 +48,33 @@ else:
 
 CUSTOMER_SERVICE_AGENT_LOADED = False
 customer_service_agent = None
+model_rate_limiter = None
+model_admission = None
+tracing = None
+customer_repository = None
+profile_savings = None
+backend_http = None
+CUSTOMER_PRELOAD_IDS = []
 ADK_MODEL_ID = None
+SERVE_STOREFRONT_API = False
 
 logger.info("[DIAG_TIME] Starting agent import block...")
 _agent_load_start_time = time.perf_counter()
 try:
     from customer_service.agent import root_agent as imported_agent
     from customer_service.config import Config as CustomerServiceConfig
+    from customer_service.shared_libraries.response_shaping import full_response as full_tool_response
+    from customer_service.shared_libraries.rate_limiter import limiter as model_rate_limiter
+    from customer_service.shared_libraries.admission import scheduler as model_admission
+    from customer_service.shared_libraries import tracing
+    from customer_service.entities.customer_repository import repository as customer_repository
+    from customer_service.shared_libraries.profile_cache import savings as profile_savings
+    from customer_service.tools import http_client as backend_http
 
     customer_service_agent = imported_agent
     cfg = CustomerServiceConfig()
+    SERVE_STOREFRONT_API = cfg.SERVE_STOREFRONT_API
+    CUSTOMER_PRELOAD_IDS = cfg.CUSTOMER_PRELOAD_IDS
     ADK_MODEL_ID = getattr(getattr(cfg, "agent_settings", object()), "model", None)
     if not ADK_MODEL_ID: 
         ADK_MODEL_ID = getattr(cfg, "ADK_MODEL_ID", None)
@@ -147,6 +164,21 @@ async def start_agent_session(session_id: str, is_audio: bool):
     logger.info(f"[DIAG_TIME] Exit start_agent_session for session_id: {session_id}. Total time: {_sas_end_time - _sas_start_time:.4f} seconds.")
     return live_events, live_request_queue
 
+def _tool_response(server_content):
+    """The full response of a tool result event, or None for other events.
+
+    The model gets a cut-down copy of some tool responses (see
+    response_shaping.py); the UI handlers below need the full one.
+    """
+    if isinstance(server_content, dict):
+        return server_content
+    parts = getattr(server_content, 'parts', None)
+    function_response = getattr(parts[0], 'function_response', None) if parts else None
+    if function_response is None:
+        return None
+    response = full_tool_response(function_response)
+    return response if isinstance(response, dict) else None
+
 # Rewritten agent_to_client_messaging based on ADK documentation
 async def agent_to_client_messaging(ws: WebSocket, events_iter: any, session_id: str):
     logger.info(f"[DIAG_LOG S2C] Start agent_to_client_messaging for session: {session_id}, events_iter_id: {id(events_iter)}")
@@ -179,17 +211,13 @@ async def agent_to_client_messaging(ws: WebSocket, events_iter: any, session_id:
                 logger.info(f"[DIAG_LOG S2C {session_id}] Event has no server_content. Skipping.")
                 continue
             
+            tool_response_dict = _tool_response(server_content)
+
             # --- Start: Preserve existing non-voice command handling ---
             # Check for theme change instruction (Example of preserving custom logic)
             theme_action_details = None
-            if isinstance(server_content, dict) and server_content.get("action") == "set_theme":
-                theme_action_details = server_content
-            elif hasattr(server_content, 'parts') and server_content.parts and \
-                 hasattr(server_content.parts[0], 'function_response') and \
-                 hasattr(server_content.parts[0].function_response, 'response') and \
-                 isinstance(server_content.parts[0].function_response.response, dict) and \
-                 server_content.parts[0].function_response.response.get("action") == "set_theme":
-                theme_action_details = server_content.parts[0].function_response.response
+            if tool_response_dict is not None and tool_response_dict.get("action") == "set_theme":
+                theme_action_details = tool_response_dict
             
             if theme_action_details:
                 theme_value = theme_action_details.get("theme")
@@ -203,30 +231,24 @@ async def agent_to_client_messaging(ws: WebSocket, events_iter: any, session_id:
             
             # Check for cart refresh instruction
             cart_refresh_action = None
-            if isinstance(server_content, dict) and server_content.get("action") == "refresh_cart":
-                cart_refresh_action = True
-            elif hasattr(server_content, 'parts') and server_content.parts and \
-                 hasattr(server_content.parts[0], 'function_response') and \
-                 hasattr(server_content.parts[0].function_response, 'response') and \
-                 isinstance(server_content.parts[0].function_response.response, dict) and \
-                 server_content.parts[0].function_response.response.get("action") == "refresh_cart":
-                cart_refresh_action = True
+            if tool_response_dict is not None and tool_response_dict.get("action") == "refresh_cart":
+                cart_refresh_action = tool_response_dict
 
             if cart_refresh_action:
                 logger.info(f"[DIAG_LOG S2C {session_id}] Handling 'refresh_cart'")
-                await ws.send_json({"type": "command", "command_name": "refresh_cart"})
+                refresh_payload = {}
+                if cart_refresh_action.get("added_item"):
+                    refresh_payload["added_item"] = cart_refresh_action["added_item"]
+                if isinstance(cart_refresh_action.get("items"), list):
+                    # modify_cart already returned the updated cart; the page can render it without refetching.
+                    refresh_payload["cart"] = {"items": cart_refresh_action["items"], "subtotal": cart_refresh_action.get("subtotal", 0.0)}
+                await ws.send_json({"type": "command", "command_name": "refresh_cart", "payload": refresh_payload})
                 continue
 
             # Product recommendations
             product_recommendation_dict = None
-            if hasattr(server_content, 'parts') and server_content.parts and \
-               hasattr(server_content.parts[0], 'function_response') and \
-               hasattr(server_content.parts[0].function_response, 'response') and \
-               isinstance(server_content.parts[0].function_response.response, dict) and \
-               server_content.parts[0].function_response.response.get("type") == "product_recommendations":
-                product_recommendation_dict = server_content.parts[0].function_response.response
-            elif isinstance(server_content, dict) and server_content.get("type") == "product_recommendations":
-                 product_recommendation_dict = server_content
+            if tool_response_dict is not None and tool_response_dict.get("type") == "product_recommendations":
+                product_recommendation_dict = tool_response_dict
             
             if product_recommendation_dict:
                 logger.info(f"[DIAG_LOG S2C {session_id}] Handling 'product_recommendations'")
@@ -239,12 +261,7 @@ async def agent_to_client_messaging(ws: WebSocket, events_iter: any, session_id:
             
             # New handler for direct tool responses that are UI commands
             direct_ui_command_payload = None
-            if hasattr(server_content, 'parts') and server_content.parts and \
-               hasattr(server_content.parts[0], 'function_response') and \
-               hasattr(server_content.parts[0].function_response, 'response') and \
-               isinstance(server_content.parts[0].function_response.response, dict):
-                
-                tool_response_dict = server_content.parts[0].function_response.response
+            if tool_response_dict is not None and not isinstance(server_content, dict):
 
                 # Handle 'show_checkout_ui' action
                 if tool_response_dict.get("action") == "show_checkout_ui":
@@ -563,6 +580,75 @@ async def client_to_agent_messaging(ws: WebSocket, queue_to_agent: LiveRequestQu
         logger.info(f"[DIAG_LOG C2S] Client messaging finished for session: {session_id}")
 
 
+@app.on_event("startup")
+async def preload_customers():
+    """Hydrates the customer profiles sessions are expected to use, off the event loop."""
+    if customer_repository is None or not CUSTOMER_PRELOAD_IDS:
+        return
+    try:
+        found = await asyncio.to_thread(customer_repository.preload, CUSTOMER_PRELOAD_IDS)
+        logger.info(f"Preloaded {found} of {len(CUSTOMER_PRELOAD_IDS)} customer profiles.")
+    except Exception as e:
+        logger.error(f"Could not preload customer profiles: {e}", exc_info=True)
+
+
+@app.on_event("shutdown")
+async def close_backend_http_client():
+    """Closes the tools' keep-alive connections to the storefront backend."""
+    if backend_http is None:
+        return
+    await backend_http.aclose()
+
+
+@app.get("/stats/customers")
+async def customer_stats():
+    """Customer profile cache (hits, misses, invalidations, size) and the compact profile encoding's savings."""
+    if customer_repository is None:
+        return {"error": "Agent not loaded."}
+    return {**customer_repository.stats(), "profile_encoding": profile_savings.snapshot()}
+
+
+@app.get("/stats/rate-limit")
+async def rate_limit_stats():
+    """Model call throttling: totals, queue waits, and the remaining quota per session and model."""
+    if model_rate_limiter is None:
+        return {"error": "Agent not loaded."}
+    return model_rate_limiter.stats()
+
+
+@app.get("/stats/backend-http")
+async def backend_http_stats():
+    """Tool calls to the storefront backend: connection reuse and coalesced identical reads."""
+    if backend_http is None:
+        return {"error": "Agent not loaded."}
+    return backend_http.stats()
+
+
+@app.get("/stats/admission")
+async def admission_stats():
+    """Process-wide model call queue: depth and waits per class (checkout, browsing) and the remaining budget."""
+    if model_admission is None:
+        return {"error": "Agent not loaded."}
+    return model_admission.stats()
+
+
+@app.get("/debug/traces")
+async def get_traces(limit: int = 100, kind: str = None, session_id: str = None):
+    """The most recent diagnostic traces (model requests, tool calls, agent input), oldest first."""
+    if tracing is None:
+        return {"error": "Agent not loaded."}
+    return {"status": tracing.status(), "traces": tracing.recent(limit=limit, kind=kind, session_id=session_id)}
+
+
+@app.post("/debug/traces")
+async def configure_traces(enabled: bool, sample_rate: float = None, buffer_size: int = None):
+    """Switches tracing on or off without a restart."""
+    if tracing is None:
+        return {"error": "Agent not loaded."}
+    tracing.configure(enabled, sample_rate=sample_rate, buffer_size=buffer_size)
+    return tracing.status()
+
+
 @app.websocket("/ws/agent_stream/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str, is_audio: bool = False):
     _ws_endpoint_start_time = time.perf_counter()
@@ -597,6 +683,16 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str, is_audio: bo
         _ws_call_sas_end_time = time.perf_counter()
         logger.info(f"[DIAG_TIME] Agent session started successfully for session_id: {session_id}. Call took: {_ws_call_sas_end_time - _ws_call_sas_start_time:.4f} seconds. Events_iter_id: {id(live_events_iterator)}, Queue_id: {id(agent_send_queue)}")
 
+        if model_rate_limiter is not None:
+            async def notify_throttled(wait_secs: float, model: str):
+                logger.info(f"[DIAG_LOG S2C {session_id}] Model calls throttled for {wait_secs:.1f}s ({model}).")
+                await websocket.send_json({
+                    "type": "command",
+                    "command_name": "rate_limited",
+                    "payload": {"retry_after_secs": round(wait_secs, 1)},
+                })
+            model_rate_limiter.add_throttle_listener(session_id, notify_throttled)
+
         agent_task_name = f"agent_to_client_{session_id}_{id(live_events_iterator)}"
         agent_task = asyncio.create_task(agent_to_client_messaging(websocket, live_events_iterator, session_id))
         agent_task.set_name(agent_task_name)
@@ -658,6 +754,9 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str, is_audio: bo
         if tasks_to_clean:
             await asyncio.gather(*tasks_to_clean, return_exceptions=True)
         
+        if model_rate_limiter is not None:
+            model_rate_limiter.forget_session(session_id)
+
         if agent_send_queue: # ADK LiveRequestQueue doesn't have an explicit close in examples
             logger.debug(f"LiveRequestQueue for session {session_id} cleanup considered (managed by ADK runner).")
 
@@ -669,6 +768,17 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str, is_audio: bo
                 logger.error(f"Error closing WebSocket for session {session_id} in finally: {e_close}", exc_info=True)
         logger.info(f"WebSocket endpoint for session {session_id} fully cleaned up.")
 
+# Optionally serve the storefront API and pages from this process, so agent tools,
+# the API and the WebSocket share one event loop. Mounted last: it installs a
+# catch-all for the routes that only the Flask app implements.
+if SERVE_STOREFRONT_API:
+    import sys
+    _repo_root = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+    if _repo_root not in sys.path:
+        sys.path.insert(0, _repo_root)
+    from storefront_asgi import mount_storefront
+    mount_storefront(app)
+
 if __name__ == "__main__":
     import uvicorn
     logger.info("Starting Uvicorn server for streaming_server.py")
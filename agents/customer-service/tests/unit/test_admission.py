@@ -0,0 +1,103 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+from unittest import mock
+
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from customer_service.shared_libraries import admission
+from customer_service.shared_libraries.admission import (
+    BROWSING, CHECKOUT, CHECKOUT_STATE_KEY, CHECKOUT_TTL_SECS, AdmissionScheduler, TokenEstimator,
+    estimate_tokens, priority_for,
+)
+
+
+def test_checkout_goes_first_and_sessions_take_turns():
+    # 100 tokens per second, no request limit: each 50-token call waits ~0.5s for budget.
+    scheduler = AdmissionScheduler(rpm=0, tpm=6000)
+    order = []
+
+    async def call(session_id, priority, tag):
+        await scheduler.admit(session_id, priority, tokens=50)
+        order.append(tag)
+
+    async def run():
+        await scheduler.admit("warmup", tokens=6000) # Spend the whole budget
+        browsing = [
+            asyncio.create_task(call("a", BROWSING, "a1")),
+            asyncio.create_task(call("a", BROWSING, "a2")),
+            asyncio.create_task(call("b", BROWSING, "b1")),
+        ]
+        await asyncio.sleep(0.1)
+        depth = scheduler.stats()["queue_depth"]
+        await asyncio.gather(call("c", CHECKOUT, "c1"), *browsing)
+        return depth
+
+    depth_while_queued = asyncio.run(run())
+
+    assert depth_while_queued == {CHECKOUT: 0, BROWSING: 3}
+    assert order == ["c1", "a1", "b1", "a2"]
+    stats = scheduler.stats()
+    assert stats["queue_depth"] == {CHECKOUT: 0, BROWSING: 0}
+    assert stats["admitted"][CHECKOUT]["admitted"] == 1
+    assert stats["admitted"][BROWSING]["admitted"] == 4
+    assert stats["admitted"][CHECKOUT]["max_wait_secs"] < stats["admitted"][BROWSING]["max_wait_secs"]
+
+
+def test_cancelled_call_leaves_the_queue():
+    scheduler = AdmissionScheduler(rpm=60, tpm=0)
+
+    async def run():
+        for _ in range(60):
+            await scheduler.admit("a")
+        waiter = asyncio.create_task(scheduler.admit("a"))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+    asyncio.run(run())
+    assert scheduler.stats()["queue_depth"][BROWSING] == 0
+
+
+def test_checkout_priority_expires():
+    started = 1_000_000.0
+    state = {CHECKOUT_STATE_KEY: started}
+    assert priority_for(state, now=started + 1) == CHECKOUT
+    # An abandoned checkout goes back to browsing instead of keeping priority for good.
+    assert priority_for(state, now=started + CHECKOUT_TTL_SECS) == BROWSING
+    assert priority_for({CHECKOUT_STATE_KEY: None}) == BROWSING
+    assert priority_for({CHECKOUT_STATE_KEY: True}) == BROWSING
+    assert priority_for({}) == BROWSING
+
+
+def test_token_estimate_only_measures_new_history():
+    def request(*texts):
+        return LlmRequest(contents=[types.Content(role="user", parts=[types.Part(text=text)]) for text in texts])
+
+    estimator = TokenEstimator()
+    history = ["a" * 400, "b" * 800]
+    assert estimator.estimate("s", request(*history)) == estimate_tokens(request(*history))
+
+    grown = request(*history, "c" * 40)
+    expected = estimate_tokens(grown)
+    with mock.patch.object(admission, "_content_chars", wraps=admission._content_chars) as measured:
+        assert estimator.estimate("s", grown) == expected
+    # The new content, plus the last counted one to check the history still matches.
+    assert measured.call_count == 2
+
+    # A rewritten history is counted again from the start.
+    rewritten = request("d" * 4)
+    assert estimator.estimate("s", rewritten) == estimate_tokens(rewritten)
@@ -0,0 +1,252 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+from customer_service.tools import async_tools, cart_state, http_client, tools
+from customer_service.tools.product_cache import ProductCache
+
+
+def _product(product_id):
+    if product_id == "SKU_SLOW":
+        time.sleep(1.0)
+    return {"id": product_id, "name": f"Product {product_id}", "price": 4.5, "image_url": f"/static/{product_id}.png"}
+
+
+class _Backend(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive
+    batch_supported = True
+    cart_etag = '"1.1"'
+    cart_requests = []
+
+    def do_GET(self):
+        if self.path.startswith("/api/cart/"):
+            _Backend.cart_requests.append(self.headers.get("If-None-Match"))
+            if self.headers.get("If-None-Match") == _Backend.cart_etag:
+                self._reply(304, None, {"ETag": _Backend.cart_etag})
+            else:
+                self._reply(200, {"items": [{"product_id": "SKU_1", "quantity": 2}], "subtotal": 9.5}, {"ETag": _Backend.cart_etag})
+        elif self.path.startswith("/api/products/SKU_") and self.path != "/api/products/SKU_MISSING":
+            self._reply(200, _product(self.path.rsplit("/", 1)[1]))
+        else:
+            self._reply(404, {"error": "Product not found"})
+
+    def do_POST(self):
+        data = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.path == "/api/products/batch" and _Backend.batch_supported:
+            ids = data["ids"]
+            self._reply(200, {"products": [_product(i) for i in ids if i != "SKU_MISSING"],
+                              "missing_ids": [i for i in ids if i == "SKU_MISSING"]})
+        elif self.path == "/api/products/batch":
+            self._reply(405, {"error": "Method Not Allowed"})
+        elif self.path.startswith("/api/cart/modify/"):
+            line = {"product_id": "SKU_1", "name": "Product SKU_1", "quantity": 2, "price_per_unit": 4.5,
+                    "item_total": 9.0, "image_url": "static/SKU_1.png"}
+            self._reply(200, {"status": "success", "message": "Cart updated.", "items_added": True,
+                              "items_removed": False, "items": [line], "subtotal": 9.0}, {"ETag": '"2.1"'})
+        elif self.path == "/api/checkout/place_order":
+            self._reply(409, {"message": "Insufficient stock.", "failed_items": [{"product_id": "SKU_1", "error": "insufficient_stock"}]})
+        else:
+            self._reply(404, {"error": "Not found"})
+
+    def _reply(self, status, payload, headers=None):
+        body = b"" if payload is None else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass # The client gave up on a straggler
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def empty_product_cache(monkeypatch):
+    cache = ProductCache()
+    monkeypatch.setattr(tools, "product_cache", cache)
+    monkeypatch.setattr(async_tools, "product_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Backend)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(async_tools, "BACKEND_API_BASE_URL", f"http://127.0.0.1:{server.server_port}/api")
+    monkeypatch.setattr(_Backend, "cart_requests", [])
+    http_client.reset_stats()
+    yield
+    server.shutdown()
+    server.server_close()
+
+
+def test_cart_calls_share_a_connection(backend):
+    async def run():
+        first = await async_tools.access_cart_information("cust_1")
+        second = await async_tools.access_cart_information("cust_1")
+        await http_client.aclose()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second == {"items": [{"product_id": "SKU_1", "quantity": 2}], "subtotal": 9.5}
+    assert http_client.stats()["connections_reused"] == 1
+
+
+def test_modify_cart_builds_added_item_from_returned_lines(backend):
+    async def run():
+        try:
+            return await async_tools.modify_cart("cust_1", [{"product_id": "SKU_1", "quantity": 2}], [])
+        finally:
+            await http_client.aclose()
+
+    result = asyncio.run(run())
+    assert result["action"] == "refresh_cart"
+    assert result["added_item"] == {"product_id": "SKU_1", "name": "Product SKU_1", "image_url": "static/SKU_1.png"}
+    assert result["subtotal"] == 9.0
+    assert http_client.stats()["requests"] == 1 # No follow-up product lookup
+
+
+def test_cart_reads_revalidate_the_session_copy(backend):
+    tool_context = SimpleNamespace(state={})
+
+    async def run():
+        try:
+            first = await async_tools.access_cart_information("cust_1", tool_context=tool_context)
+            checkout = await async_tools.initiate_checkout_ui("cust_1", tool_context=tool_context)
+            return first, checkout
+        finally:
+            await http_client.aclose()
+
+    first, checkout = asyncio.run(run())
+    assert checkout["cart_data"] == first
+    assert _Backend.cart_requests == [None, '"1.1"'] # The second read was answered with a bodyless 304
+    assert tool_context.state[cart_state.CART_STATE_KEY]["etag"] == '"1.1"'
+
+
+def test_modify_cart_writes_the_cart_through(backend, monkeypatch):
+    tool_context = SimpleNamespace(state={})
+    monkeypatch.setattr(_Backend, "cart_etag", '"2.1"') # The version the modify response reported
+
+    async def run():
+        try:
+            await async_tools.modify_cart("cust_1", [{"product_id": "SKU_1", "quantity": 2}], [], tool_context=tool_context)
+            return await async_tools.access_cart_information("cust_1", tool_context=tool_context)
+        finally:
+            await http_client.aclose()
+
+    cart = asyncio.run(run())
+    assert cart["subtotal"] == 9.0
+    assert cart["items"][0]["name"] == "Product SKU_1"
+    assert _Backend.cart_requests == ['"2.1"']
+
+
+def test_checkout_conflict_reports_failed_items(backend):
+    async def run():
+        try:
+            return await async_tools.submit_order_and_clear_cart("cust_1", [{"product_id": "SKU_1", "quantity": 99}], {}, 1.0)
+        finally:
+            await http_client.aclose()
+
+    result = asyncio.run(run())
+    assert result["status"] == "error"
+    assert result["failed_items"][0]["error"] == "insufficient_stock"
+
+
+def test_recommendations_return_what_resolved_by_the_deadline(backend, monkeypatch):
+    monkeypatch.setattr(async_tools, "RECOMMENDATION_BATCH_SIZE", 1) # One request per id
+    monkeypatch.setattr(async_tools, "RECOMMENDATION_DEADLINE_SECS", 0.5)
+
+    async def run():
+        try:
+            return await async_tools.get_product_recommendations(["SKU_SLOW", "SKU_1", "SKU_MISSING", "SKU_2"], "cust_1")
+        finally:
+            await http_client.aclose()
+
+    started = time.perf_counter()
+    result = asyncio.run(run())
+    assert time.perf_counter() - started < 0.9
+    assert [r["id"] for r in result["recommendations"]] == ["SKU_1", "SKU_2"]
+    errors = {e["product_id"]: e for e in result["errors_fetching_recommendations"]}
+    assert errors["SKU_MISSING"]["status_code"] == 404
+    assert "within 0.5s" in errors["SKU_SLOW"]["error"]
+
+
+def test_recommendations_without_batch_endpoint(backend, monkeypatch):
+    monkeypatch.setattr(_Backend, "batch_supported", False)
+    monkeypatch.setitem(async_tools._backend_features, "products_batch", True)
+
+    async def run():
+        try:
+            return await async_tools.get_product_recommendations(["SKU_1", "SKU_MISSING", "SKU_2"], "cust_1")
+        finally:
+            await http_client.aclose()
+
+    result = asyncio.run(run())
+    assert async_tools._backend_features["products_batch"] is False
+    assert [r["formatted_price"] for r in result["recommendations"]] == ["$4.50", "$4.50"]
+    assert result["errors_fetching_recommendations"][0]["product_id"] == "SKU_MISSING"
+
+    # Served from the product cache, in request order.
+    result = asyncio.run(async_tools.get_product_recommendations(["SKU_2", "SKU_1"], "cust_1"))
+    assert [r["id"] for r in result["recommendations"]] == ["SKU_2", "SKU_1"]
+    assert result["errors_fetching_recommendations"] is None
+
+
+def test_stale_products_are_served_while_backend_is_down(monkeypatch):
+    cache = ProductCache(ttl_secs=0.0)
+    monkeypatch.setattr(tools, "product_cache", cache)
+    monkeypatch.setattr(async_tools, "product_cache", cache)
+    monkeypatch.setattr(async_tools, "BACKEND_API_BASE_URL", "http://127.0.0.1:9/api")
+    cache.put("SKU_1", {"id": "SKU_1", "name": "Cached", "price": 2.0})
+
+    async def run():
+        try:
+            result = await async_tools.get_product_recommendations(["SKU_1"], "cust_1")
+            await asyncio.gather(*async_tools._refresh_tasks)
+            return result
+        finally:
+            await http_client.aclose()
+
+    result = asyncio.run(run())
+    assert result["recommendations"][0]["name"] == "Cached"
+    stats = cache.stats()
+    assert stats["stale_hits"] == 1
+    assert stats["refreshes"] == 1
+    assert stats["refresh_failures"] == 1
+
+
+def test_unreachable_backend(monkeypatch):
+    monkeypatch.setattr(async_tools, "BACKEND_API_BASE_URL", "http://127.0.0.1:9/api")
+
+    async def run():
+        try:
+            return await async_tools.check_product_availability("SKU_1", "pickup")
+        finally:
+            await http_client.aclose()
+
+    result = asyncio.run(run())
+    assert result["available"] is False
+    assert result["error"] == "Failed to connect to availability service."
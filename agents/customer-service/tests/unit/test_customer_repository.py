@@ -0,0 +1,114 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import importlib.util
+import pathlib
+import sqlite3
+
+import pytest
+from customer_service.entities.customer import Customer
+from customer_service.entities.customer_repository import CustomerRepository
+
+
+# The customer tables are created by the storefront's database_setup.py, at the repository root.
+_DATABASE_SETUP = pathlib.Path(__file__).resolve().parents[4] / "database_setup.py"
+
+
+def _create_customer_tables(db_path):
+    spec = importlib.util.spec_from_file_location("database_setup", _DATABASE_SETUP)
+    database_setup = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(database_setup)
+    conn = sqlite3.connect(db_path)
+    database_setup.create_customer_tables(conn.cursor())
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def repository(tmp_path):
+    db_path = str(tmp_path / "customers.db")
+    _create_customer_tables(db_path)
+    repo = CustomerRepository(db_path=db_path, max_entries=100)
+    yield repo
+    repo.close()
+
+
+def test_saved_profile_round_trips_and_is_cached(repository):
+    demo = Customer.demo_customer("123")
+    repository.save(demo)
+
+    loaded = repository.get("123")
+    assert loaded.model_dump() == demo.model_dump()
+    assert repository.get("123") is loaded
+    assert repository.get("missing") is None
+    assert (repository.stats()["hits"], repository.stats()["misses"]) == (1, 1)
+
+
+def test_updates_invalidate_the_cached_profile(repository):
+    repository.save(Customer.demo_customer("123"))
+    repository.get("123")
+
+    # A write from another connection (another process, the import script) bumps the version.
+    other = sqlite3.connect(repository.db_path)
+    other.execute("UPDATE customers SET loyalty_points = 500 WHERE customer_id = '123'")
+    other.execute("UPDATE garden_profiles SET interests = '[\"herbs\"]' WHERE customer_id = '123'")
+    other.commit()
+    other.close()
+    updated = repository.get("123")
+    assert updated.loyalty_points == 500
+    assert updated.garden_profile.interests == ["herbs"]
+
+    changed = updated.model_copy(update={"preferred_store": "Downtown"})
+    repository.save(changed)
+    assert repository.get("123").preferred_store == "Downtown"
+    assert repository.stats()["invalidations"] >= 1
+
+
+def test_missing_database_is_not_created(tmp_path):
+    db_path = tmp_path / "absent.db"
+    repo = CustomerRepository(db_path=str(db_path))
+    with pytest.raises(sqlite3.Error):
+        repo.get("123")
+    assert not db_path.exists()
+
+
+def test_preload_fills_the_bounded_cache(repository):
+    template = Customer.demo_customer("0")
+    repository.save(template)
+    conn = sqlite3.connect(repository.db_path)
+    ids = [f"C{i:03d}" for i in range(300)]
+    conn.executemany(
+        """INSERT INTO customers (customer_id, account_number, first_name, last_name, email, phone_number,
+               customer_start_date, years_as_customer, loyalty_points, preferred_store)
+           SELECT ?, account_number, first_name, last_name, email, phone_number,
+               customer_start_date, years_as_customer, loyalty_points, preferred_store FROM customers WHERE customer_id = '0'""",
+        [(customer_id,) for customer_id in ids],
+    )
+    conn.executemany(
+        "INSERT INTO customer_addresses SELECT ?, kind, street, city, state, zip FROM customer_addresses WHERE customer_id = '0'",
+        [(customer_id,) for customer_id in ids],
+    )
+    conn.executemany(
+        "INSERT INTO garden_profiles SELECT ?, type, size, sun_exposure, soil_type, interests FROM garden_profiles WHERE customer_id = '0'",
+        [(customer_id,) for customer_id in ids],
+    )
+    conn.commit()
+    conn.close()
+
+    assert repository.get(ids[-1]).customer_id == ids[-1]
+    assert repository.preload(ids) == 300
+    assert repository.stats()["size"] == 100 # Bounded LRU
+    misses = repository.stats()["misses"]
+    assert repository.get(ids[-1]) is not None
+    assert repository.stats()["misses"] == misses # Preloaded, so a hit
@@ -0,0 +1,120 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from customer_service.tools import http_client
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive
+    unavailable_left = 0
+    slow_hits = 0
+
+    def do_GET(self):
+        if self.path == "/slow":
+            _Handler.slow_hits += 1
+            time.sleep(0.3)
+            self._reply(200, {"path": self.path})
+        elif self.path == "/flaky" and _Handler.unavailable_left > 0:
+            _Handler.unavailable_left -= 1
+            self._reply(503, {"error": "Service Unavailable"})
+        else:
+            self._reply(200, {"path": self.path})
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    http_client.reset_stats()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def _run(coro_fn):
+    """Runs coro_fn() and closes the shared client, whose pool is bound to this loop."""
+    async def run():
+        try:
+            return await coro_fn()
+        finally:
+            await http_client.aclose()
+    return asyncio.run(run())
+
+
+def test_connections_are_reused(base_url):
+    async def get_all():
+        return [await http_client.async_get(f"{base_url}/item/{i}") for i in range(3)]
+
+    responses = _run(get_all)
+    assert [r.json() for r in responses] == [{"path": f"/item/{i}"} for i in range(3)]
+    stats = http_client.stats()
+    assert stats["connections_new"] == 1
+    assert stats["connections_reused"] == 2
+
+
+def test_transient_errors_are_retried(base_url, monkeypatch):
+    monkeypatch.setattr(http_client, "RETRY_BACKOFF_SECS", 0.01)
+    monkeypatch.setattr(_Handler, "unavailable_left", 1)
+    response = _run(lambda: http_client.async_get(f"{base_url}/flaky"))
+    assert response.status_code == 200
+
+    # Once the retries are used up, the last response is handed back.
+    monkeypatch.setattr(_Handler, "unavailable_left", http_client.MAX_RETRIES + 1)
+    response = _run(lambda: http_client.async_get(f"{base_url}/flaky"))
+    assert response.status_code == 503
+
+
+def test_identical_concurrent_gets_share_one_request(base_url, monkeypatch):
+    monkeypatch.setattr(_Handler, "slow_hits", 0)
+
+    async def get_slow():
+        return await asyncio.gather(*(http_client.async_get(f"{base_url}/slow") for _ in range(5)))
+
+    responses = _run(get_slow)
+    assert [r.json() for r in responses] == [{"path": "/slow"}] * 5
+    assert _Handler.slow_hits == 1
+    assert http_client.stats()["coalesced_reads"] == 4
+
+    _run(lambda: http_client.async_get(f"{base_url}/slow")) # Nothing is cached once the request finished
+    assert _Handler.slow_hits == 2
+
+
+def test_uncoalesced_gets_each_send_a_request(base_url, monkeypatch):
+    monkeypatch.setattr(_Handler, "slow_hits", 0)
+
+    async def get_slow():
+        return await asyncio.gather(*(http_client.async_get(f"{base_url}/slow", coalesce=False) for _ in range(3)))
+
+    _run(get_slow)
+    assert _Handler.slow_hits == 3
+    assert http_client.stats()["coalesced_reads"] == 0
@@ -0,0 +1,52 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from customer_service.tools import product_cache as product_cache_module
+from customer_service.tools.product_cache import FRESH, MISS, STALE, ProductCache
+
+
+def test_fresh_stale_and_expired(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(product_cache_module.time, "monotonic", lambda: now[0])
+    cache = ProductCache(ttl_secs=10, stale_secs=20)
+    cache.put("SKU_1", {"id": "SKU_1"})
+
+    assert cache.lookup("SKU_1") == ({"id": "SKU_1"}, FRESH)
+    now[0] += 15
+    assert cache.lookup("SKU_1") == ({"id": "SKU_1"}, STALE)
+    now[0] += 20
+    assert cache.lookup("SKU_1") == (None, MISS)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["stale_hits"], stats["misses"], stats["size"]) == (1, 1, 1, 0)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ProductCache(max_entries=2)
+    cache.put("SKU_1", {"id": "SKU_1"})
+    cache.put("SKU_2", {"id": "SKU_2"})
+    cache.lookup("SKU_1")
+    cache.put("SKU_3", {"id": "SKU_3"})
+    assert cache.lookup("SKU_2") == (None, MISS)
+    assert cache.lookup("SKU_1")[1] == FRESH
+    assert cache.stats()["evictions"] == 1
+
+
+def test_one_refresh_per_product_at_a_time():
+    cache = ProductCache()
+    assert cache.begin_refresh(["SKU_1", "SKU_2"]) == ["SKU_1", "SKU_2"]
+    assert cache.begin_refresh(["SKU_2", "SKU_3"]) == ["SKU_3"]
+    cache.end_refresh(["SKU_1", "SKU_2"], failed_ids=["SKU_2"])
+    assert cache.begin_refresh(["SKU_2"]) == ["SKU_2"]
+    assert cache.stats()["refresh_failures"] == 1
@@ -0,0 +1,74 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from types import SimpleNamespace
+
+from customer_service.entities.customer import Customer
+from customer_service.shared_libraries import profile_cache
+from customer_service.shared_libraries.callbacks import validate_customer_id
+from customer_service.shared_libraries.profile_cache import ProfileCache
+
+
+def test_each_distinct_profile_is_parsed_once(monkeypatch):
+    parses = []
+    original = Customer.model_validate_json
+    monkeypatch.setattr(Customer, "model_validate_json", lambda data: parses.append(1) or original(data))
+    cache = ProfileCache()
+    profile_json = Customer.get_customer("123").to_json()
+
+    assert cache.parsed(profile_json).customer_id == "123"
+    assert cache.parsed(profile_json).customer_id == "123"
+    assert cache.parsed(Customer.get_customer("456").to_json()).customer_id == "456"
+    assert len(parses) == 2
+    assert cache.stats() == {"hits": 1, "misses": 2, "size": 2}
+
+
+def test_validate_customer_id_uses_the_cached_profile():
+    state = {"customer_profile": profile_cache.default_profile_json("123")}
+    hits = profile_cache.profiles.stats()["hits"]
+
+    assert validate_customer_id("123", state) == (True, None)
+    valid, error = validate_customer_id("999", state)
+    assert not valid and "only for 123" in error
+    assert profile_cache.profiles.stats()["hits"] == hits + 2
+
+
+def test_compact_profile_encoding_and_llm_view():
+    customer = Customer.demo_customer("123")
+    compact = customer.to_compact_json()
+
+    assert "\n" not in compact and "scheduled_appointments" not in compact
+    assert Customer.model_validate_json(compact) == customer
+    view = customer.llm_view()
+    assert set(view) == {
+        "customer_id", "first_name", "last_name", "years_as_customer", "loyalty_points",
+        "preferred_store", "garden_profile", "recent_purchases",
+    }
+
+    before = profile_cache.savings.snapshot()
+    profile_cache.default_profile_json("123")
+    after = profile_cache.savings.snapshot()
+    assert after["sessions"] == before["sessions"] + 1
+    assert after["state_bytes_saved"] > before["state_bytes_saved"]
+    assert after["prompt_tokens_saved_per_call"] > before["prompt_tokens_saved_per_call"]
+
+
+def test_full_profile_stays_available_from_the_tool():
+    from customer_service.tools.tools import get_customer_profile
+
+    tool_context = SimpleNamespace(state={"customer_profile": profile_cache.default_profile_json("123")})
+    profile = get_customer_profile("123", tool_context)
+
+    assert profile["billing_address"]["city"] == "ashkelon"
+    assert len(profile["purchase_history"]) == 3
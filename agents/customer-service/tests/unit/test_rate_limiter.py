@@ -0,0 +1,71 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import time
+
+from customer_service.shared_libraries.rate_limiter import RateLimiter
+
+
+def test_throttled_session_does_not_block_the_event_loop():
+    # 1 request per second after a burst of 1.
+    limiter = RateLimiter(rpm=60, burst=1, notify_after_secs=0.0)
+    notices = []
+
+    async def notify(wait_secs, model):
+        notices.append((round(wait_secs), model))
+
+    limiter.add_throttle_listener("chatty", notify)
+
+    async def run():
+        ticks = 0
+
+        async def other_sessions():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.05)
+                ticks += 1
+
+        ticker = asyncio.create_task(other_sessions())
+        started = time.monotonic()
+        await limiter.acquire("chatty", "gemini")
+        await limiter.acquire("chatty", "gemini")
+        elapsed = time.monotonic() - started
+        quiet = await limiter.acquire("quiet", "gemini")
+        ticker.cancel()
+        return elapsed, ticks, quiet
+
+    elapsed, ticks, quiet_wait = asyncio.run(run())
+
+    assert 0.8 < elapsed < 2.0
+    assert ticks >= 10 # The loop kept running while "chatty" waited
+    assert quiet_wait == 0.0 # Buckets are per session
+    assert notices == [(1, "gemini")]
+
+    stats = limiter.stats()
+    assert (stats["acquired"], stats["throttled"], stats["waiting"]) == (3, 1, 0)
+    assert stats["max_wait_secs"] > 0.8
+    assert stats["sessions"]["chatty"]["gemini"]["remaining"] == 0
+
+    limiter.forget_session("chatty")
+    assert "chatty" not in limiter.stats()["sessions"]
+
+
+def test_model_specific_quota():
+    limiter = RateLimiter(rpm=1, burst=2, model_rpm={"fast-model": 600})
+    assert limiter.remaining("s1", "fast-model") == 2
+    asyncio.run(limiter.acquire("s1", "fast-model"))
+    asyncio.run(limiter.acquire("s1", "fast-model"))
+    # 10 per second: the next call waits ~0.1s rather than a minute.
+    assert asyncio.run(limiter.acquire("s1", "fast-model")) < 0.2
@@ -0,0 +1,61 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from types import SimpleNamespace
+
+from google.genai import types
+
+from customer_service.shared_libraries import response_shaping
+from customer_service.shared_libraries.callbacks import after_tool
+
+
+RECOMMENDATIONS = {
+    "recommendations": [{
+        "id": "SKU_1",
+        "name": "Lavender",
+        "formatted_price": "$12.99",
+        "image_url": "https://example.com/lavender.png",
+        "product_url": "https://example.com/products/SKU_1",
+        "description": "x" * 500,
+        "attributes": {"light_requirement": "Full Sun", "soil_ph_preference": "6.0-7.0"},
+    }],
+}
+
+
+def test_shape_keeps_declared_fields_and_caps_strings():
+    compact = response_shaping.shape("search_products", {
+        "results": [{"product_id": "SKU_1", "name": "Lavender", "description": "y" * 500, "price": 12.99}],
+    }, max_text_chars=20)
+
+    result = compact["results"][0]
+    assert set(result) == {"product_id", "name", "description"}
+    assert len(result["description"]) == 20 and result["description"].endswith("…")
+    assert response_shaping.shape("sync_ask_for_approval", {"status": "approved"}) is None
+
+
+def test_after_tool_sends_the_compact_view_and_keeps_the_full_response():
+    tool = SimpleNamespace(name="get_product_recommendations")
+    tool_context = SimpleNamespace(state={}, function_call_id="fc-1")
+
+    compact = after_tool(tool, {}, tool_context, RECOMMENDATIONS)
+
+    card = compact["recommendations"][0]
+    assert set(card) == {"id", "name", "formatted_price", "attributes"}
+    assert card["attributes"] == {"light_requirement": "Full Sun"}
+    assert response_shaping.size_of(compact) < response_shaping.size_of(RECOMMENDATIONS)
+
+    part = types.FunctionResponse(id="fc-1", name=tool.name, response=compact)
+    assert response_shaping.full_response(part) is RECOMMENDATIONS
+    # Taken once; afterwards the event's own (compact) response is all there is.
+    assert response_shaping.full_response(part) == compact
@@ -0,0 +1,66 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from customer_service.shared_libraries import tracing
+
+
+@pytest.fixture(autouse=True)
+def _restore_tracing():
+    status = tracing.status()
+    yield
+    tracing.configure(status["enabled"], sample_rate=status["sample_rate"], buffer_size=status["buffer_size"])
+    tracing.clear()
+
+
+def test_nothing_is_summarized_while_tracing_is_off():
+    tracing.configure(False)
+    calls = []
+    tracing.trace("tool_input", lambda: calls.append(1))
+    assert calls == [] and tracing.recent() == []
+
+    tracing.configure(True, sample_rate=0.0)
+    tracing.trace("tool_input", lambda: calls.append(1))
+    assert calls == []
+
+
+def test_ring_buffer_keeps_the_latest_traces():
+    tracing.configure(True, sample_rate=1.0, buffer_size=3)
+    for i in range(5):
+        tracing.trace("tool_input", tracing.summarize_tool_call, "search_products", {"query": "x" * 1000, "i": i},
+                      session_id="s1")
+    tracing.trace("tool_output", lambda: 1 / 0, session_id="s2")
+
+    traces = tracing.recent()
+    assert len(traces) == 3
+    assert [t["kind"] for t in traces] == ["tool_input", "tool_input", "tool_output"]
+    assert len(traces[0]["data"]["payload"]) <= 303
+    assert "ZeroDivisionError" in traces[-1]["data"]["summary_error"]
+    assert [t["session_id"] for t in tracing.recent(session_id="s1")] == ["s1", "s1"]
+
+
+def test_model_request_summary_covers_only_the_new_turn():
+    history = [types.Content(role="user", parts=[types.Part(text=f"turn {i}")]) for i in range(50)]
+    history.append(types.Content(role="user", parts=[
+        types.Part(inline_data=types.Blob(mime_type="audio/pcm", data=b"\x00" * 640)),
+    ]))
+    summary = tracing.summarize_llm_request(LlmRequest(model="gemini", contents=history))
+
+    assert summary == {
+        "model": "gemini", "contents": 51, "last_role": "user",
+        "last_parts": [{"inline_data": "audio/pcm", "bytes": 640}],
+    }
@@ -43,17 +43,21 @@ if os.path.exists(dotenv_path):
 else:
     print(f"ERROR: app.py - .env file NOT found at path: {dotenv_path}")
 
-import sqlite3
 import logging
-import json # Added for JSON deserialization
-import time # Added for time.time()
+from urllib.parse import urlencode
 from flask import Flask, jsonify, request, g, render_template
 from werkzeug.exceptions import HTTPException # Added for specific error handling
 from google.cloud import retail_v2
 from google.api_core.exceptions import GoogleAPICallError
-from google.api_core.client_options import ClientOptions # Added for regional endpoint
 from google.auth import default as default_auth_credentials # Added for ADC logging
 import importlib.util # Required for the workaround
+from catalog_snapshot import CatalogCache, DEFAULT_REFRESH_INTERVAL_SECS, fts_search_ids
+import storefront
+from single_flight import SingleFlight
+from db_pool import (
+    ConnectionPool, PoolTimeoutError, DEFAULT_POOL_SIZE, DEFAULT_POOL_TIMEOUT_SECS,
+    DEFAULT_CACHE_SIZE_KIB, DEFAULT_MMAP_SIZE, DEFAULT_BUSY_TIMEOUT_MS, DEFAULT_STATEMENT_CACHE_SIZE,
+)
 
 # --- Workaround for importing from a directory with a hyphen ---
 # Define the path to the module we want to import
@@ -75,7 +79,31 @@ app = Flask(__name__, template_folder='cymbal_home_garden_backend/templates', st
 # For serving frontend directly from Flask, uncomment above and adjust paths if frontend is in a sibling folder.
 # For now, focusing on API. Frontend files will be structured to be served from Flask's default static/template folders.
 
-DATABASE = 'ecommerce.db'
+# Resolved against this file, not the working directory: the storefront is also
+# imported from agents/customer-service (streaming_server.py, storefront_local.py).
+DATABASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ecommerce.db')
+
+# Process-wide, pre-parsed copy of the products table. Catalog reads are served
+# from memory; the snapshot reloads itself when the products table changes.
+catalog_cache = CatalogCache(
+    DATABASE,
+    refresh_interval_secs=float(os.environ.get("CATALOG_REFRESH_INTERVAL_SECS", DEFAULT_REFRESH_INTERVAL_SECS)),
+)
+
+# Long-lived, WAL-mode SQLite connections shared by all request threads (see db_pool.py).
+db_pool = ConnectionPool(
+    DATABASE,
+    size=int(os.environ.get("SQLITE_POOL_SIZE", DEFAULT_POOL_SIZE)),
+    timeout_secs=float(os.environ.get("SQLITE_POOL_TIMEOUT_SECS", DEFAULT_POOL_TIMEOUT_SECS)),
+    cache_size_kib=int(os.environ.get("SQLITE_CACHE_SIZE_KIB", DEFAULT_CACHE_SIZE_KIB)),
+    mmap_size=int(os.environ.get("SQLITE_MMAP_SIZE", DEFAULT_MMAP_SIZE)),
+    busy_timeout_ms=int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", DEFAULT_BUSY_TIMEOUT_MS)),
+    statement_cache_size=int(os.environ.get("SQLITE_STATEMENT_CACHE_SIZE", DEFAULT_STATEMENT_CACHE_SIZE)),
+)
+
+# Identical concurrent reads that hit SQLite (availability checks, full-text
+# searches) share one query instead of each borrowing a connection (see single_flight.py).
+reads = SingleFlight()
 
 # --- Configuration for Google Cloud Retail API ---
 # User needs to fill these in based on their GCP setup
@@ -91,17 +119,17 @@ logger = logging.getLogger(__name__)
 
 # --- Database Helper Functions ---
 def get_db():
+    """Borrows a pooled connection for the rest of the request (rows are sqlite3.Row)."""
     db = getattr(g, '_database', None)
     if db is None:
-        db = g._database = sqlite3.connect(DATABASE)
-        db.row_factory = sqlite3.Row # Access columns by name
+        db = g._database = db_pool.acquire()
     return db
 
 @app.teardown_appcontext
 def close_connection(exception):
-    db = getattr(g, '_database', None)
+    db = g.pop('_database', None)
     if db is not None:
-        db.close()
+        db_pool.release(db) # Uncommitted changes are rolled back before reuse
 
 # --- Error Handlers ---
 @app.errorhandler(404)
@@ -136,150 +164,128 @@ def internal_error(error):
     return render_template('500.html', error_message="An unexpected server error occurred."), 500
 
 
+@app.errorhandler(PoolTimeoutError)
+def database_busy(error):
+    logger.error(f"Database connection pool exhausted: {error} Stats: {db_pool.stats()}")
+    return jsonify({"error": "Service Unavailable", "message": "The database is busy, please retry."}), 503
+
+
 # --- API Endpoints ---
 
+@app.route('/api/stats/db-pool', methods=['GET'])
+def get_db_pool_stats():
+    """Connection pool occupancy and acquire wait times (avg/max/total in ms)."""
+    return jsonify(db_pool.stats())
+
+@app.route('/api/stats/single-flight', methods=['GET'])
+def get_single_flight_stats():
+    """Reads that ran a query ("executions") versus ones that joined an identical read in flight ("shared")."""
+    return jsonify(reads.stats())
+
+
 # === Product Endpoints (SQLite-backed) ===
+# The endpoint logic lives in storefront.py and is shared with the ASGI adapter
+# (storefront_asgi.py); the routes below only translate Flask requests/responses.
+
+def _respond(result):
+    """Turns a storefront.ServiceResult into a Flask JSON response."""
+    if result.status == 304:
+        response = app.response_class(status=304) # Not Modified has no body
+    else:
+        response = jsonify(result.payload)
+        response.status_code = result.status
+    if result.headers:
+        response.headers.update(result.headers)
+    return response
+
+def _search_ids(text):
+    return reads.do(('fts', text), lambda: fts_search_ids(get_db(), text))
+
 @app.route('/api/products', methods=['GET'])
 def get_products():
-    """Lists all products or filters by name/category."""
+    """Lists all products or filters by name/category/plant_type.
+
+    `q` runs a ranked, prefix-matching full-text search over name, description,
+    botanical_name and plant_type (SQLite FTS5); results come back best match
+    first and can be combined with the other filters.
+
+    Paging and shaping (all optional; without them the full list is returned):
+      - sort: price, name, stock or id; prefix with '-' for descending.
+      - limit: page size (1-MAX_PAGE_SIZE). When more results remain, the cursor
+        for the next page is returned in the X-Next-Cursor header (and a Link
+        rel="next" header). Pass it back as `after` with the same query.
+      - fields: comma-separated columns to return, e.g. fields=id,name,price.
+
+    Attribute filters (backed by the normalized product_attributes table):
+      - flower_color, flowering_season, pollinator_types, landscape_use,
+        harvest_time: case-insensitive values, comma-separated or repeated
+        (OR within an attribute, AND across attributes).
+      - pet_safe, deer_resistant, drought_tolerant: true or false.
+      - facets: comma-separated attributes to count over the filtered results,
+        or "all". The response then becomes {"products": [...], "facets":
+        {attribute: {value: count}}}.
+
+    Everything else is served from the in-memory catalog snapshot: no SQL and no
+    JSON decoding per request. The unfiltered listing is serialized once per snapshot.
+    """
     logger.info(f"Received GET request for /api/products. Query params: {request.args}")
-    query_params = request.args
-    name_filter = query_params.get('name')
-    category_filter = query_params.get('category')
-    plant_type_filter = query_params.get('plant_type') # New filter
-
-    db = get_db()
-    cursor = db.cursor()
-    
-    # Select all columns from the products table
-    query = "SELECT * FROM products" # Changed from specific columns to *
-    filters = []
-    params = []
-
-    if name_filter:
-        filters.append("name LIKE ?")
-        params.append(f"%{name_filter}%")
-    if category_filter:
-        filters.append("category = ?")
-        params.append(category_filter)
-    if plant_type_filter: # New filter condition
-        filters.append("plant_type LIKE ?") # Using LIKE for flexibility, e.g. "Perennial" vs "Perennial Shrub"
-        params.append(f"%{plant_type_filter}%")
-    
-    if filters:
-        query += " WHERE " + " AND ".join(filters)
-        
-    cursor.execute(query, params)
-    products_rows = cursor.fetchall()
-    products = []
-    for row in products_rows:
-        product_dict = dict(row)
-        # Deserialize JSON strings back into lists for relevant fields
-        for field in ['flower_color', 'flowering_season', 'pollinator_types', 
-                      'landscape_use', 'companion_plants_ids', 'recommended_soil_ids', 
-                      'recommended_fertilizer_ids', 'harvest_time']:
-            if product_dict.get(field) and isinstance(product_dict[field], str):
-                try:
-                    product_dict[field] = json.loads(product_dict[field])
-                except json.JSONDecodeError:
-                    logger.warning(f"Could not decode JSON for field {field} in product {product_dict['id']}")
-                    product_dict[field] = [] # Default to empty list on error
-            elif product_dict.get(field) is None:
-                 product_dict[field] = [] # Default to empty list if field is None (for consistency in API response)
-        products.append(product_dict)
-
-    logger.info(f"Returning {len(products)} products from /api/products.")
-    return jsonify(products)
+    snapshot = catalog_cache.get()
+    result = storefront.list_products(snapshot, request.args, _search_ids)
+    if result.payload is snapshot.products:
+        body = snapshot.memoize('products:all', lambda: app.json.dumps(snapshot.products))
+        return app.response_class(f"{body}\n", mimetype=app.json.mimetype)
+    response = _respond(result)
+    next_cursor = (result.headers or {}).get('X-Next-Cursor')
+    if next_cursor:
+        next_args = request.args.copy()
+        next_args['after'] = next_cursor
+        response.headers['Link'] = f'<{request.base_url}?{urlencode(list(next_args.items(multi=True)))}>; rel="next"'
+    return response
+
+@app.route('/api/products/batch', methods=['POST'])
+def get_products_batch():
+    """Resolves many product ids in one round trip.
+
+    Request body: {"ids": ["SKU_1", "SKU_2", ...]} (at most MAX_PAGE_SIZE ids).
+    Response: {"products": [...], "missing_ids": [...]}, where each product has
+    the same shape as GET /api/products/<id>, in request order (duplicates collapsed).
+    """
+    logger.info("Received POST request for /api/products/batch")
+    return _respond(storefront.batch_products(catalog_cache.get(), request.get_json(silent=True)))
 
 @app.route('/api/products/<string:product_id>', methods=['GET'])
 def get_product_detail(product_id):
-    """Gets specific product details, including a nested 'attributes' object."""
+    """Gets specific product details, including a nested 'attributes' object.
+
+    The serialized body and its strong ETag are cached per product in the catalog
+    snapshot and only rebuilt when that product's row changes. Requests carrying a
+    matching If-None-Match get a 304 without any serialization.
+    """
     logger.info(f"Received GET request for /api/products/{product_id}.")
-    db = get_db()
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM products WHERE id = ?", (product_id,))
-    product_row = cursor.fetchone()
+    detail = catalog_cache.get().product_detail(product_id, app.json.dumps)
 
-    if not product_row:
+    if detail is None:
         logger.warning(f"Product {product_id} not found for GET /api/products/{product_id}.")
         return jsonify({"error": "Product not found"}), 404
 
-    product_data = dict(product_row)
-    attributes = {}
-    
-    # Define which columns from the DB should be nested under "attributes"
-    attribute_fields = [
-        'botanical_name', 'plant_type', 'mature_height_cm', 'mature_width_cm',
-        'light_requirement', 'water_needs', 'watering_frequency_notes',
-        'soil_preference', 'soil_ph_preference', 'hardiness_zone', 'flower_color',
-        'flowering_season', 'fragrance', 'fruit_bearing', 'care_level', 'pet_safe',
-        'attracts_pollinators', 'pollinator_types', 'deer_resistant', 'drought_tolerant',
-        'landscape_use', 'indoor_outdoor', 'companion_plants_ids',
-        'recommended_soil_ids', 'recommended_fertilizer_ids', 'harvest_time'
-    ]
-
-    # Populate the attributes dictionary, deserializing JSON strings where needed
-    for field in attribute_fields:
-        if field in product_data and product_data[field] is not None:
-            value = product_data[field]
-            # Fields that are stored as JSON strings in the DB
-            json_fields = [
-                'flower_color', 'flowering_season', 'pollinator_types', 'landscape_use',
-                'companion_plants_ids', 'recommended_soil_ids', 'recommended_fertilizer_ids',
-                'harvest_time'
-            ]
-            if field in json_fields and isinstance(value, str):
-                try:
-                    attributes[field] = json.loads(value)
-                except json.JSONDecodeError:
-                    logger.warning(f"Could not decode JSON for field {field} in product {product_data['id']}")
-                    attributes[field] = [] # Default to empty list on error
-            else:
-                attributes[field] = value
-
-    # Construct the final response with top-level keys and the nested attributes
-    product_response = {
-        'id': product_data.get('id'),
-        'name': product_data.get('name'),
-        'description': product_data.get('description'),
-        'price': product_data.get('price'),
-        'category': product_data.get('category'),
-        'stock': product_data.get('stock'),
-        'image_url': product_data.get('image_url'),
-        'product_url': f"/products/{product_data.get('id')}",
-        'attributes': attributes # Add the nested attributes object
-    }
-
-    logger.info(f"Returning structured details for product {product_id}.")
-    return jsonify(product_response)
+    etag, body = detail
+    if request.if_none_match.contains_weak(etag):
+        logger.info(f"Product {product_id} not modified (ETag match), returning 304.")
+        response = app.response_class(status=304)
+    else:
+        logger.info(f"Returning structured details for product {product_id}.")
+        response = app.response_class(body, mimetype=app.json.mimetype)
+    response.set_etag(etag)
+    # Clients may cache the body but must revalidate, since stock changes.
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/api/products/availability/<string:product_id>/<string:store_id>', methods=['GET'])
 def check_product_availability_endpoint(product_id, store_id):
-    """
-    Checks product stock from SQLite.
-    The 'store_id' is part of the path to match ADK tool, but currently ignored in logic
-    as we assume a single inventory source.
-    Output matches ADK tool: {'available': bool, 'quantity': int, 'store': str}
-    """
+    """Checks product stock. Output matches ADK tool: {'available': bool, 'quantity': int, 'store': str}"""
     logger.info(f"Received GET request for /api/products/availability/{product_id}/{store_id}.")
-    db = get_db()
-    cursor = db.cursor()
-    cursor.execute("SELECT stock FROM products WHERE id = ?", (product_id,))
-    row = cursor.fetchone()
-    
-    if row:
-        stock_quantity = row['stock']
-        # For MVP, store_id is acknowledged but fixed response for 'store' field
-        # In a real scenario, store_id would query different inventories or locations
-        return jsonify({
-            "available": stock_quantity > 0,
-            "quantity": stock_quantity,
-            "store": f"Cymbal Home Warehouse (Queried for {store_id})" # Or simply "Cymbal Home Warehouse"
-        })
-    else:
-        logger.warning(f"Product {product_id} not found for availability check at store {store_id}.")
-        # Return the specific 404 error format observed in the logs
-        return jsonify({"error": "Product not found for availability check"}), 404
+    return _respond(reads.do(('availability', product_id, store_id),
+                             lambda: storefront.product_availability(get_db(), product_id, store_id)))
 
 # === Shopping Cart Endpoints (SQLite-backed) ===
 @app.route('/api/cart/<string:customer_id>', methods=['GET'])
@@ -287,37 +293,13 @@ def get_cart(customer_id):
     """
     Retrieves the customer's cart contents.
     Output matches ADK tool: {'items': [{'product_id': ..., 'name': ..., 'quantity': ...}], 'subtotal': ...}
+
+    The response has an ETag that changes whenever the cart (or the catalog its
+    lines are priced from) changes; a request with a matching If-None-Match gets
+    a 304 without the cart being read.
     """
     logger.info(f"Received GET request for /api/cart/{customer_id}.")
-    db = get_db()
-    cursor = db.cursor()
-    
-    # Join cart_items with products to get product name and price
-    cursor.execute('''
-        SELECT ci.product_id, p.name, ci.quantity, p.price 
-        FROM cart_items ci
-        JOIN products p ON ci.product_id = p.id
-        WHERE ci.customer_id = ?
-    ''', (customer_id,))
-    
-    items = []
-    subtotal = 0.0
-    for row in cursor.fetchall():
-        item_total = row['quantity'] * row['price']
-        items.append({
-            "product_id": row['product_id'],
-            "name": row['name'],
-            "quantity": row['quantity'],
-            "price_per_unit": row['price'], # Added for clarity on frontend
-            "item_total": round(item_total, 2) # Added for clarity on frontend
-        })
-        subtotal += item_total
-        
-    logger.info(f"Returning cart for customer {customer_id} with {len(items)} item types, subtotal: {subtotal:.2f}.")
-    return jsonify({
-        "items": items,
-        "subtotal": round(subtotal, 2)
-    })
+    return _respond(storefront.get_cart(get_db(), customer_id, request.headers.get('If-None-Match')))
 
 @app.route('/api/cart/modify/<string:customer_id>', methods=['POST'])
 def modify_cart_endpoint(customer_id):
@@ -329,86 +311,7 @@ def modify_cart_endpoint(customer_id):
     """
     data = request.get_json()
     logger.info(f"Received POST request for /api/cart/modify/{customer_id}. Payload: {data}")
-    if not data:
-        logger.error(f"Invalid JSON payload for /api/cart/modify/{customer_id}.")
-        return jsonify({"error": "Invalid JSON payload"}), 400
-
-    items_to_add = data.get('items_to_add', [])
-    items_to_remove = data.get('items_to_remove', [])
-    
-    db = get_db()
-    cursor = db.cursor()
-    
-    items_added_flag = False
-    items_removed_flag = False
-
-    # Process items to add/update
-    if items_to_add:
-        for item_add in items_to_add:
-            product_id = item_add.get('product_id')
-            quantity_to_add = item_add.get('quantity', 0)
-
-            if not product_id or not isinstance(quantity_to_add, int) or quantity_to_add <= 0:
-                logger.warning(f"Invalid item to add: {item_add} for customer {customer_id}")
-                continue
-
-            # Check product stock
-            cursor.execute("SELECT stock FROM products WHERE id = ?", (product_id,))
-            product_stock_row = cursor.fetchone()
-            if not product_stock_row or product_stock_row['stock'] < quantity_to_add:
-                logger.warning(f"Not enough stock for {product_id} or product does not exist.")
-                # Potentially return a specific error or just skip adding
-                continue
-
-            cursor.execute("SELECT id, quantity FROM cart_items WHERE customer_id = ? AND product_id = ?", (customer_id, product_id))
-            cart_item = cursor.fetchone()
-            
-            if cart_item: # Update quantity if item already in cart
-                new_quantity = cart_item['quantity'] + quantity_to_add
-                # Ensure new quantity doesn't exceed stock (though initial add check should cover this)
-                if new_quantity <= product_stock_row['stock']:
-                    cursor.execute("UPDATE cart_items SET quantity = ? WHERE id = ?", (new_quantity, cart_item['id']))
-                    items_added_flag = True
-                else:
-                    logger.warning(f"Cannot add {quantity_to_add} of {product_id}, exceeds stock for existing cart item.")
-            else: # Add new item to cart
-                cursor.execute("INSERT INTO cart_items (customer_id, product_id, quantity) VALUES (?, ?, ?)",
-                               (customer_id, product_id, quantity_to_add))
-                items_added_flag = True
-    
-    # Process items to remove/decrease quantity
-    if items_to_remove:
-        for item_rem in items_to_remove:
-            product_id = item_rem.get('product_id')
-            quantity_to_remove = item_rem.get('quantity', 0)
-
-            if not product_id or not isinstance(quantity_to_remove, int) or quantity_to_remove <= 0:
-                logger.warning(f"Invalid item to remove: {item_rem} for customer {customer_id}")
-                continue
-
-            cursor.execute("SELECT id, quantity FROM cart_items WHERE customer_id = ? AND product_id = ?", (customer_id, product_id))
-            cart_item = cursor.fetchone()
-
-            if cart_item:
-                if quantity_to_remove >= cart_item['quantity']: # Remove item completely
-                    cursor.execute("DELETE FROM cart_items WHERE id = ?", (cart_item['id'],))
-                else: # Decrease quantity
-                    new_quantity = cart_item['quantity'] - quantity_to_remove
-                    cursor.execute("UPDATE cart_items SET quantity = ? WHERE id = ?", (new_quantity, cart_item['id']))
-                items_removed_flag = True
-    
-    db.commit()
-    
-    message = "Cart updated."
-    if not items_added_flag and not items_removed_flag:
-        message = "No changes made to the cart (items might be out of stock or invalid)."
-    logger.info(f"Cart modification for customer {customer_id} completed. Message: {message}, Added: {items_added_flag}, Removed: {items_removed_flag}")
-    return jsonify({
-        "status": "success", 
-        "message": message,
-        "items_added": items_added_flag,
-        "items_removed": items_removed_flag
-    })
+    return _respond(storefront.modify_cart(get_db(), customer_id, data))
 
 @app.route('/api/cart/<string:customer_id>/item', methods=['POST'])
 def add_or_update_cart_item(customer_id):
@@ -419,102 +322,27 @@ def add_or_update_cart_item(customer_id):
     """
     data = request.get_json()
     logger.info(f"Received POST request for /api/cart/{customer_id}/item. Payload: {data}")
-    if not data or 'product_id' not in data or 'quantity' not in data:
-        logger.error(f"Invalid JSON payload for /api/cart/{customer_id}/item. Payload: {data}")
-        return jsonify({"error": "Invalid JSON payload. 'product_id' and 'quantity' are required."}), 400
-
-    product_id = data.get('product_id')
-    quantity = data.get('quantity')
-
-    if not isinstance(quantity, int):
-        return jsonify({"error": "'quantity' must be an integer."}), 400
-
-    db = get_db()
-    cursor = db.cursor()
-
-    # Check product existence and stock
-    cursor.execute("SELECT stock FROM products WHERE id = ?", (product_id,))
-    product_stock_row = cursor.fetchone()
-
-    if not product_stock_row:
-        return jsonify({"error": f"Product {product_id} not found."}), 404
-
-    current_stock = product_stock_row['stock']
-
-    cursor.execute("SELECT id, quantity FROM cart_items WHERE customer_id = ? AND product_id = ?", (customer_id, product_id))
-    cart_item = cursor.fetchone()
-
-    if quantity > 0:
-        requested_quantity_increase = quantity # How many to add in this request
-        if cart_item:
-            # Item exists, increment quantity
-            new_quantity = cart_item['quantity'] + requested_quantity_increase
-            # Check against total stock for the *new total quantity*
-            if new_quantity > current_stock:
-                return jsonify({"error": f"Not enough stock for {product_id} to increase quantity to {new_quantity}. Available: {current_stock}, Current in cart: {cart_item['quantity']}"}), 400
-            cursor.execute("UPDATE cart_items SET quantity = ? WHERE id = ?", (new_quantity, cart_item['id']))
-            message = f"Quantity for product {product_id} updated to {new_quantity}."
-        else:
-            # Item does not exist, add new with the given quantity
-            if requested_quantity_increase > current_stock:
-                return jsonify({"error": f"Not enough stock for {product_id}. Available: {current_stock}, Requested: {requested_quantity_increase}"}), 400
-            cursor.execute("INSERT INTO cart_items (customer_id, product_id, quantity) VALUES (?, ?, ?)",
-                           (customer_id, product_id, requested_quantity_increase))
-            message = f"Product {product_id} added to cart with quantity {requested_quantity_increase}."
-    elif quantity <= 0: # Quantity is 0 or negative, remove item or reduce (though DELETE endpoint is better for full removal)
-        if cart_item:
-            # For simplicity with this endpoint, if quantity <=0, we remove the item.
-            # More complex logic could allow reducing quantity if this endpoint was also for that.
-            cursor.execute("DELETE FROM cart_items WHERE id = ?", (cart_item['id'],))
-            message = f"Product {product_id} removed from cart due to quantity <= 0."
-        else:
-            # Trying to set non-existent item to 0 or less quantity - no action needed.
-            message = f"Product {product_id} not in cart, no action taken for quantity <= 0."
-            return jsonify({"status": "no_action", "message": message}), 200
-
-
-    db.commit()
-    logger.info(f"Cart item operation for customer {customer_id}, product {product_id} (quantity {quantity}) resulted in: {message}")
-    return jsonify({"status": "success", "message": message}), 200
+    return _respond(storefront.set_cart_item(get_db(), customer_id, data))
 
 
 @app.route('/api/cart/<string:customer_id>/item/<string:product_id>', methods=['DELETE'])
 def remove_cart_item_completely(customer_id, product_id):
     """Removes an entire product line from the customer's cart."""
     logger.info(f"Received DELETE request for /api/cart/{customer_id}/item/{product_id}.")
-    db = get_db()
-    cursor = db.cursor()
-    
-    cursor.execute("DELETE FROM cart_items WHERE customer_id = ? AND product_id = ?", (customer_id, product_id))
-    db.commit()
-    
-    if cursor.rowcount > 0:
-        logger.info(f"Product {product_id} removed from cart for customer {customer_id}.")
-        return jsonify({"status": "success", "message": f"Product {product_id} removed from cart."}), 200
-    else:
-        logger.warning(f"Product {product_id} not found in cart for customer {customer_id} during DELETE, or already removed.")
-        return jsonify({"status": "not_found", "message": f"Product {product_id} not found in cart or already removed."}), 404
+    return _respond(storefront.remove_cart_item(get_db(), customer_id, product_id))
 
 @app.route('/api/cart/<string:customer_id>/clear', methods=['DELETE'])
 def clear_customer_cart(customer_id):
     """Clears all items from the customer's cart."""
     logger.info(f"Received DELETE request for /api/cart/{customer_id}/clear.")
-    db = get_db()
-    cursor = db.cursor()
-    
-    cursor.execute("DELETE FROM cart_items WHERE customer_id = ?", (customer_id,))
-    db.commit()
-    
-    items_deleted_count = cursor.rowcount
-    logger.info(f"Cart cleared for customer {customer_id}. Items deleted: {items_deleted_count}.")
-    # We can return success even if cart was already empty, as the state is achieved.
-    return jsonify({"status": "success", "message": "Cart cleared.", "items_deleted": items_deleted_count}), 200
+    return _respond(storefront.clear_cart(get_db(), customer_id))
 
 @app.route('/api/checkout/place_order', methods=['POST'])
 def place_order():
     """
-    Simulates placing an order.
+    Simulates placing an order: reserves stock for every line and clears the cart.
     Expects JSON: { "customer_id": "...", "items": [...], "shipping_details": {...}, "total_amount": ... }
+    Lines that cannot be reserved are reported with a 409 and nothing is changed.
     """
     data = request.get_json(silent=True) # Use silent=True to prevent it from raising its own 400 error for malformed JSON
     if data is None: # Check if data is None (malformed JSON or wrong content type)
@@ -522,35 +350,7 @@ def place_order():
         if request.content_type == 'application/json':
             return jsonify({"error": "Bad Request", "message": "Invalid JSON payload provided."}), 400
         return jsonify({"error": "Bad Request", "message": "Invalid JSON payload or missing Content-Type: application/json."}), 400
-
-    customer_id = data.get('customer_id')
-    items = data.get('items')
-    shipping_details = data.get('shipping_details')
-    total_amount = data.get('total_amount')
-
-    if not all([customer_id, items, shipping_details, total_amount is not None]):
-        return jsonify({"error": "Missing required fields for order (customer_id, items, shipping_details, total_amount)"}), 400
-
-    logger.info(f"Simulating order placement for customer_id: {customer_id}")
-    logger.info(f"Order Items: {json.dumps(items, indent=2)}")
-    logger.info(f"Shipping Details: {json.dumps(shipping_details, indent=2)}")
-    logger.info(f"Total Amount: {total_amount}")
-
-    # Simulate clearing the cart for this customer after order placement
-    db = get_db()
-    cursor = db.cursor()
-    cursor.execute("DELETE FROM cart_items WHERE customer_id = ?", (customer_id,))
-    db.commit()
-    logger.info(f"Cart cleared for customer {customer_id} after simulated order placement.")
-
-    # In a real app, you'd save the order to a new 'orders' table,
-    # interact with payment gateways, trigger shipping processes, etc.
-    
-    return jsonify({
-        "status": "success",
-        "message": "Order placed successfully (Simulated). Thank you for your purchase!",
-        "order_id": f"SIM_{time.time()}" # Generate a pseudo-unique simulated order ID
-    }), 201 # 201 Created is often used for successful resource creation
+    return _respond(storefront.place_order(get_db(), data, on_stock_change=catalog_cache.invalidate))
 
 # === Phase 4: Conceptual Order Submission Endpoint ===
 @app.route('/api/orders/place_order', methods=['POST'])
@@ -569,27 +369,7 @@ def conceptual_place_order():
             return jsonify({"error": "Bad Request", "message": "Invalid JSON payload provided."}), 400
         logger.error(f"Missing Content-Type: application/json for /api/orders/place_order.")
         return jsonify({"error": "Bad Request", "message": "Invalid JSON payload or missing Content-Type: application/json."}), 400
-
-    # Expected structure (similar to checkoutProcessState)
-    # customer_id = data.get('customer_id') # Or derive from session/auth in real app
-    # selected_items = data.get('selectedItems')
-    # shipping_info = data.get('shippingInfo')
-    # payment_info = data.get('paymentInfo')
-    # total_amount = 0 # Calculate from items or get from payload
-
-    # For MVP, just log the whole thing
-    logger.info(f"Conceptual Order Data Received for /api/orders/place_order: {json.dumps(data, indent=2)}")
-
-    # No database interaction or payment processing in this phase for this endpoint.
-    
-    mock_order_id = f"MOCK_ORDER_{int(time.time())}"
-    logger.info(f"Conceptual order {mock_order_id} processed for /api/orders/place_order.")
-    
-    return jsonify({
-        "success": True,
-        "message": "Order received (conceptual)",
-        "order_id": mock_order_id
-    }), 201
+    return _respond(storefront.conceptual_order(data))
 
 
 # === Image Identification Endpoint ===
@@ -730,42 +510,12 @@ def retail_search_products():
 def product_detail_page(product_id):
     """Serves the product detail page for a given product ID."""
     logger.info(f"Received GET request for product detail page /products/{product_id}.")
-    db = get_db()
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM products WHERE id = ?", (product_id,))
-    product_row = cursor.fetchone()
-
-    if product_row:
-        product_data = dict(product_row)
-        # Deserialize JSON strings back into lists for relevant fields
-        for field in ['flower_color', 'flowering_season', 'pollinator_types', 
-                      'landscape_use', 'companion_plants_ids', 'recommended_soil_ids', 
-                      'recommended_fertilizer_ids', 'harvest_time', 'attributes']: # Added 'attributes'
-            if product_data.get(field) and isinstance(product_data[field], str):
-                try:
-                    product_data[field] = json.loads(product_data[field])
-                except json.JSONDecodeError:
-                    logger.warning(f"Could not decode JSON for field {field} in product {product_data['id']}")
-                    # Decide on default: empty list or keep as is, or None
-                    product_data[field] = product_data[field] if isinstance(product_data[field], dict) else [] 
-            elif product_data.get(field) is None and field != 'attributes': # attributes can be None
-                 product_data[field] = []
-        
-        # Ensure attributes is a dict if it's None or empty list after potential deserialization
-        if not isinstance(product_data.get('attributes'), dict):
-            product_data['attributes'] = {}
-
+    product_data = storefront.product_page_context(catalog_cache.get(), product_id)
+    if product_data is not None:
         logger.info(f"Rendering product_detail.html for product {product_id}.")
         return render_template('product_detail.html', product=product_data)
-    else:
-        logger.warning(f"Product {product_id} not found. Returning 404 page.")
-        # Assuming a 404.html template exists or will be created.
-        # If not, the default Flask 404 handler will be used, or @app.errorhandler(404) if defined for HTML.
-        # For now, let's use the existing JSON 404 handler via abort,
-        # or create a specific 404.html if preferred by user later.
-        # For a user-facing page, a rendered 404 page is better.
-        # We'll use render_template for a user-friendly 404 page.
-        return render_template('404.html', error_message=f"Product with ID {product_id} not found."), 404
+    logger.warning(f"Product {product_id} not found. Returning 404 page.")
+    return render_template('404.html', error_message=f"Product with ID {product_id} not found."), 404
 
 @app.route('/')
 def index():
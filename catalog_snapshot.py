@@ -0,0 +1,603 @@
+# cymbal_home_garden_backend/catalog_snapshot.py
+
+import sqlite3
+import logging
+import base64
+import bisect
+import hashlib
+import json
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Columns stored as JSON string arrays in the products table (see database_setup.py).
+JSON_LIST_FIELDS = (
+    'flower_color', 'flowering_season', 'pollinator_types', 'landscape_use',
+    'companion_plants_ids', 'recommended_soil_ids', 'recommended_fertilizer_ids',
+    'harvest_time',
+)
+
+# Columns from the DB that GET /api/products/<id> nests under "attributes".
+PRODUCT_ATTRIBUTE_FIELDS = (
+    'botanical_name', 'plant_type', 'mature_height_cm', 'mature_width_cm',
+    'light_requirement', 'water_needs', 'watering_frequency_notes',
+    'soil_preference', 'soil_ph_preference', 'hardiness_zone', 'flower_color',
+    'flowering_season', 'fragrance', 'fruit_bearing', 'care_level', 'pet_safe',
+    'attracts_pollinators', 'pollinator_types', 'deer_resistant', 'drought_tolerant',
+    'landscape_use', 'indoor_outdoor', 'companion_plants_ids',
+    'recommended_soil_ids', 'recommended_fertilizer_ids', 'harvest_time',
+)
+
+# Attributes normalized into the product_attributes table (one row per product
+# and value, see database_setup.py) so they can be filtered and faceted on
+# without decoding the JSON columns above. Booleans are stored as 'true'/'false'.
+LIST_ATTRIBUTE_FIELDS = (
+    'flower_color', 'flowering_season', 'pollinator_types', 'landscape_use', 'harvest_time',
+)
+BOOLEAN_ATTRIBUTE_FIELDS = ('pet_safe', 'deer_resistant', 'drought_tolerant')
+FACET_FIELDS = LIST_ATTRIBUTE_FIELDS + BOOLEAN_ATTRIBUTE_FIELDS
+
+_BOOLEAN_VALUES = {'true': 'true', '1': 'true', 'yes': 'true', 'false': 'false', '0': 'false', 'no': 'false'}
+
+# How often (at most) the cache asks SQLite whether the catalog changed.
+# Writes made through app.py call invalidate() and are visible immediately;
+# this interval only bounds how stale the snapshot can be after an external
+# writer (e.g. sample_data_importer.py) touches the database.
+DEFAULT_REFRESH_INTERVAL_SECS = 1.0
+
+
+def decode_product_row(product_dict):
+    """Deserializes the JSON array columns of a products row in place.
+
+    None or undecodable values become empty lists so API consumers always see lists.
+    The internal product_rowid column (the products_fts key) is dropped.
+    """
+    product_dict.pop('product_rowid', None)
+    for field in JSON_LIST_FIELDS:
+        value = product_dict.get(field)
+        if value and isinstance(value, str):
+            try:
+                product_dict[field] = json.loads(value)
+            except json.JSONDecodeError:
+                logger.warning(f"Could not decode JSON for field {field} in product {product_dict.get('id')}")
+                product_dict[field] = []
+        elif value is None:
+            product_dict[field] = []
+    return product_dict
+
+
+def product_detail_payload(product):
+    """Builds the GET /api/products/<id> response: top-level basics plus a nested 'attributes' object."""
+    attributes = {}
+    for field in PRODUCT_ATTRIBUTE_FIELDS:
+        value = product.get(field)
+        # NULL columns are omitted; decode_product_row() turned NULL JSON arrays into [].
+        if value is None or (field in JSON_LIST_FIELDS and value == []):
+            continue
+        attributes[field] = value
+    return {
+        'id': product.get('id'),
+        'name': product.get('name'),
+        'description': product.get('description'),
+        'price': product.get('price'),
+        'category': product.get('category'),
+        'stock': product.get('stock'),
+        'image_url': product.get('image_url'),
+        'product_url': f"/products/{product.get('id')}",
+        'attributes': attributes,
+    }
+
+
+def product_attribute_rows(product):
+    """Yields the (product_id, attribute, value) rows for product_attributes.
+
+    Accepts a products row either as stored (JSON strings) or decoded (lists).
+    Used by sample_data_importer.py to populate the table, and by the catalog
+    snapshot as a fallback for databases created before the table existed.
+    """
+    product_id = product['id']
+    for field in LIST_ATTRIBUTE_FIELDS:
+        values = product.get(field)
+        if isinstance(values, str):
+            try:
+                values = json.loads(values)
+            except json.JSONDecodeError:
+                values = None
+        seen = set()
+        for value in values or ():
+            if not isinstance(value, str) or not value.strip() or value.strip().lower() in seen:
+                continue
+            seen.add(value.strip().lower())
+            yield product_id, field, value.strip()
+    for field in BOOLEAN_ATTRIBUTE_FIELDS:
+        value = product.get(field)
+        if value is not None:
+            yield product_id, field, 'true' if value else 'false'
+
+
+def parse_attribute_filters(args):
+    """Extracts attribute filters from GET /api/products query args (a werkzeug MultiDict).
+
+    Each of FACET_FIELDS may be given repeatedly and/or comma-separated; values of
+    one attribute are OR-ed, different attributes are AND-ed. Matching is
+    case-insensitive. Returns {attribute: [lower-cased values]}.
+
+    Raises:
+        ValueError: if a boolean attribute has a value other than true/false.
+    """
+    criteria = {}
+    for field in FACET_FIELDS:
+        values = [v.strip().lower() for raw in args.getlist(field) for v in raw.split(',') if v.strip()]
+        if not values:
+            continue
+        if field in BOOLEAN_ATTRIBUTE_FIELDS:
+            if any(v not in _BOOLEAN_VALUES for v in values):
+                raise ValueError(f"'{field}' must be true or false.")
+            values = sorted({_BOOLEAN_VALUES[v] for v in values})
+        criteria[field] = values
+    return criteria
+
+
+def compute_etag(body):
+    """Strong validator for a serialized response body (unquoted, as werkzeug expects)."""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+# --- Sorting and keyset pagination ---
+
+# Sort orders accepted by GET /api/products?sort=..., prefix with '-' for descending.
+# 'id' is the implicit order when paginating without an explicit sort.
+SORT_FIELDS = ('price', 'name', 'stock', 'id')
+MAX_PAGE_SIZE = 100
+
+
+def _sort_key(product, field):
+    """Total order for a column: NULLs first, names case-insensitive, id as tie-breaker."""
+    value = product.get(field)
+    if isinstance(value, str):
+        value = value.lower()
+    return ((value is not None, value if value is not None else 0), product['id'])
+
+
+def encode_cursor(data):
+    """Opaque, URL-safe page cursor."""
+    return base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor(); raises ValueError on anything malformed."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError("Invalid pagination cursor.") from e
+    if not isinstance(data, dict) or not isinstance(data.get('id'), str) or not isinstance(data.get('s'), str):
+        raise ValueError("Invalid pagination cursor.")
+    return data
+
+
+# JSON types a sorted cursor's key value may have, per sort field (NULLs encode as 0).
+_SORT_VALUE_TYPES = {'price': (int, float), 'stock': (int, float), 'name': (str,), 'id': (str,)}
+
+
+def _cursor_sort_key(cursor, field):
+    """The sort key tuple of a sorted cursor, checked against `field`'s _sort_key() shape.
+
+    A key of the wrong shape would fail the bisect with a TypeError, so it is
+    rejected here as a malformed cursor instead.
+    """
+    key = cursor.get('k')
+    if not isinstance(key, list) or len(key) != 2 or not isinstance(key[0], bool):
+        raise ValueError("Invalid pagination cursor.")
+    present, value = key
+    expected = _SORT_VALUE_TYPES[field] if present else (int,)
+    if isinstance(value, bool) or not isinstance(value, expected) or (not present and value != 0):
+        raise ValueError("Invalid pagination cursor.")
+    return (present, value), cursor['id']
+
+
+# --- Full-text search (products_fts, see database_setup.py) ---
+
+# bm25() column weights, in products_fts column order:
+# name, description, botanical_name, plant_type.
+FTS_COLUMN_WEIGHTS = (10.0, 1.0, 5.0, 3.0)
+
+_FTS_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def build_fts_query(text):
+    """Turns free text into a safe FTS5 MATCH expression, or None if it has no terms.
+
+    Every word becomes a quoted prefix term ("lav"*), implicitly AND-ed, so user
+    input can never inject FTS5 syntax (NEAR, column filters, stray quotes...).
+    """
+    terms = _FTS_TOKEN_RE.findall(text or '')
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def fts_search_ids(conn, text):
+    """Returns product ids matching `text`, best match first.
+
+    Returns None if the database has no products_fts table (created before
+    full-text search existed), so callers can fall back to a substring scan.
+    """
+    match_expression = build_fts_query(text)
+    if match_expression is None:
+        return []
+    weights = ', '.join(str(w) for w in FTS_COLUMN_WEIGHTS)
+    try:
+        rows = conn.execute(
+            f"""
+            SELECT p.id
+            FROM products_fts
+            JOIN products p ON p.rowid = products_fts.rowid -- p.rowid is product_rowid where it exists
+            WHERE products_fts MATCH ?
+            ORDER BY bm25(products_fts, {weights})
+            """,
+            (match_expression,),
+        ).fetchall()
+    except sqlite3.OperationalError as e:
+        if 'no such table' in str(e):
+            logger.warning("products_fts table not found; run database_setup.py to enable full-text search.")
+            return None
+        raise
+    return [row[0] for row in rows]
+
+
+class CatalogSnapshot:
+    """An immutable, fully decoded copy of the products table at one catalog version.
+
+    Product dicts are shared between requests and must be treated as read-only.
+    """
+
+    def __init__(self, version, products, previous=None, attribute_rows=None, stock_version=None):
+        self.version = version
+        self.stock_version = stock_version
+        self.products = products
+        self.by_id = {p['id']: p for p in products}
+        self.columns = tuple(products[0].keys()) if products else ()
+        self.by_category = {}
+        for product in products:
+            self.by_category.setdefault(product.get('category'), []).append(product)
+        # Lower-cased search keys, computed once instead of per request.
+        self._name_keys = [(p.get('name') or '').lower() for p in products]
+        self._plant_type_keys = [(p.get('plant_type') or '').lower() for p in products]
+        # Inverted index over product_attributes: (attribute, lower-cased value) ->
+        # product ids, plus the per-product rows for facet counting. Values keep
+        # the spelling they were first seen with for display.
+        if attribute_rows is None:
+            attribute_rows = [row for p in products for row in product_attribute_rows(p)]
+        self._postings = {}
+        self._attributes = {}
+        self._labels = {}
+        for product_id, attribute, value in attribute_rows:
+            if product_id not in self.by_id:
+                continue
+            key = (attribute, value.lower())
+            self._postings.setdefault(key, set()).add(product_id)
+            self._attributes.setdefault(product_id, []).append(key)
+            self._labels.setdefault(key, value)
+        # Per-snapshot memo for derived values (e.g. serialized responses).
+        # Dropped wholesale when the snapshot is replaced.
+        self._memo = {}
+        # product_id -> (etag, serialized detail body). Entries for rows that are
+        # unchanged since the previous snapshot are carried over, so a write to one
+        # product only invalidates that product's cached response.
+        self._details = {}
+        if previous is not None:
+            for product_id, entry in previous._details.items():
+                product = self.by_id.get(product_id)
+                if product is previous.by_id.get(product_id) or product == previous.by_id.get(product_id):
+                    self._details[product_id] = entry
+
+    def with_stock(self, stock_by_id, stock_version):
+        """A snapshot of the same catalog version with stock levels from `stock_by_id`.
+
+        Used when only stock changed (e.g. after an order): unchanged product
+        dicts, the attribute index and their cached detail responses are reused,
+        so nothing is re-read or re-decoded beyond the stock column.
+        """
+        products = [
+            dict(p, stock=stock_by_id[p['id']]) if stock_by_id.get(p['id'], p['stock']) != p['stock'] else p
+            for p in self.products
+        ]
+        attribute_rows = [(product_id, key[0], self._labels[key])
+                          for product_id, keys in self._attributes.items() for key in keys]
+        return CatalogSnapshot(self.version, products, previous=self, attribute_rows=attribute_rows,
+                               stock_version=stock_version)
+
+    def filter(self, name=None, category=None, plant_type=None):
+        """Returns products matching all given filters.
+
+        Mirrors the previous SQL semantics: `name` and `plant_type` are
+        case-insensitive substring matches (LIKE '%x%'), `category` is exact.
+        """
+        if not (name or category or plant_type):
+            return self.products
+        name = name.lower() if name else None
+        plant_type = plant_type.lower() if plant_type else None
+        results = []
+        for i, product in enumerate(self.products):
+            if category and product.get('category') != category:
+                continue
+            if name and name not in self._name_keys[i]:
+                continue
+            if plant_type and plant_type not in self._plant_type_keys[i]:
+                continue
+            results.append(product)
+        return results
+
+    def search(self, ranked_ids=None, text=None, **filters):
+        """Applies `filter()` to a full-text result set, keeping its ranking.
+
+        `ranked_ids` comes from fts_search_ids(). If it is None (no FTS index),
+        `text` is matched as a plain substring of the indexed columns instead.
+        """
+        if ranked_ids is None:
+            terms = [t.lower() for t in _FTS_TOKEN_RE.findall(text or '')]
+            candidates = [
+                p for p in self.products
+                if all(any(term in (p.get(f) or '').lower()
+                           for f in ('name', 'description', 'botanical_name', 'plant_type'))
+                       for term in terms)
+            ]
+        else:
+            candidates = [self.by_id[pid] for pid in ranked_ids if pid in self.by_id]
+        if not any(filters.values()):
+            return candidates
+        allowed = {id(p) for p in self.filter(**filters)}
+        return [p for p in candidates if id(p) in allowed]
+
+    def filter_attributes(self, candidates, criteria):
+        """Keeps the candidates matching `criteria` from parse_attribute_filters(), in order.
+
+        Each attribute is a posting-list union over its values; attributes are
+        intersected, so no product row is decoded or scanned per request.
+        """
+        if not criteria:
+            return candidates
+        matching = None
+        for attribute, values in criteria.items():
+            ids = set()
+            for value in values:
+                ids |= self._postings.get((attribute, value), set())
+            matching = ids if matching is None else matching & ids
+            if not matching:
+                return []
+        return [p for p in candidates if p['id'] in matching]
+
+    def facet_counts(self, products, fields=FACET_FIELDS):
+        """Counts attribute values over `products`: {attribute: {value: count}}, most common first."""
+        wanted = set(fields)
+        counts = {field: {} for field in fields}
+        for product in products:
+            for key in self._attributes.get(product['id'], ()):
+                if key[0] in wanted:
+                    field_counts = counts[key[0]]
+                    field_counts[key] = field_counts.get(key, 0) + 1
+        return {
+            field: {self._labels[key]: n for key, n in sorted(field_counts.items(), key=lambda kv: (-kv[1], kv[0][1]))}
+            for field, field_counts in counts.items()
+        }
+
+    def sorted_view(self, field):
+        """Returns (products, keys) for `field` in ascending order, built once per snapshot.
+
+        This plays the role of a SQL index on the column: keyset lookups are a
+        bisect over `keys` instead of a sort per request.
+        """
+        def build():
+            ordered = sorted(self.products, key=lambda p: _sort_key(p, field))
+            return ordered, [_sort_key(p, field) for p in ordered]
+        return self.memoize(('sorted', field), build)
+
+    def paginate(self, candidates, sort=None, after=None, limit=None):
+        """Orders and pages `candidates` (a subset of this snapshot's products).
+
+        Args:
+            candidates: Products to page over. If `sort` is None they are taken in
+                the given order (e.g. full-text relevance).
+            sort: One of SORT_FIELDS, optionally prefixed with '-' for descending.
+            after: Cursor returned with the previous page.
+            limit: Maximum number of products to return; None for no limit.
+
+        Returns:
+            (page, next_cursor); next_cursor is None on the last page.
+
+        Raises:
+            ValueError: if the cursor is malformed or belongs to a different sort.
+        """
+        cursor = decode_cursor(after) if after else None
+        if cursor is not None and cursor['s'] != (sort or 'relevance'):
+            raise ValueError("Pagination cursor does not match the requested sort order.")
+
+        if sort is None:
+            start = 0
+            if cursor is not None:
+                positions = {p['id']: i for i, p in enumerate(candidates)}
+                if cursor['id'] not in positions:
+                    raise ValueError("Pagination cursor refers to a product that is no longer in the results.")
+                start = positions[cursor['id']] + 1
+            end = len(candidates) if limit is None else start + limit
+            page = candidates[start:end]
+            has_more = end < len(candidates)
+            next_cursor = encode_cursor({'s': 'relevance', 'id': page[-1]['id']}) if has_more and page else None
+            return page, next_cursor
+
+        descending = sort.startswith('-')
+        field = sort.lstrip('-')
+        cursor_key = _cursor_sort_key(cursor, field) if cursor else None
+        ordered, keys = self.sorted_view(field)
+        allowed = None if candidates is self.products else {p['id'] for p in candidates}
+        if descending:
+            end = bisect.bisect_left(keys, cursor_key) if cursor else len(ordered)
+            walk = range(end - 1, -1, -1)
+        else:
+            start = bisect.bisect_right(keys, cursor_key) if cursor else 0
+            walk = range(start, len(ordered))
+
+        page = []
+        next_cursor = None
+        for i in walk:
+            product = ordered[i]
+            if allowed is not None and product['id'] not in allowed:
+                continue
+            if limit is not None and len(page) == limit:
+                last_key, last_id = _sort_key(page[-1], field)
+                next_cursor = encode_cursor({'s': sort, 'k': last_key, 'id': last_id})
+                break
+            page.append(product)
+        return page, next_cursor
+
+    def product_details(self, product_ids):
+        """Resolves many product ids at once for POST /api/products/batch.
+
+        Returns (payloads, missing_ids): detail payloads in request order with
+        duplicates collapsed, and the ids that are not in the catalog.
+        """
+        payloads, missing_ids, seen = [], [], set()
+        for product_id in product_ids:
+            if product_id in seen:
+                continue
+            seen.add(product_id)
+            product = self.by_id.get(product_id)
+            if product is None:
+                missing_ids.append(product_id)
+            else:
+                payloads.append(product_detail_payload(product))
+        return payloads, missing_ids
+
+    def product_detail(self, product_id, dumps):
+        """Returns (etag, body bytes) for a product's detail response, or None if unknown.
+
+        `dumps` serializes the payload to a str; it only runs on a cache miss.
+        """
+        entry = self._details.get(product_id)
+        if entry is None:
+            product = self.by_id.get(product_id)
+            if product is None:
+                return None
+            body = f"{dumps(product_detail_payload(product))}\n".encode('utf-8')
+            entry = self._details[product_id] = (compute_etag(body), body)
+        return entry
+
+    def memoize(self, key, factory):
+        """Returns the cached value for `key`, computing it with `factory()` on first use."""
+        try:
+            return self._memo[key]
+        except KeyError:
+            value = self._memo[key] = factory()
+            return value
+
+
+class CatalogCache:
+    """Process-wide holder of the current CatalogSnapshot.
+
+    Change detection is two-level so that unrelated writes (e.g. cart updates)
+    do not trigger a reload:
+      1. `PRAGMA data_version` on a dedicated connection tells us whether *any*
+         other connection committed since we last looked (no table access).
+      2. Only then is the `catalog_version` row read; it is bumped by triggers on
+         the products table. Databases created before that table existed fall
+         back to reloading on every data_version change.
+    Stock updates bump `stock_version` instead; they only re-read the stock
+    column and patch it into a copy of the snapshot (CatalogSnapshot.with_stock).
+    A new snapshot is built off to the side and swapped in with a single
+    attribute assignment, so readers never observe a half-built catalog.
+    """
+
+    def __init__(self, database, refresh_interval_secs=DEFAULT_REFRESH_INTERVAL_SECS):
+        self.database = database
+        self.refresh_interval_secs = refresh_interval_secs
+        self._lock = threading.Lock()
+        self._conn = None
+        self._snapshot = None
+        self._data_version = None
+        self._dirty = True
+        self._next_check = 0.0
+
+    def get(self):
+        """Returns the current snapshot, reloading it first if the catalog changed."""
+        snapshot = self.peek()
+        if snapshot is not None:
+            return snapshot
+        with self._lock:
+            self._refresh_if_stale()
+            return self._snapshot
+
+    def peek(self):
+        """The current snapshot if get() would return it without a version check, else None.
+
+        Lets async callers serve from memory on the event loop and run get()
+        on a worker thread only when it may touch the database.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and not self._dirty and time.monotonic() < self._next_check:
+            return snapshot
+        return None
+
+    def invalidate(self):
+        """Forces a version check on the next get(). Call after writing to products."""
+        self._dirty = True
+
+    def _connection(self):
+        if self._conn is None:
+            # Only ever used while holding self._lock.
+            self._conn = sqlite3.connect(self.database, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+        return self._conn
+
+    def _catalog_version(self, conn):
+        try:
+            row = conn.execute("SELECT version FROM catalog_version WHERE id = 1").fetchone()
+        except sqlite3.OperationalError:
+            return None # Legacy database without the catalog_version table/triggers
+        return row[0] if row else None
+
+    def _stock_version(self, conn):
+        try:
+            row = conn.execute("SELECT version FROM stock_version WHERE id = 1").fetchone()
+        except sqlite3.OperationalError:
+            return None # Database created before stock_version; stock writes bump catalog_version
+        return row[0] if row else None
+
+    def _refresh_if_stale(self):
+        conn = self._connection()
+        self._next_check = time.monotonic() + self.refresh_interval_secs
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if self._snapshot is not None and not self._dirty and data_version == self._data_version:
+            return
+        self._data_version = data_version
+        self._dirty = False
+        catalog_version = self._catalog_version(conn)
+        stock_version = self._stock_version(conn)
+        if (self._snapshot is not None and catalog_version is not None
+                and catalog_version == self._snapshot.version):
+            if stock_version != self._snapshot.stock_version:
+                stock_by_id = dict(tuple(row) for row in conn.execute("SELECT id, stock FROM products"))
+                self._snapshot = self._snapshot.with_stock(stock_by_id, stock_version)
+            return
+        self._snapshot = self._load(conn, catalog_version, stock_version)
+
+    def _load(self, conn, catalog_version, stock_version=None):
+        started = time.perf_counter()
+        try:
+            rows = conn.execute("SELECT * FROM products").fetchall()
+        except sqlite3.OperationalError as e:
+            logger.error(f"Could not load product catalog from '{self.database}': {e}")
+            rows = []
+        products = [decode_product_row(dict(row)) for row in rows]
+        try:
+            attribute_rows = [tuple(row) for row in conn.execute(
+                "SELECT product_id, attribute, value FROM product_attributes")]
+        except sqlite3.OperationalError:
+            logger.warning("product_attributes table not found; deriving attribute filters from the JSON columns.")
+            attribute_rows = None
+        snapshot = CatalogSnapshot(catalog_version, products, previous=self._snapshot,
+                                   attribute_rows=attribute_rows, stock_version=stock_version)
+        logger.info(f"Loaded catalog snapshot (version {catalog_version}) with {len(products)} products "
+                    f"in {(time.perf_counter() - started) * 1000:.1f} ms.")
+        return snapshot
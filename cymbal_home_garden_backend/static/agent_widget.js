@@ -438,6 +438,9 @@ let initialGreetingSent = false; // Tracks if the first user message/greeting ha
                 if (parsedData.payload && parsedData.payload.added_item) { 
                     messageToParent.added_item_details = parsedData.payload.added_item;
                 }
+                if (parsedData.payload && parsedData.payload.cart) {
+                    messageToParent.cart = parsedData.payload.cart; // Updated cart from the tool result; no refetch needed
+                }
                 window.parent.postMessage(messageToParent, 'http://localhost:5000');
                 currentAgentMessageElement = null; return;
             }
@@ -476,6 +479,13 @@ let initialGreetingSent = false; // Tracks if the first user message/greeting ha
                     window.parent.postMessage({ type: 'ui_select_pickup_address', address_index: parsedData.address_index }, 'http://localhost:5000');
                 }
                 currentAgentMessageElement = null; return;
+            }
+            // The server is holding back the agent's reply (model call quota)
+            if (parsedData.type === "command" && parsedData.command_name === "rate_limited") {
+                const retryAfter = parsedData.payload?.retry_after_secs;
+                console.log(`[AgentWidgetDebug] websocket.onmessage: Received 'rate_limited'. Retry after: ${retryAfter}s`);
+                addMessageToChat("system", `Lots of requests right now, the reply will follow in about ${Math.ceil(retryAfter || 1)} seconds...`);
+                currentAgentMessageElement = null; return;
             }
                 // Handle order_confirmed_refresh_cart command
             if (parsedData.type === "command" && parsedData.command_name === "order_confirmed_refresh_cart") {
@@ -218,19 +218,24 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     // --- Cart Logic (Backend Integrated) ---
+    // Renders cart data shaped like GET /api/cart/<id> (also returned by /api/cart/modify/<id>).
+    function applyCartData(data) {
+        currentCartItemsData = data.items || [];
+        currentCartItemIds = currentCartItemsData.map(item => item.product_id);
+        renderCartItems(currentCartItemsData); // Will now render to sidebar
+        calculateSubtotal(currentCartItemsData); // Will now update sidebar subtotal
+        updateCartCount(currentCartItemsData); // Will now update sidebar count
+        displayRecommendedProducts();
+        const subtotal = currentCartItemsData.reduce((sum, item) => sum + ((item.price_per_unit || 0) * item.quantity), 0);
+        return { items: currentCartItemsData, subtotal: subtotal }; // Return the necessary data
+    }
+
     async function fetchCart() {
         console.log("[Cart] Fetching cart data...");
         try {
             const data = await fetchAPI(`/api/cart/${DEFAULT_CUSTOMER_ID}`);
             console.log("[Cart] Cart data received:", data);
-            currentCartItemsData = data.items || [];
-            currentCartItemIds = currentCartItemsData.map(item => item.product_id);
-            renderCartItems(currentCartItemsData); // Will now render to sidebar
-            calculateSubtotal(currentCartItemsData); // Will now update sidebar subtotal
-            updateCartCount(currentCartItemsData); // Will now update sidebar count
-            displayRecommendedProducts();
-            const subtotal = currentCartItemsData.reduce((sum, item) => sum + ((item.price_per_unit || 0) * item.quantity), 0);
-            return { items: currentCartItemsData, subtotal: subtotal }; // Return the necessary data
+            return applyCartData(data);
         } catch (error) {
             console.error("[Cart] Error fetching cart:", error);
             if(cartSidebarItemsContainer) cartSidebarItemsContainer.innerHTML = '<p>Error loading cart. Please try again.</p>';
@@ -506,7 +511,11 @@ document.addEventListener('DOMContentLoaded', () => {
             applyTheme(newTheme);
         } else if (event.data.type === "REFRESH_CART_DISPLAY") {
             console.log("[Main Page DEBUG] Received REFRESH_CART_DISPLAY from widget. Data:", event.data);
-            fetchCart(); // This will update the sidebar cart display
+            if (event.data.cart) {
+                applyCartData(event.data.cart); // The agent's cart update already carries the new cart
+            } else {
+                fetchCart(); // This will update the sidebar cart display
+            }
 
             if (event.data.added_item_details && event.data.added_item_details.image_url) {
                 console.log("[Main Page DEBUG] Item added via agent, attempting animation. Details:", event.data.added_item_details);
@@ -1,12 +1,13 @@
 # cymbal_home_garden_backend/database_setup.py
 
+import os
 import sqlite3
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-DATABASE_NAME = 'ecommerce.db'
+DATABASE_NAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ecommerce.db') # Same file as app.DATABASE
 
 def create_tables():
     conn = sqlite3.connect(DATABASE_NAME)
@@ -19,12 +20,17 @@ def create_tables():
     logger.info("Dropped existing products table (if any).")
     cursor.execute("DROP TABLE IF EXISTS cart_items") # Also drop cart_items due to foreign key
     logger.info("Dropped existing cart_items table (if any).")
+    cursor.execute("DROP TABLE IF EXISTS products_fts") # External-content index of products, rebuilt below
+    logger.info("Dropped existing products_fts table (if any).")
+    cursor.execute("DROP TABLE IF EXISTS product_attributes") # Normalized product attribute values, repopulated by the importer
+    logger.info("Dropped existing product_attributes table (if any).")
 
 
     # Products table with richer details
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS products (
-        id TEXT PRIMARY KEY,                      -- Unique product SKU
+        product_rowid INTEGER PRIMARY KEY,        -- Stable rowid alias keying products_fts (survives VACUUM)
+        id TEXT NOT NULL UNIQUE,                  -- Unique product SKU
         name TEXT NOT NULL,                       -- Common Name
         description TEXT,                         -- Detailed description
         price REAL NOT NULL,
@@ -100,11 +106,242 @@ def create_tables():
         FOREIGN KEY (product_id) REFERENCES products (id)
     )
     ''')
-    logger.info("Cart items table created or already exists.")
+    # One line per product per customer: lets cart writes be single-statement
+    # UPSERTs (INSERT ... ON CONFLICT DO UPDATE) and indexes every cart lookup.
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_cart_items_customer_product ON cart_items (customer_id, product_id)")
+    logger.info("Cart items table and (customer_id, product_id) unique index created or already exist.")
+
+    # Per-customer cart version, bumped by triggers on every cart_items write.
+    # GET /api/cart/<id> uses it as the ETag, so clients holding a copy of the
+    # cart can revalidate it (If-None-Match -> 304) without the cart being
+    # re-read or re-sent. Not dropped above, for the same reason as catalog_version.
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS cart_versions (
+        customer_id TEXT PRIMARY KEY,
+        version INTEGER NOT NULL
+    ) WITHOUT ROWID
+    ''')
+    # cart_items was dropped above without firing DELETE triggers: invalidate every known cart.
+    cursor.execute("UPDATE cart_versions SET version = version + 1")
+    for event, row in (("INSERT", "new"), ("UPDATE", "new"), ("DELETE", "old")):
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS cart_items_version_{event.lower()}
+        AFTER {event} ON cart_items
+        BEGIN
+            INSERT INTO cart_versions (customer_id, version) VALUES ({row}.customer_id, 1)
+            ON CONFLICT (customer_id) DO UPDATE SET version = version + 1;
+        END
+        ''')
+    logger.info("Cart versions table and cart_items triggers created or already exist.")
+
+    # Normalized, indexed copy of the filterable attributes that products stores as
+    # JSON string arrays (flower_color, flowering_season, ...) and of the booleans
+    # (pet_safe, ...), one row per product and value. The primary key doubles as
+    # the (attribute, value) index used for filtering and facet counts.
+    # Populated by sample_data_importer.py.
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS product_attributes (
+        product_id TEXT NOT NULL,
+        attribute TEXT NOT NULL,                  -- e.g., "flower_color", "pet_safe"
+        value TEXT NOT NULL COLLATE NOCASE,       -- e.g., "Purple"; booleans are "true"/"false"
+        PRIMARY KEY (attribute, value, product_id),
+        FOREIGN KEY (product_id) REFERENCES products (id)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_product_attributes_product_id ON product_attributes (product_id)")
+    logger.info("Product attributes table created or already exists.")
+
+    # Catalog version counter, bumped by triggers on every products write except
+    # stock updates (see stock_version below).
+    # The in-memory catalog snapshot in app.py compares this value to decide
+    # whether it needs to reload, so cart writes never force a catalog rebuild.
+    # The table is deliberately NOT dropped above: keeping the counter monotonic
+    # across re-runs means a freshly re-imported catalog never reuses a version
+    # number an already-running server has cached.
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS catalog_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)")
+    # DROP TABLE does not fire DELETE triggers, so bump explicitly for the
+    # now-empty products table.
+    cursor.execute("UPDATE catalog_version SET version = version + 1 WHERE id = 1")
+    # Stock is left out of the products UPDATE trigger: checkout decrements it on
+    # every order, and a catalog version bump would force a full snapshot reload
+    # and change every customer's cart ETag (see storefront.cart_etag).
+    catalog_columns = ", ".join(row[1] for row in cursor.execute("PRAGMA table_info(products)") if row[1] != "stock")
+    for table in ("products", "product_attributes"):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            of_columns = f" OF {catalog_columns}" if table == "products" and event == "UPDATE" else ""
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_catalog_version_{event.lower()}
+            AFTER {event}{of_columns} ON {table}
+            BEGIN
+                UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+            END
+            ''')
+    logger.info("Catalog version table and products/product_attributes triggers created or already exist.")
+
+    # Stock version counter, bumped on every stock update. The catalog snapshot
+    # patches the new stock levels into its products when only this changed,
+    # instead of reloading the catalog. Kept across re-runs like catalog_version.
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS stock_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO stock_version (id, version) VALUES (1, 0)")
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS products_stock_version_update
+    AFTER UPDATE OF stock ON products
+    BEGIN
+        UPDATE stock_version SET version = version + 1 WHERE id = 1;
+    END
+    ''')
+    logger.info("Stock version table and products stock trigger created or already exist.")
+
+    # Full-text index for product search (GET /api/products?q=...).
+    # External-content FTS5 table: it stores only the index and reads column values
+    # back from products by product_rowid. The triggers keep it in sync with every write.
+    # It is keyed by the INTEGER PRIMARY KEY alias rather than the implicit rowid,
+    # which VACUUM may renumber on a table with a TEXT primary key.
+    # prefix='2 3' adds prefix indexes so short "lav*"-style queries stay cheap.
+    cursor.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, description, botanical_name, plant_type,
+        content='products', content_rowid='product_rowid',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts (rowid, name, description, botanical_name, plant_type)
+        VALUES (new.product_rowid, new.name, new.description, new.botanical_name, new.plant_type);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts (products_fts, rowid, name, description, botanical_name, plant_type)
+        VALUES ('delete', old.product_rowid, old.name, old.description, old.botanical_name, old.plant_type);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS products_fts_update
+    AFTER UPDATE OF name, description, botanical_name, plant_type ON products BEGIN
+        INSERT INTO products_fts (products_fts, rowid, name, description, botanical_name, plant_type)
+        VALUES ('delete', old.product_rowid, old.name, old.description, old.botanical_name, old.plant_type);
+        INSERT INTO products_fts (rowid, name, description, botanical_name, plant_type)
+        VALUES (new.product_rowid, new.name, new.description, new.botanical_name, new.plant_type);
+    END
+    ''')
+    logger.info("Full-text search table products_fts and sync triggers created or already exist.")
+
+    create_customer_tables(cursor)
 
     conn.commit()
     conn.close()
     logger.info(f"Database '{DATABASE_NAME}' and tables initialized successfully with new schema.")
 
+def create_customer_tables(cursor):
+    # Customer profiles, read by the agent's customer repository
+    # (agents/customer-service/customer_service/entities/customer_repository.py).
+    # Normalized over five tables; none of them are dropped above, as profiles
+    # are not re-imported with the catalog. Populated by sample_data_importer.py.
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS customers (
+        customer_id TEXT PRIMARY KEY,
+        account_number TEXT NOT NULL,
+        first_name TEXT NOT NULL,
+        last_name TEXT NOT NULL,
+        email TEXT NOT NULL,
+        phone_number TEXT NOT NULL,
+        customer_start_date TEXT NOT NULL,
+        years_as_customer INTEGER NOT NULL DEFAULT 0,
+        loyalty_points INTEGER NOT NULL DEFAULT 0,
+        preferred_store TEXT NOT NULL,
+        email_opt_in BOOLEAN NOT NULL DEFAULT TRUE,       -- Communication preferences
+        sms_opt_in BOOLEAN NOT NULL DEFAULT TRUE,
+        push_opt_in BOOLEAN NOT NULL DEFAULT TRUE,
+        scheduled_appointments TEXT NOT NULL DEFAULT '{}', -- JSON object
+        version INTEGER NOT NULL DEFAULT 1                  -- Bumped by the triggers below on every write
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS customer_addresses (
+        customer_id TEXT NOT NULL,
+        kind TEXT NOT NULL DEFAULT 'billing',
+        street TEXT NOT NULL,
+        city TEXT NOT NULL,
+        state TEXT NOT NULL,
+        zip TEXT NOT NULL,
+        PRIMARY KEY (customer_id, kind),
+        FOREIGN KEY (customer_id) REFERENCES customers (customer_id)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS garden_profiles (
+        customer_id TEXT PRIMARY KEY,
+        type TEXT NOT NULL,
+        size TEXT NOT NULL,
+        sun_exposure TEXT NOT NULL,
+        soil_type TEXT NOT NULL,
+        interests TEXT NOT NULL DEFAULT '[]',             -- JSON string array
+        FOREIGN KEY (customer_id) REFERENCES customers (customer_id)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS customer_purchases (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        customer_id TEXT NOT NULL,
+        date TEXT NOT NULL,
+        total_amount REAL NOT NULL,
+        FOREIGN KEY (customer_id) REFERENCES customers (customer_id)
+    )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_customer_purchases_customer ON customer_purchases (customer_id, date)")
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS customer_purchase_items (
+        purchase_id INTEGER NOT NULL,
+        line INTEGER NOT NULL,
+        product_id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        quantity INTEGER NOT NULL,
+        PRIMARY KEY (purchase_id, line),
+        FOREIGN KEY (purchase_id) REFERENCES customer_purchases (id)
+    ) WITHOUT ROWID
+    ''')
+    logger.info("Customer tables created or already exist.")
+
+    # customers.version is bumped on every write to a customer's rows, whichever
+    # process makes it; the repository revalidates its cached profiles against it.
+    # A direct update of a customers row that leaves version alone still bumps it
+    # (recursive triggers are off, so the inner UPDATE does not fire this again).
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS customers_version_update
+    AFTER UPDATE ON customers WHEN new.version = old.version
+    BEGIN
+        UPDATE customers SET version = old.version + 1 WHERE customer_id = new.customer_id;
+    END
+    ''')
+    owners = {
+        "customer_addresses": "{row}.customer_id",
+        "garden_profiles": "{row}.customer_id",
+        "customer_purchases": "{row}.customer_id",
+        "customer_purchase_items": "(SELECT customer_id FROM customer_purchases WHERE id = {row}.purchase_id)",
+    }
+    for table, owner in owners.items():
+        for event, row in (("INSERT", "new"), ("UPDATE", "new"), ("DELETE", "old")):
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()}
+            AFTER {event} ON {table}
+            BEGIN
+                UPDATE customers SET version = version + 1 WHERE customer_id = {owner.format(row=row)};
+            END
+            ''')
+    logger.info("Customer version triggers created or already exist.")
+
 if __name__ == '__main__':
     create_tables()
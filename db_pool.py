@@ -0,0 +1,176 @@
+# cymbal_home_garden_backend/db_pool.py
+
+import sqlite3
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Defaults for ConnectionPool; app.py lets each be overridden from the environment.
+DEFAULT_POOL_SIZE = 8
+DEFAULT_POOL_TIMEOUT_SECS = 5.0
+DEFAULT_CACHE_SIZE_KIB = 16384          # PRAGMA cache_size, per connection
+DEFAULT_MMAP_SIZE = 64 * 1024 * 1024    # PRAGMA mmap_size, bytes; 0 disables memory-mapped I/O
+DEFAULT_BUSY_TIMEOUT_MS = 5000          # How long a writer waits for the write lock before "database is locked"
+DEFAULT_STATEMENT_CACHE_SIZE = 256      # Prepared statements kept per connection (sqlite3 cached_statements)
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection became free within the pool timeout."""
+
+
+class ConnectionPool:
+    """A bounded, thread-safe pool of long-lived SQLite connections.
+
+    Every connection is opened once and configured for concurrent use:
+      - journal_mode=WAL, so readers never block the cart writers and vice versa
+        (WAL is a property of the database file and persists once set).
+      - synchronous=NORMAL, which is durable against application crashes in WAL
+        mode and avoids an fsync on every commit.
+      - Configurable cache_size/mmap_size and busy_timeout.
+    Because connections outlive requests, sqlite3's per-connection statement
+    cache keeps frequently used queries prepared across requests.
+
+    Idle connections are handed out most-recently-used first. acquire() blocks
+    for up to `timeout_secs` when all `size` connections are in use; time spent
+    waiting is reported by stats().
+    """
+
+    def __init__(self, database, size=DEFAULT_POOL_SIZE, timeout_secs=DEFAULT_POOL_TIMEOUT_SECS,
+                 cache_size_kib=DEFAULT_CACHE_SIZE_KIB, mmap_size=DEFAULT_MMAP_SIZE,
+                 busy_timeout_ms=DEFAULT_BUSY_TIMEOUT_MS, statement_cache_size=DEFAULT_STATEMENT_CACHE_SIZE):
+        if size < 1:
+            raise ValueError("Connection pool size must be at least 1.")
+        self.database = database
+        self.size = size
+        self.timeout_secs = timeout_secs
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.statement_cache_size = statement_cache_size
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._acquisitions = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._total_wait_secs = 0.0
+        self._max_wait_secs = 0.0
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.database,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False, # Connections move between request threads via the pool
+            cached_statements=self.statement_cache_size,
+        )
+        conn.row_factory = sqlite3.Row # Access columns by name
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.OperationalError as e:
+            # Switching modes needs a moment without other writers; the next connection retries.
+            logger.warning(f"Could not enable WAL journaling on '{self.database}': {e}")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kib)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        return conn
+
+    def acquire(self):
+        """Returns a connection for exclusive use until release().
+
+        Raises:
+            PoolTimeoutError: if every connection stayed busy for `timeout_secs`.
+        """
+        started = time.perf_counter()
+        waited = False
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                waited = True
+                try:
+                    conn = self._idle.get(timeout=self.timeout_secs)
+                except queue.Empty:
+                    with self._lock:
+                        self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"No database connection available after {self.timeout_secs:.1f}s "
+                        f"(pool size {self.size}).") from None
+        wait_secs = time.perf_counter() - started
+        with self._lock:
+            self._in_use += 1
+            self._acquisitions += 1
+            self._total_wait_secs += wait_secs
+            if waited:
+                self._waits += 1
+            if wait_secs > self._max_wait_secs:
+                self._max_wait_secs = wait_secs
+        return conn
+
+    def release(self, conn):
+        """Returns a connection to the pool, rolling back anything left uncommitted."""
+        with self._lock:
+            self._in_use -= 1
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logger.warning(f"Discarding pooled connection after failed rollback: {e}")
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """`with pool.connection() as conn:` acquire/release helper for non-request code."""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def stats(self):
+        """Pool occupancy and acquire wait-time counters since startup."""
+        with self._lock:
+            acquisitions = self._acquisitions
+            return {
+                "size": self.size,
+                "connections_open": self._created,
+                "in_use": self._in_use,
+                "idle": self._idle.qsize(),
+                "acquisitions": acquisitions,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "avg_wait_ms": round(self._total_wait_secs * 1000 / acquisitions, 3) if acquisitions else 0.0,
+                "max_wait_ms": round(self._max_wait_secs * 1000, 3),
+                "total_wait_ms": round(self._total_wait_secs * 1000, 3),
+            }
+
+    def close(self):
+        """Closes all idle connections; connections currently in use are unaffected."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
@@ -1,13 +1,15 @@
 # cymbal_home_garden_backend/sample_data_importer.py
 
+import os
 import sqlite3
 import logging
 import json # For encoding lists as JSON strings
+from catalog_snapshot import product_attribute_rows
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-DATABASE_NAME = 'ecommerce.db'
+DATABASE_NAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ecommerce.db') # Same file as app.DATABASE
 
 # Define SKUs for cross-referencing
 SKU_LAVENDER = "SKU_PLANT_LAVENDER_001"
@@ -380,6 +382,70 @@ SAMPLE_PRODUCTS = [
     },
 ]
 
+# Customer profiles for the agent's customer repository. "123" is the customer
+# the agent's instructions are built for (see the agent's prompts.py).
+SAMPLE_CUSTOMERS = [
+    {
+        "customer_id": "123", "account_number": "428765091", "first_name": "josh", "last_name": "belay",
+        "email": "josh.belay@example.com", "phone_number": "+1-702-555-1212",
+        "customer_start_date": "2022-06-10", "years_as_customer": 2, "loyalty_points": 133,
+        "preferred_store": "Anytown Garden Store", "email_opt_in": True, "sms_opt_in": False, "push_opt_in": True,
+        "scheduled_appointments": json.dumps({}),
+        "billing_address": {"street": "bar khova 209", "city": "ashkelon", "state": "south", "zip": "783350"},
+        "garden_profile": {
+            "type": "backyard", "size": "small", "sun_exposure": "full sun", "soil_type": "unknown",
+            "interests": json.dumps(["flowers", "vegetables"]),
+        },
+        "purchases": [
+            {"date": "2023-03-05", "total_amount": 35.98, "items": [
+                ("fert-111", "All-Purpose Fertilizer", 1), ("trowel-222", "Gardening Trowel", 1),
+            ]},
+            {"date": "2023-07-12", "total_amount": 42.5, "items": [
+                ("seeds-333", "Tomato Seeds (Variety Pack)", 2), ("pots-444", "Terracotta Pots (6-inch)", 4),
+            ]},
+            {"date": "2024-01-20", "total_amount": 55.25, "items": [
+                ("gloves-555", "Gardening Gloves (Leather)", 1), ("pruner-666", "Pruning Shears", 1),
+            ]},
+        ],
+    },
+]
+
+def insert_sample_customers(cursor):
+    for customer in SAMPLE_CUSTOMERS:
+        customer_id = customer["customer_id"]
+        profile = {key: value for key, value in customer.items() if key not in ("billing_address", "garden_profile", "purchases")}
+        columns = ', '.join(profile)
+        placeholders = ', '.join(['?'] * len(profile))
+        try:
+            cursor.execute(
+                f"INSERT INTO customers ({columns}) VALUES ({placeholders}) ON CONFLICT(customer_id) DO NOTHING",
+                list(profile.values()),
+            )
+            if cursor.rowcount == 0:
+                continue # Already imported; its rows may have been updated since
+            address = customer["billing_address"]
+            cursor.execute(
+                "INSERT INTO customer_addresses (customer_id, kind, street, city, state, zip) VALUES (?, 'billing', ?, ?, ?, ?)",
+                (customer_id, address["street"], address["city"], address["state"], address["zip"]),
+            )
+            garden = customer["garden_profile"]
+            cursor.execute(
+                "INSERT INTO garden_profiles (customer_id, type, size, sun_exposure, soil_type, interests) VALUES (?, ?, ?, ?, ?, ?)",
+                (customer_id, garden["type"], garden["size"], garden["sun_exposure"], garden["soil_type"], garden["interests"]),
+            )
+            for purchase in customer["purchases"]:
+                cursor.execute(
+                    "INSERT INTO customer_purchases (customer_id, date, total_amount) VALUES (?, ?, ?)",
+                    (customer_id, purchase["date"], purchase["total_amount"]),
+                )
+                purchase_id = cursor.lastrowid
+                cursor.executemany(
+                    "INSERT INTO customer_purchase_items (purchase_id, line, product_id, name, quantity) VALUES (?, ?, ?, ?, ?)",
+                    [(purchase_id, line, *item) for line, item in enumerate(purchase["items"])],
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Error inserting customer {customer_id}: {e}")
+
 def insert_sample_data():
     conn = sqlite3.connect(DATABASE_NAME)
     cursor = conn.cursor()
@@ -404,10 +470,22 @@ def insert_sample_data():
             logger.error(f"Error inserting product {product_data.get('id', 'Unknown ID')}: {e}")
             logger.error(f"SQL: {sql}")
             logger.error(f"Values: {values}")
+            continue
+
+        # Mirror the filterable attributes into the normalized product_attributes table.
+        try:
+            cursor.executemany(
+                "INSERT OR IGNORE INTO product_attributes (product_id, attribute, value) VALUES (?, ?, ?)",
+                list(product_attribute_rows(product_data)),
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Error inserting attributes for product {product_data.get('id', 'Unknown ID')}: {e}")
+
+    insert_sample_customers(cursor)
 
     conn.commit()
     conn.close()
-    logger.info("Sample product data insertion process completed using new schema.")
+    logger.info("Sample product and customer data insertion process completed using new schema.")
 
 if __name__ == '__main__':
     # First, ensure tables are created with the new schema
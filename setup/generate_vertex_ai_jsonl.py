@@ -67,7 +67,7 @@ def transform_product_for_vertex_ai(product_data):
     # Handle standard text attributes and parsed JSON strings
     for key, value in product_data.items():
         # Exclude fields already mapped to top-level Vertex AI product schema or not direct attributes
-        if key in ['id', 'name', 'description', 'price', 'original_price', 'stock', 'category', 'image_url', 'product_uri', 'language_code']:
+        if key in ['product_rowid', 'id', 'name', 'description', 'price', 'original_price', 'stock', 'category', 'image_url', 'product_uri', 'language_code']:
             continue
 
         if value is None:
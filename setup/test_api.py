@@ -1,7 +1,14 @@
 import unittest
 import json
 import os
-from app import app # Your Flask app instance
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+import storefront
+from app import app, catalog_cache # Your Flask app instance
+from catalog_snapshot import encode_cursor
 from database_setup import create_tables, DATABASE_NAME
 from sample_data_importer import insert_sample_data, SAMPLE_PRODUCTS
 
@@ -45,6 +52,12 @@ class TestAPI(unittest.TestCase):
         # Let's assume tests are read-only for products for now.
         pass
 
+    def _restore_stock(self, *products):
+        """Checkout now decrements stock; put sample stock levels back for the other tests."""
+        with sqlite3.connect(DATABASE_NAME) as conn:
+            conn.executemany("UPDATE products SET stock = ? WHERE id = ?", [(p['stock'], p['id']) for p in products])
+        catalog_cache.invalidate()
+
     # --- Tests for GET /api/products ---
     def test_get_all_products_success(self):
         """Test successful retrieval of all products."""
@@ -151,7 +164,176 @@ class TestAPI(unittest.TestCase):
         for product in data_herb:
             self.assertIn('Herb', product.get('plant_type', ''))
             
+    def test_get_products_full_text_search(self):
+        """q= runs a ranked, prefix-capable full-text search."""
+        response = self.client.get('/api/products?q=lav')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertTrue(len(data) >= 2) # Lavender itself plus products mentioning lavender
+        self.assertEqual(data[0]['id'], "SKU_PLANT_LAVENDER_001") # Name match ranks first
+        self.assertIsInstance(data[0]['flower_color'], list)
+        self.assertNotIn('product_rowid', data[0])
+
+        # The index is keyed by products.product_rowid, which VACUUM keeps.
+        with sqlite3.connect(DATABASE_NAME) as conn:
+            conn.execute("VACUUM")
+            conn.execute("INSERT INTO products_fts (products_fts) VALUES ('integrity-check')")
+
+        # Botanical name is indexed too, and q combines with the other filters.
+        response = self.client.get('/api/products?q=lavandula&category=Plants')
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual([p['id'] for p in data], ["SKU_PLANT_LAVENDER_001"])
+
+        response = self.client.get('/api/products?q=lavender&category=Soil')
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertTrue(all(p['category'] == 'Soil' for p in data))
+
+        # FTS syntax in user input is treated as plain words, not an error.
+        response = self.client.get('/api/products?q=%22NEAR(lav%20OR')
+        self.assertEqual(response.status_code, 200)
+
+    def test_get_products_keyset_pagination_sort_and_fields(self):
+        """limit/after walk the whole catalog in sort order; fields projects columns."""
+        seen = []
+        after = None
+        while True:
+            url = '/api/products?sort=-price&limit=7&fields=id,price'
+            if after:
+                url += f'&after={after}'
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            page = json.loads(response.data.decode('utf-8'))
+            self.assertTrue(len(page) <= 7)
+            for product in page:
+                self.assertEqual(set(product.keys()), {'id', 'price'})
+            seen.extend(page)
+            after = response.headers.get('X-Next-Cursor')
+            if not after:
+                break
+            self.assertIn('rel="next"', response.headers.get('Link'))
+
+        self.assertEqual(len(seen), len(SAMPLE_PRODUCTS))
+        self.assertEqual(len({p['id'] for p in seen}), len(SAMPLE_PRODUCTS))
+        prices = [p['price'] for p in seen]
+        self.assertEqual(prices, sorted(prices, reverse=True))
+
+        # Filters combine with paging, and a cursor is bound to its sort order.
+        response = self.client.get('/api/products?category=Plants&sort=name&limit=2')
+        page = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(len(page), 2)
+        self.assertTrue(all(p['category'] == 'Plants' for p in page))
+        self.assertLessEqual(page[0]['name'].lower(), page[1]['name'].lower())
+        cursor = response.headers.get('X-Next-Cursor')
+        self.assertEqual(self.client.get(f'/api/products?sort=price&after={cursor}').status_code, 400)
+
+    def test_get_products_pagination_invalid_params(self):
+        """Bad sort/limit/fields/cursor values are rejected with 400."""
+        for query in ('sort=color', 'limit=0', 'limit=abc', 'limit=1000', 'fields=id,nope', 'after=garbage'):
+            response = self.client.get(f'/api/products?{query}')
+            self.assertEqual(response.status_code, 400, query)
+            self.assertIn('error', json.loads(response.data.decode('utf-8')))
+
+        # Well-formed JSON cursors whose sort key is missing or of the wrong type.
+        bad_cursors = (
+            ('price', {'s': 'price', 'id': 'x'}),
+            ('price', {'s': 'price', 'k': 'abc', 'id': 'x'}),
+            ('price', {'s': 'price', 'k': {'a': 1}, 'id': 'x'}),
+            ('price', {'s': 'price', 'k': [True, 'abc'], 'id': 'x'}),
+            ('name', {'s': 'name', 'k': [True, 3], 'id': 'x'}),
+            ('name', {'s': 'name', 'k': [True, 'a'], 'id': ['x']}),
+        )
+        for sort, data in bad_cursors:
+            response = self.client.get(f'/api/products?sort={sort}&after={encode_cursor(data)}')
+            self.assertEqual(response.status_code, 400, data)
+
+    def test_get_products_attribute_filters_and_facets(self):
+        """Attribute filters use the normalized table; facets count the filtered set."""
+        expected = [
+            p['id'] for p in SAMPLE_PRODUCTS
+            if p.get('pet_safe') and 'purple' in [c.lower() for c in json.loads(p.get('flower_color') or '[]')]
+        ]
+        self.assertTrue(expected)
+        response = self.client.get('/api/products?pet_safe=true&flower_color=purple&facets=all')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual(sorted(p['id'] for p in data['products']), sorted(expected))
+        self.assertEqual(data['facets']['pet_safe'], {'true': len(expected)})
+        self.assertEqual(data['facets']['flower_color']['Purple'], len(expected))
+
+        # Values of one attribute are OR-ed; results still page and sort.
+        response = self.client.get('/api/products?pollinator_types=Bees,Hummingbirds&sort=price&limit=100')
+        data = json.loads(response.data.decode('utf-8'))
+        for product in data:
+            self.assertTrue({'Bees', 'Hummingbirds'} & set(product['pollinator_types']))
+
+        self.assertEqual(self.client.get('/api/products?deer_resistant=maybe').status_code, 400)
+        self.assertEqual(self.client.get('/api/products?facets=price').status_code, 400)
+
+        with sqlite3.connect(DATABASE_NAME) as conn:
+            plan = ' '.join(row[-1] for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT product_id FROM product_attributes WHERE attribute = ? AND value = ?",
+                ('flower_color', 'purple')))
+        self.assertIn('USING PRIMARY KEY', plan)
+
+    def test_get_products_served_from_snapshot_until_catalog_changes(self):
+        """Cart writes must not rebuild the catalog snapshot; product writes must."""
+        self.client.get('/api/products')
+        snapshot_before = catalog_cache.get()
+
+        customer_id = "snapshot_customer_001"
+        self.client.post(f'/api/cart/{customer_id}/item', json={"product_id": SAMPLE_PRODUCTS[0]['id'], "quantity": 1})
+        catalog_cache.invalidate()
+        self.assertIs(catalog_cache.get(), snapshot_before)
+        cart_etag = self.client.get(f'/api/cart/{customer_id}').headers['ETag']
+
+        # Stock writes (orders) patch the snapshot: same catalog version, untouched
+        # products shared, and other customers' cart ETags unchanged.
+        stocked = SAMPLE_PRODUCTS[1]
+        with sqlite3.connect(DATABASE_NAME) as conn:
+            conn.execute("UPDATE products SET stock = stock - 1 WHERE id = ?", (stocked['id'],))
+        try:
+            catalog_cache.invalidate()
+            patched = catalog_cache.get()
+            self.assertEqual(patched.version, snapshot_before.version)
+            self.assertEqual(patched.by_id[stocked['id']]['stock'], stocked['stock'] - 1)
+            untouched_id = SAMPLE_PRODUCTS[2]['id']
+            self.assertIs(patched.by_id[untouched_id], snapshot_before.by_id[untouched_id])
+            self.assertEqual(self.client.get(f'/api/cart/{customer_id}').headers['ETag'], cart_etag)
+        finally:
+            self._restore_stock(stocked)
+        snapshot_before = catalog_cache.get()
+        self.client.delete(f'/api/cart/{customer_id}/clear')
+
+        # Simulate an external writer (e.g. the importer) changing a product.
+        product = SAMPLE_PRODUCTS[0]
+        conn = sqlite3.connect(DATABASE_NAME)
+        conn.execute("UPDATE products SET name = ? WHERE id = ?", ("Snapshot Rename Test", product['id']))
+        conn.commit()
+        try:
+            catalog_cache.invalidate()
+            data = json.loads(self.client.get('/api/products?name=Snapshot%20Rename').data.decode('utf-8'))
+            self.assertEqual([p['id'] for p in data], [product['id']])
+            self.assertIsNot(catalog_cache.get(), snapshot_before)
+        finally:
+            conn.execute("UPDATE products SET name = ? WHERE id = ?", (product['name'], product['id']))
+            conn.commit()
+            conn.close()
+            catalog_cache.invalidate()
+
     # --- Tests for GET /api/products/<product_id> ---
+    def test_sample_customers_seeded_once(self):
+        insert_sample_data() # Re-running the importer must not duplicate the customer's rows
+        with sqlite3.connect(DATABASE_NAME) as conn:
+            customer = conn.execute("SELECT first_name, loyalty_points FROM customers WHERE customer_id = '123'").fetchone()
+            purchases = conn.execute("SELECT COUNT(*) FROM customer_purchases WHERE customer_id = '123'").fetchone()[0]
+            items = conn.execute(
+                "SELECT COUNT(*) FROM customer_purchase_items i JOIN customer_purchases p ON p.id = i.purchase_id WHERE p.customer_id = '123'"
+            ).fetchone()[0]
+            garden = conn.execute("SELECT interests FROM garden_profiles WHERE customer_id = '123'").fetchone()
+        self.assertEqual(customer, ('josh', 133))
+        self.assertEqual((purchases, items), (3, 6))
+        self.assertEqual(json.loads(garden[0]), ["flowers", "vegetables"])
+
     def test_get_product_detail_success(self):
         """Test successful retrieval of a single product by ID."""
         # Use the ID of the first sample product
@@ -213,6 +395,69 @@ class TestAPI(unittest.TestCase):
         self.assertIn('error', data)
         self.assertEqual(data['error'], 'Product not found')
 
+    def test_get_products_batch(self):
+        """Batch lookup returns detail-shaped products in request order and reports missing ids."""
+        ids = [SAMPLE_PRODUCTS[2]['id'], "SKU_DOES_NOT_EXIST_999", SAMPLE_PRODUCTS[0]['id'], SAMPLE_PRODUCTS[2]['id']]
+        response = self.client.post('/api/products/batch', json={"ids": ids})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual([p['id'] for p in data['products']], [SAMPLE_PRODUCTS[2]['id'], SAMPLE_PRODUCTS[0]['id']])
+        self.assertEqual(data['missing_ids'], ["SKU_DOES_NOT_EXIST_999"])
+        single = json.loads(self.client.get(f"/api/products/{SAMPLE_PRODUCTS[0]['id']}").data.decode('utf-8'))
+        self.assertEqual(data['products'][1], single)
+
+        self.assertEqual(self.client.post('/api/products/batch', json={"ids": "SKU_1"}).status_code, 400)
+        self.assertEqual(self.client.post('/api/products/batch', json={"ids": ["x"] * 101}).status_code, 400)
+
+    def test_db_pool_reuses_wal_connections_and_reports_waits(self):
+        """Requests share pooled WAL connections; the stats endpoint reports acquire waits."""
+        before = json.loads(self.client.get('/api/stats/db-pool').data.decode('utf-8'))
+        for _ in range(3):
+            self.assertEqual(self.client.get('/api/products?q=lavender').status_code, 200)
+        stats = json.loads(self.client.get('/api/stats/db-pool').data.decode('utf-8'))
+        self.assertEqual(stats['acquisitions'], before['acquisitions'] + 3)
+        self.assertLessEqual(stats['connections_open'], stats['size'])
+        self.assertEqual(stats['in_use'], 0)
+        for key in ('avg_wait_ms', 'max_wait_ms', 'total_wait_ms', 'waits', 'timeouts'):
+            self.assertIn(key, stats)
+        with sqlite3.connect(DATABASE_NAME) as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+
+    def test_get_product_detail_etag_conditional_request(self):
+        """A matching If-None-Match returns 304; a changed row gets a new ETag."""
+        product = SAMPLE_PRODUCTS[0]
+        response = self.client.get(f'/api/products/{product["id"]}')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers.get('ETag')
+        self.assertTrue(etag)
+        self.assertIn('attributes', json.loads(response.data.decode('utf-8')))
+
+        response_304 = self.client.get(f'/api/products/{product["id"]}', headers={'If-None-Match': etag})
+        self.assertEqual(response_304.status_code, 304)
+        self.assertEqual(response_304.data, b'')
+        self.assertEqual(response_304.headers.get('ETag'), etag)
+
+        # Another product's cached response survives a write to this one.
+        other = SAMPLE_PRODUCTS[1]
+        other_etag = self.client.get(f'/api/products/{other["id"]}').headers.get('ETag')
+
+        conn = sqlite3.connect(DATABASE_NAME)
+        conn.execute("UPDATE products SET price = price + 1 WHERE id = ?", (product['id'],))
+        conn.commit()
+        try:
+            catalog_cache.invalidate()
+            response_changed = self.client.get(f'/api/products/{product["id"]}', headers={'If-None-Match': etag})
+            self.assertEqual(response_changed.status_code, 200)
+            self.assertNotEqual(response_changed.headers.get('ETag'), etag)
+            self.assertEqual(json.loads(response_changed.data.decode('utf-8'))['price'], product['price'] + 1)
+            response_other = self.client.get(f'/api/products/{other["id"]}', headers={'If-None-Match': other_etag})
+            self.assertEqual(response_other.status_code, 304)
+        finally:
+            conn.execute("UPDATE products SET price = ? WHERE id = ?", (product['price'], product['id']))
+            conn.commit()
+            conn.close()
+            catalog_cache.invalidate()
+
     # --- Tests for GET /api/products/availability/<product_id>/<store_id> ---
     def test_get_product_availability_in_stock(self):
         """Test availability for an in-stock product."""
@@ -238,6 +483,30 @@ class TestAPI(unittest.TestCase):
         self.assertIn('error', data)
         self.assertEqual(data['error'], 'Product not found for availability check')
 
+    def test_concurrent_availability_checks_share_one_query(self):
+        """Identical availability requests in flight at the same time run a single query."""
+        product_id = SAMPLE_PRODUCTS[0]['id']
+        real_availability = storefront.product_availability
+        queries = []
+        lock = threading.Lock()
+
+        def slow_availability(conn, *args):
+            with lock:
+                queries.append(args)
+            time.sleep(0.3)
+            return real_availability(conn, *args)
+
+        before = self.client.get('/api/stats/single-flight').get_json()
+        with mock.patch.object(storefront, 'product_availability', slow_availability):
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                responses = list(pool.map(
+                    lambda _: app.test_client().get(f'/api/products/availability/{product_id}/pickup'), range(4)))
+        self.assertEqual([r.status_code for r in responses], [200] * 4)
+        self.assertEqual(len({r.data for r in responses}), 1)
+        self.assertEqual(queries, [(product_id, 'pickup')])
+        after = self.client.get('/api/stats/single-flight').get_json()
+        self.assertEqual(after['shared'] - before['shared'], 3)
+
     # Note: To test an "out of stock" scenario properly, we'd need a product with stock 0
     # or modify a product's stock during testing, which requires more setup/teardown for isolation.
     # For now, we assume sample products have stock > 0.
@@ -353,6 +622,50 @@ class TestAPI(unittest.TestCase):
         # Cleanup
         self.client.post(f'/api/cart/modify/{customer_id}', json={"items_to_remove": [{"product_id": product['id'], "quantity": 3}]})
 
+    def test_cart_modify_returns_updated_cart(self):
+        """The modify response carries the updated cart lines and subtotal, matching GET /api/cart."""
+        customer_id = "cart_modify_customer_enriched"
+        product = SAMPLE_PRODUCTS[1]
+        payload = {"items_to_add": [{"product_id": product['id'], "quantity": 2}]}
+        response = self.client.post(f'/api/cart/modify/{customer_id}', json=payload)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data.decode('utf-8'))
+        line = data['items'][0]
+        self.assertEqual((line['product_id'], line['name'], line['quantity']), (product['id'], product['name'], 2))
+        self.assertEqual(line['price_per_unit'], product['price'])
+        self.assertEqual(line['image_url'], product['image_url'])
+        self.assertEqual(data['subtotal'], round(2 * product['price'], 2))
+
+        cart_data = json.loads(self.client.get(f'/api/cart/{customer_id}').data.decode('utf-8'))
+        self.assertEqual(cart_data, {"items": data['items'], "subtotal": data['subtotal']})
+
+        response = self.client.post(f'/api/cart/modify/{customer_id}', json={"items_to_remove": [{"product_id": product['id'], "quantity": 2}]})
+        data = json.loads(response.data.decode('utf-8'))
+        self.assertEqual((data['items'], data['subtotal']), ([], 0.0))
+
+    def test_cart_etag_revalidation(self):
+        """GET /api/cart answers a matching If-None-Match with 304; every cart write changes the ETag."""
+        customer_id = "cart_etag_customer"
+        product = SAMPLE_PRODUCTS[2]
+        response = self.client.post(f'/api/cart/modify/{customer_id}', json={"items_to_add": [{"product_id": product['id'], "quantity": 1}]})
+        modify_etag = response.headers['ETag']
+
+        response = self.client.get(f'/api/cart/{customer_id}')
+        self.assertEqual(response.headers['ETag'], modify_etag) # The modify response already carries the current tag
+        response = self.client.get(f'/api/cart/{customer_id}', headers={'If-None-Match': modify_etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+        self.client.post(f'/api/cart/{customer_id}/item', json={"product_id": product['id'], "quantity": 3})
+        response = self.client.get(f'/api/cart/{customer_id}', headers={'If-None-Match': modify_etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['items'][0]['quantity'], 4) # The item endpoint adds to the line
+        self.assertNotEqual(response.headers['ETag'], modify_etag)
+
+        self.client.delete(f'/api/cart/{customer_id}/clear')
+        response = self.client.get(f'/api/cart/{customer_id}', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual((response.status_code, response.get_json()['items']), (200, []))
+
     def test_cart_modify_remove_item_completely(self):
         """Test removing an item completely from the cart."""
         customer_id = "cart_modify_customer_003"
@@ -412,6 +725,34 @@ class TestAPI(unittest.TestCase):
         cart_data = json.loads(cart_response.data.decode('utf-8'))
         self.assertEqual(len(cart_data['items']), 0) # Cart should remain empty
 
+    def test_cart_modify_batch_upsert_keeps_one_line_and_respects_stock(self):
+        """Repeated adds of one product merge into a single line and never exceed stock."""
+        customer_id = "cart_modify_customer_upsert"
+        product = SAMPLE_PRODUCTS[0] # Lavender, stock 75
+        payload = {"items_to_add": [
+            {"product_id": product['id'], "quantity": 2},
+            {"product_id": product['id'], "quantity": 3},
+            {"product_id": product['id'], "quantity": product['stock']}, # Would exceed stock: skipped
+        ]}
+        data = json.loads(self.client.post(f'/api/cart/modify/{customer_id}', json=payload).data.decode('utf-8'))
+        self.assertTrue(data['items_added'])
+
+        cart_data = json.loads(self.client.get(f'/api/cart/{customer_id}').data.decode('utf-8'))
+        self.assertEqual(len(cart_data['items']), 1)
+        self.assertEqual(cart_data['items'][0]['quantity'], 5)
+
+        with sqlite3.connect(DATABASE_NAME) as conn:
+            with self.assertRaises(sqlite3.IntegrityError):
+                conn.execute("INSERT INTO cart_items (customer_id, product_id, quantity) VALUES (?, ?, 1)",
+                             (customer_id, product['id']))
+
+        # Removing more than the line holds drops the line.
+        payload = {"items_to_remove": [{"product_id": product['id'], "quantity": 2}, {"product_id": product['id'], "quantity": 9}]}
+        data = json.loads(self.client.post(f'/api/cart/modify/{customer_id}', json=payload).data.decode('utf-8'))
+        self.assertTrue(data['items_removed'])
+        cart_data = json.loads(self.client.get(f'/api/cart/{customer_id}').data.decode('utf-8'))
+        self.assertEqual(cart_data['items'], [])
+
     def test_cart_modify_invalid_product_id(self):
         """Test modifying cart with a non-existent product ID."""
         customer_id = "cart_modify_customer_006"
@@ -784,12 +1125,64 @@ class TestAPI(unittest.TestCase):
         self.assertIn("Order placed successfully", data['message'])
         self.assertTrue(data['order_id'].startswith("SIM_"))
 
+        # The emptied cart's tag is returned, so a client can revalidate it without a refetch
+        cart_etag = response.headers['X-Cart-ETag']
+        self.assertEqual(self.client.get(f'/api/cart/{customer_id}', headers={'If-None-Match': cart_etag}).status_code, 304)
+
         # Verify cart is cleared after order
         cart_after_order_response = self.client.get(f'/api/cart/{customer_id}')
         cart_after_order_data = json.loads(cart_after_order_response.data.decode('utf-8'))
         self.assertEqual(len(cart_after_order_data['items']), 0)
         self.assertEqual(cart_after_order_data['subtotal'], 0.0)
 
+        # Cleanup
+        self._restore_stock(product1, product2)
+
+    def test_checkout_reserves_stock_and_reports_failed_lines(self):
+        """Checkout decrements stock atomically; an oversold line rejects the whole order."""
+        customer_id = "checkout_customer_stock"
+        product = SAMPLE_PRODUCTS[-1]
+        stock_before = json.loads(self.client.get(f"/api/products/{product['id']}").data.decode('utf-8'))['stock']
+        shipping = {"fullName": "Test User", "address": "123 Test St"}
+
+        self.client.post(f'/api/cart/{customer_id}/item', json={"product_id": product['id'], "quantity": 2})
+        payload = {
+            "customer_id": customer_id,
+            "items": [
+                {"product_id": product['id'], "quantity": 2},
+                {"product_id": SAMPLE_PRODUCTS[-2]['id'], "quantity": 10**6},
+                {"product_id": "SKU_DOES_NOT_EXIST_999", "quantity": 1},
+            ],
+            "shipping_details": shipping,
+            "total_amount": 1.0,
+        }
+        response = self.client.post('/api/checkout/place_order', json=payload)
+        self.assertEqual(response.status_code, 409)
+        data = json.loads(response.data.decode('utf-8'))
+        failed = {item['product_id']: item for item in data['failed_items']}
+        self.assertEqual(failed[SAMPLE_PRODUCTS[-2]['id']]['error'], 'insufficient_stock')
+        self.assertEqual(failed["SKU_DOES_NOT_EXIST_999"]['error'], 'product_not_found')
+        self.assertNotIn(product['id'], failed)
+        # Rolled back: stock untouched and the cart still holds its line.
+        detail = json.loads(self.client.get(f"/api/products/{product['id']}").data.decode('utf-8'))
+        self.assertEqual(detail['stock'], stock_before)
+        cart_data = json.loads(self.client.get(f'/api/cart/{customer_id}').data.decode('utf-8'))
+        self.assertEqual(len(cart_data['items']), 1)
+
+        payload['items'] = payload['items'][:1]
+        response = self.client.post('/api/checkout/place_order', json=payload)
+        self.assertEqual(response.status_code, 201)
+        detail = json.loads(self.client.get(f"/api/products/{product['id']}").data.decode('utf-8'))
+        self.assertEqual(detail['stock'], stock_before - 2)
+        cart_data = json.loads(self.client.get(f'/api/cart/{customer_id}').data.decode('utf-8'))
+        self.assertEqual(cart_data['items'], [])
+
+        payload['items'] = [{"product_id": product['id'], "quantity": 0}]
+        self.assertEqual(self.client.post('/api/checkout/place_order', json=payload).status_code, 400)
+
+        # Cleanup
+        self._restore_stock(product)
+
     def test_checkout_missing_fields(self):
         """Test POST /api/checkout/place_order: missing required fields."""
         customer_id = "checkout_customer_002"
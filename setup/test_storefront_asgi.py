@@ -0,0 +1,104 @@
+import asyncio
+import unittest
+import json
+from unittest import mock
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app import app as flask_app, catalog_cache
+from database_setup import create_tables
+from sample_data_importer import insert_sample_data, SAMPLE_PRODUCTS
+from storefront_asgi import mount_storefront
+
+
+class TestStorefrontASGI(unittest.TestCase):
+    """The ASGI adapter must answer exactly like the Flask app it mirrors."""
+
+    @classmethod
+    def setUpClass(cls):
+        create_tables()
+        insert_sample_data()
+        catalog_cache.invalidate()
+        asgi_app = FastAPI()
+        mount_storefront(asgi_app)
+        cls.client = TestClient(asgi_app)
+        cls.flask_client = flask_app.test_client()
+
+    def test_products_match_flask(self):
+        """Listing, search, paging and batch responses are byte-identical to Flask's."""
+        for url in ('/api/products', '/api/products?q=lavender', '/api/products?category=Plants&sort=-price&limit=3',
+                    '/api/products?pet_safe=true&facets=flower_color', '/api/products?sort=bogus'):
+            response = self.client.get(url)
+            flask_response = self.flask_client.get(url)
+            self.assertEqual(response.status_code, flask_response.status_code, url)
+            self.assertEqual(response.content, flask_response.data, url)
+            self.assertEqual(response.headers.get('X-Next-Cursor'), flask_response.headers.get('X-Next-Cursor'), url)
+
+        ids = [SAMPLE_PRODUCTS[0]['id'], "SKU_DOES_NOT_EXIST_999"]
+        response = self.client.post('/api/products/batch', json={"ids": ids})
+        self.assertEqual(response.json()['missing_ids'], ["SKU_DOES_NOT_EXIST_999"])
+
+    def test_product_detail_etag(self):
+        product_id = SAMPLE_PRODUCTS[0]['id']
+        response = self.client.get(f'/api/products/{product_id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.flask_client.get(f'/api/products/{product_id}').data)
+        etag = response.headers['ETag']
+        self.assertEqual(self.client.get(f'/api/products/{product_id}', headers={'If-None-Match': etag}).status_code, 304)
+        self.assertEqual(self.client.get('/api/products/SKU_DOES_NOT_EXIST_999').status_code, 404)
+
+    def test_catalog_refresh_runs_off_the_event_loop(self):
+        """A due version check or reload runs get() on a worker thread, not the loop."""
+        on_loop = []
+        real_get = catalog_cache.get
+
+        def recording_get():
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return real_get()
+
+        catalog_cache.invalidate()
+        with mock.patch.object(catalog_cache, 'get', recording_get):
+            self.assertEqual(self.client.get(f"/api/products/{SAMPLE_PRODUCTS[0]['id']}").status_code, 200)
+            # Between checks the snapshot is served from memory without calling get().
+            self.client.get('/api/products?limit=1')
+        self.assertEqual(on_loop, [False])
+
+    def test_cart_and_checkout(self):
+        customer_id = "asgi_customer_001"
+        product = SAMPLE_PRODUCTS[-1]
+        response = self.client.post(f'/api/cart/{customer_id}/item', json={"product_id": product['id'], "quantity": 2})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(f'/api/cart/modify/{customer_id}', json={"items_to_add": [{"product_id": product['id'], "quantity": 1}]})
+        self.assertTrue(response.json()['items_added'])
+        cart = self.client.get(f'/api/cart/{customer_id}').json()
+        self.assertEqual(cart['items'][0]['quantity'], 3)
+        self.assertEqual(cart, json.loads(self.flask_client.get(f'/api/cart/{customer_id}').data))
+
+        payload = {"customer_id": customer_id, "items": [{"product_id": product['id'], "quantity": 10**6}],
+                   "shipping_details": {"fullName": "Test"}, "total_amount": 1.0}
+        response = self.client.post('/api/checkout/place_order', json=payload)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['failed_items'][0]['error'], 'insufficient_stock')
+
+        self.assertEqual(self.client.post(f'/api/cart/modify/{customer_id}', content="not json",
+                                          headers={'Content-Type': 'application/json'}).status_code, 400)
+        self.assertEqual(self.client.delete(f'/api/cart/{customer_id}/clear').json()['items_deleted'], 1)
+
+    def test_pages_and_flask_fallback(self):
+        response = self.client.get(f"/products/{SAMPLE_PRODUCTS[0]['id']}")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(SAMPLE_PRODUCTS[0]['name'].replace("'", "&#39;"), response.text)
+        self.assertEqual(self.client.get('/products/SKU_DOES_NOT_EXIST_999').status_code, 404)
+        self.assertEqual(self.client.get('/').status_code, 200)
+        self.assertEqual(self.client.get('/static/style.css').status_code, 200)
+        # Routes without an async version are served by the mounted Flask app.
+        response = self.client.post('/api/identify-image')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import asyncio
+import json
+import os
+import sys
+
+import httpx
+
+import storefront_local
+from app import app as flask_app, catalog_cache
+from database_setup import create_tables
+from sample_data_importer import insert_sample_data, SAMPLE_PRODUCTS
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'agents', 'customer-service'))
+from customer_service.tools.inprocess_transport import InProcessAsyncTransport
+
+BASE_URL = "http://storefront.local/api"
+
+
+class TestStorefrontLocal(unittest.TestCase):
+    """In-process calls must return the same payloads as the HTTP API."""
+
+    @classmethod
+    def setUpClass(cls):
+        create_tables()
+        insert_sample_data()
+        catalog_cache.invalidate()
+        cls.flask_client = flask_app.test_client()
+
+    def test_products_match_flask(self):
+        for path, params in (('/api/products', None), ('/api/products', [('q', 'lavender')]),
+                             ('/api/products', [('category', 'Plants'), ('sort', '-price'), ('limit', '3')])):
+            result = storefront_local.call('GET', path, params)
+            flask_response = self.flask_client.get(path, query_string=params)
+            self.assertEqual(result.status, flask_response.status_code)
+            self.assertEqual(json.loads(json.dumps(result.payload)), flask_response.get_json())
+
+        product_id = SAMPLE_PRODUCTS[0]['id']
+        result = storefront_local.call('GET', f'/api/products/{product_id}')
+        self.assertEqual(result.payload, self.flask_client.get(f'/api/products/{product_id}').get_json())
+        self.assertEqual(storefront_local.call('GET', '/api/products/SKU_DOES_NOT_EXIST_999').status, 404)
+        self.assertIsNone(storefront_local.call('POST', '/api/retail/search-products', body={"query": "x"}))
+        self.assertEqual(storefront_local.call('POST', '/api/checkout/place_order').status, 400)
+
+    def test_async_transport_cart_round_trip(self):
+        customer_id = "local_customer_001"
+        product = SAMPLE_PRODUCTS[-1]
+
+        async def run():
+            transport = InProcessAsyncTransport(BASE_URL, httpx.AsyncHTTPTransport(), storefront_local)
+            async with httpx.AsyncClient(transport=transport) as client:
+                modified = await client.post(f"{BASE_URL}/cart/modify/{customer_id}",
+                                             json={"items_to_add": [{"product_id": product['id'], "quantity": 2}]})
+                cart = await client.get(f"{BASE_URL}/cart/{customer_id}")
+                flask_cart = self.flask_client.get(f'/api/cart/{customer_id}').get_json()
+                revalidated = await client.get(f"{BASE_URL}/cart/{customer_id}",
+                                               headers={'If-None-Match': modified.headers['ETag']})
+                missing = await client.get(f"{BASE_URL}/products/availability/SKU_DOES_NOT_EXIST_999/pickup")
+                cleared = await client.delete(f"{BASE_URL}/cart/{customer_id}/clear")
+                return modified, cart, flask_cart, revalidated, missing, cleared
+
+        modified, cart, flask_cart, revalidated, missing, cleared = asyncio.run(run())
+        modified.raise_for_status()
+        self.assertTrue(modified.json()['items_added'])
+        self.assertEqual(cart.json(), flask_cart)
+        self.assertEqual(json.loads(cart.text), cart.json())
+        self.assertEqual((revalidated.status_code, revalidated.content), (304, b''))
+        self.assertEqual(missing.status_code, 404)
+        with self.assertRaises(httpx.HTTPStatusError):
+            missing.raise_for_status()
+        cleared.raise_for_status()
+        self.assertEqual(cart.json()['items'][0]['product_id'], product['id'])
+
+    def test_async_tools_transport(self):
+        async def run():
+            transport = InProcessAsyncTransport(BASE_URL, httpx.AsyncHTTPTransport(), storefront_local)
+            async with httpx.AsyncClient(transport=transport) as client:
+                batch = await client.post(f"{BASE_URL}/products/batch", json={"ids": [SAMPLE_PRODUCTS[0]['id'], "SKU_DOES_NOT_EXIST_999"]})
+                missing = await client.get(f"{BASE_URL}/products/SKU_DOES_NOT_EXIST_999")
+                return batch, missing
+
+        batch, missing = asyncio.run(run())
+        self.assertEqual(batch.json()['missing_ids'], ["SKU_DOES_NOT_EXIST_999"])
+        self.assertEqual(batch.json()['products'][0]['id'], SAMPLE_PRODUCTS[0]['id'])
+        # Each json() call gets its own copy, so one caller's changes are not seen by the next.
+        batch.json()['products'][0]['name'] = "changed"
+        self.assertNotEqual(batch.json()['products'][0]['name'], "changed")
+        with self.assertRaises(httpx.HTTPStatusError):
+            missing.raise_for_status()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+# cymbal_home_garden_backend/single_flight.py
+
+import importlib.util
+import os
+
+# Request coalescing for the read endpoints that hit SQLite:
+#
+#     reads = SingleFlight()
+#     reads.do(('availability', product_id), lambda: query(...))
+#
+# While a query for a key is running, identical requests do not run their own;
+# they wait for it and get the same result (or exception), so a burst of
+# sessions asking for the same product or search after a promo costs one query
+# and one pooled connection. Nothing is kept afterwards: this is not a cache,
+# and a request arriving after the query finished runs a new one. Results are
+# shared between requests, so callers must treat them as read-only.
+#
+# SingleFlight is for the Flask request threads; AsyncSingleFlight is the
+# event-loop version used by storefront_asgi.py.
+#
+# The implementation is the one the agent's HTTP client uses
+# (customer_service/tools/single_flight.py). It is loaded from its file path,
+# as the "customer-service" directory name is not importable as a package.
+
+_module_path = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "agents", "customer-service", "customer_service", "tools", "single_flight.py",
+)
+_spec = importlib.util.spec_from_file_location("customer_service_single_flight", _module_path)
+_single_flight_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_single_flight_module)
+
+SingleFlight = _single_flight_module.SingleFlight
+AsyncSingleFlight = _single_flight_module.AsyncSingleFlight
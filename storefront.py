@@ -0,0 +1,506 @@
+# cymbal_home_garden_backend/storefront.py
+
+import logging
+import sqlite3
+import time
+import json
+from typing import NamedTuple, Optional
+
+from catalog_snapshot import FACET_FIELDS, MAX_PAGE_SIZE, SORT_FIELDS, parse_attribute_filters
+
+logger = logging.getLogger(__name__)
+
+# Framework-independent implementation of the storefront API. app.py (Flask) and
+# storefront_asgi.py (mounted in the streaming server) are thin adapters around
+# these functions: they parse the request, pass a pooled sqlite3 connection
+# and/or the current catalog snapshot, and turn the ServiceResult into a response.
+
+
+class ServiceResult(NamedTuple):
+    payload: object
+    status: int = 200
+    headers: Optional[dict] = None
+
+
+def _error(message, status=400, **extra):
+    return ServiceResult({"error": message, **extra}, status)
+
+
+# --- Products ---
+
+def list_products(snapshot, args, search_ids):
+    """GET /api/products. See app.get_products for the query parameters.
+
+    `args` is the request's query MultiDict (needs .get and .getlist);
+    `search_ids(text)` returns full-text matches best first (fts_search_ids).
+    The unparameterized listing returns `snapshot.products` itself as the
+    payload, so callers can serve its per-snapshot cached serialization.
+    """
+    search_query = args.get('q')
+    name_filter = args.get('name')
+    category_filter = args.get('category')
+    plant_type_filter = args.get('plant_type') # Substring match, e.g. "Perennial" vs "Perennial Shrub"
+    sort = args.get('sort')
+    after = args.get('after')
+    limit = args.get('limit')
+    fields = args.get('fields')
+    facets = args.get('facets')
+
+    if sort and sort.lstrip('-') not in SORT_FIELDS:
+        return _error(f"Invalid sort '{sort}'. Allowed: {', '.join(SORT_FIELDS)} (prefix '-' for descending).")
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            return _error(f"'limit' must be an integer between 1 and {MAX_PAGE_SIZE}.")
+    try:
+        attribute_filters = parse_attribute_filters(args)
+    except ValueError as e:
+        return _error(str(e))
+    if facets:
+        facets = list(FACET_FIELDS) if facets == 'all' else [f.strip() for f in facets.split(',') if f.strip()]
+        unknown = [f for f in facets if f not in FACET_FIELDS]
+        if unknown:
+            return _error(f"Unknown facet(s) requested: {', '.join(unknown)}. Allowed: {', '.join(FACET_FIELDS)}.")
+    if fields:
+        fields = [f.strip() for f in fields.split(',') if f.strip()]
+        unknown = [f for f in fields if snapshot.columns and f not in snapshot.columns]
+        if unknown:
+            return _error(f"Unknown field(s) requested: {', '.join(unknown)}.")
+
+    if search_query:
+        products = snapshot.search(search_ids(search_query), text=search_query, name=name_filter,
+                                   category=category_filter, plant_type=plant_type_filter)
+    elif name_filter or category_filter or plant_type_filter:
+        products = snapshot.filter(name=name_filter, category=category_filter, plant_type=plant_type_filter)
+    elif not (sort or after or limit or fields or attribute_filters or facets):
+        logger.info(f"Returning {len(snapshot.products)} products from /api/products (cached serialization).")
+        return ServiceResult(snapshot.products)
+    else:
+        products = snapshot.products
+    products = snapshot.filter_attributes(products, attribute_filters)
+    facet_counts = snapshot.facet_counts(products, facets) if facets else None
+
+    headers = None
+    if sort or after or limit:
+        if not sort and not search_query:
+            sort = 'id' # Keyset pagination needs a stable order; full-text results page by relevance.
+        try:
+            products, next_cursor = snapshot.paginate(products, sort=sort, after=after, limit=limit)
+        except ValueError as e:
+            return _error(str(e))
+        if next_cursor:
+            headers = {'X-Next-Cursor': next_cursor}
+
+    if fields:
+        products = [{f: p.get(f) for f in fields} for p in products]
+
+    logger.info(f"Returning {len(products)} products from /api/products.")
+    payload = products if facet_counts is None else {"products": products, "facets": facet_counts}
+    return ServiceResult(payload, headers=headers)
+
+
+def batch_products(snapshot, data):
+    """POST /api/products/batch: {"ids": [...]} -> {"products": [...], "missing_ids": [...]}."""
+    product_ids = data.get('ids') if isinstance(data, dict) else None
+    if not isinstance(product_ids, list) or not all(isinstance(pid, str) for pid in product_ids):
+        return _error("Request body must be a JSON object with an 'ids' list of product id strings.")
+    if len(product_ids) > MAX_PAGE_SIZE:
+        return _error(f"At most {MAX_PAGE_SIZE} ids can be requested at once.")
+
+    products, missing_ids = snapshot.product_details(product_ids)
+    if missing_ids:
+        logger.warning(f"Batch lookup: product id(s) not found: {missing_ids}")
+    logger.info(f"Returning {len(products)} products from /api/products/batch.")
+    return ServiceResult({"products": products, "missing_ids": missing_ids})
+
+
+def product_availability(conn, product_id, store_id):
+    """
+    Checks product stock from SQLite.
+    The 'store_id' is part of the path to match ADK tool, but currently ignored in logic
+    as we assume a single inventory source.
+    Output matches ADK tool: {'available': bool, 'quantity': int, 'store': str}
+    """
+    row = conn.execute("SELECT stock FROM products WHERE id = ?", (product_id,)).fetchone()
+    if row:
+        stock_quantity = row['stock']
+        # For MVP, store_id is acknowledged but fixed response for 'store' field
+        # In a real scenario, store_id would query different inventories or locations
+        return ServiceResult({
+            "available": stock_quantity > 0,
+            "quantity": stock_quantity,
+            "store": f"Cymbal Home Warehouse (Queried for {store_id})" # Or simply "Cymbal Home Warehouse"
+        })
+    logger.warning(f"Product {product_id} not found for availability check at store {store_id}.")
+    # Return the specific 404 error format observed in the logs
+    return _error("Product not found for availability check", 404)
+
+
+def product_page_context(snapshot, product_id):
+    """Template context for the /products/<id> page, or None if the product does not exist."""
+    product = snapshot.by_id.get(product_id)
+    if product is None:
+        return None
+    product_data = dict(product) # JSON list columns are already decoded in the snapshot
+    product_data['attributes'] = {}
+    return product_data
+
+
+# --- Shopping cart ---
+
+# Adds `quantity` of a product to a cart line in one statement, relying on the
+# unique (customer_id, product_id) index. The stock check is part of the
+# statement: the SELECT yields no row for unknown or under-stocked products, and
+# the DO UPDATE is skipped when the new line total would exceed stock. Nothing
+# is written (and no row is returned) when either check fails.
+# Params: (customer_id, quantity, product_id, quantity)
+CART_ADD_SQL = """
+    INSERT INTO cart_items (customer_id, product_id, quantity)
+    SELECT ?, p.id, ? FROM products p WHERE p.id = ? AND p.stock >= ?
+    ON CONFLICT (customer_id, product_id) DO UPDATE
+    SET quantity = cart_items.quantity + excluded.quantity
+    WHERE cart_items.quantity + excluded.quantity <= (SELECT stock FROM products WHERE id = excluded.product_id)
+"""
+# Params: (quantity, customer_id, product_id); lines that drop to zero are then
+# removed with CART_PURGE_EMPTY_SQL.
+CART_DECREMENT_SQL = "UPDATE cart_items SET quantity = quantity - ? WHERE customer_id = ? AND product_id = ?"
+CART_PURGE_EMPTY_SQL = "DELETE FROM cart_items WHERE customer_id = ? AND quantity <= 0"
+
+# Reserves stock for one order line. Affects no row when the product is unknown
+# or has less than the requested quantity left, so stock can never go negative.
+# Params: (quantity, product_id, quantity)
+STOCK_RESERVE_SQL = "UPDATE products SET stock = stock - ? WHERE id = ? AND stock >= ?"
+
+
+def _cart_lines(conn, customer_id):
+    """The customer's cart lines, joined with product name, price and image, and the subtotal."""
+    rows = conn.execute('''
+        SELECT ci.product_id, p.name, ci.quantity, p.price, p.image_url
+        FROM cart_items ci
+        JOIN products p ON ci.product_id = p.id
+        WHERE ci.customer_id = ?
+    ''', (customer_id,)).fetchall()
+
+    items = []
+    subtotal = 0.0
+    for row in rows:
+        item_total = row['quantity'] * row['price']
+        items.append({
+            "product_id": row['product_id'],
+            "name": row['name'],
+            "quantity": row['quantity'],
+            "price_per_unit": row['price'], # Added for clarity on frontend
+            "item_total": round(item_total, 2), # Added for clarity on frontend
+            "image_url": row['image_url'],
+        })
+        subtotal += item_total
+    return items, round(subtotal, 2)
+
+
+def cart_etag(conn, customer_id):
+    """Strong ETag for the customer's cart, or None on a database without the version tables.
+
+    Cart lines embed product names and prices, so the tag combines the cart's
+    own version (cart_versions) with the catalog version: a change to either
+    produces a new tag. Stock updates (orders) leave the catalog version alone.
+    """
+    try:
+        row = conn.execute(
+            "SELECT (SELECT version FROM cart_versions WHERE customer_id = ?),"
+            " (SELECT version FROM catalog_version WHERE id = 1)",
+            (customer_id,),
+        ).fetchone()
+    except sqlite3.OperationalError as e:
+        if 'no such table' in str(e):
+            return None # Legacy database; run database_setup.py to enable cart revalidation
+        raise
+    return f'"{row[0] or 0}.{row[1] or 0}"'
+
+
+def _etag_matches(etag, if_none_match):
+    if not etag or not if_none_match:
+        return False
+    return if_none_match.strip() == '*' or etag in (tag.strip().removeprefix('W/') for tag in if_none_match.split(','))
+
+
+def get_cart(conn, customer_id, if_none_match=None):
+    """
+    Retrieves the customer's cart contents.
+    Output matches ADK tool: {'items': [{'product_id': ..., 'name': ..., 'quantity': ...}], 'subtotal': ...}
+
+    The response carries the cart's ETag. When `if_none_match` (the request's
+    If-None-Match header) matches it, a bodyless 304 is returned without
+    reading the cart lines.
+    """
+    # Tag first, lines second: a write landing in between can only make the tag
+    # older than the lines, which costs a refetch but never serves a stale cart.
+    etag = cart_etag(conn, customer_id)
+    headers = {'ETag': etag} if etag else None
+    if _etag_matches(etag, if_none_match):
+        logger.info(f"Cart for customer {customer_id} not modified (ETag match), returning 304.")
+        return ServiceResult(None, 304, headers)
+    items, subtotal = _cart_lines(conn, customer_id)
+    logger.info(f"Returning cart for customer {customer_id} with {len(items)} item types, subtotal: {subtotal:.2f}.")
+    return ServiceResult({
+        "items": items,
+        "subtotal": subtotal
+    }, headers=headers)
+
+
+def modify_cart(conn, customer_id, data):
+    """
+    Modifies the user's shopping cart by adding and/or removing items.
+    Expects JSON: {'items_to_add': [{'product_id': ..., 'quantity': ...}],
+                   'items_to_remove': [{'product_id': ..., 'quantity': ...}]}
+    Output matches ADK tool: {'status': ..., 'message': ..., 'items_added': bool, 'items_removed': bool}
+    plus the updated cart ('items' and 'subtotal', as from get_cart) and its ETag,
+    so callers need no follow-up request to show or revalidate it.
+    """
+    if not data:
+        logger.error(f"Invalid JSON payload for /api/cart/modify/{customer_id}.")
+        return _error("Invalid JSON payload")
+
+    items_to_add = data.get('items_to_add', [])
+    items_to_remove = data.get('items_to_remove', [])
+
+    # Validate up front, then apply each kind of change as one batched statement
+    # inside a single transaction.
+    add_rows = []
+    for item_add in items_to_add or []:
+        product_id = item_add.get('product_id')
+        quantity_to_add = item_add.get('quantity', 0)
+        if not product_id or not isinstance(quantity_to_add, int) or quantity_to_add <= 0:
+            logger.warning(f"Invalid item to add: {item_add} for customer {customer_id}")
+            continue
+        add_rows.append((customer_id, quantity_to_add, product_id, quantity_to_add))
+
+    remove_rows = []
+    for item_rem in items_to_remove or []:
+        product_id = item_rem.get('product_id')
+        quantity_to_remove = item_rem.get('quantity', 0)
+        if not product_id or not isinstance(quantity_to_remove, int) or quantity_to_remove <= 0:
+            logger.warning(f"Invalid item to remove: {item_rem} for customer {customer_id}")
+            continue
+        remove_rows.append((quantity_to_remove, customer_id, product_id))
+
+    cursor = conn.cursor()
+    items_added_flag = False
+    items_removed_flag = False
+
+    if add_rows:
+        cursor.executemany(CART_ADD_SQL, add_rows)
+        items_added_flag = cursor.rowcount > 0
+        if cursor.rowcount < len(add_rows):
+            logger.warning(f"{len(add_rows) - cursor.rowcount} item(s) for customer {customer_id} not added: "
+                           f"not enough stock or product does not exist.")
+
+    if remove_rows:
+        cursor.executemany(CART_DECREMENT_SQL, remove_rows)
+        items_removed_flag = cursor.rowcount > 0
+        cursor.execute(CART_PURGE_EMPTY_SQL, (customer_id,))
+
+    items, subtotal = _cart_lines(conn, customer_id) # Read inside the transaction: exactly the state just written
+    etag = cart_etag(conn, customer_id)
+    conn.commit()
+
+    message = "Cart updated."
+    if not items_added_flag and not items_removed_flag:
+        message = "No changes made to the cart (items might be out of stock or invalid)."
+    logger.info(f"Cart modification for customer {customer_id} completed. Message: {message}, Added: {items_added_flag}, Removed: {items_removed_flag}")
+    return ServiceResult({
+        "status": "success",
+        "message": message,
+        "items_added": items_added_flag,
+        "items_removed": items_removed_flag,
+        "items": items,
+        "subtotal": subtotal
+    }, headers={'ETag': etag} if etag else None)
+
+
+def set_cart_item(conn, customer_id, data):
+    """Adds a product to the cart or updates its quantity.
+    Expects JSON: {"product_id": "...", "quantity": N (integer)}
+    If quantity is 0 or less, the item is effectively removed or quantity reduced.
+    For complete removal regardless of quantity, use DELETE /api/cart/<customer_id>/item/<product_id>
+    """
+    if not data or 'product_id' not in data or 'quantity' not in data:
+        logger.error(f"Invalid JSON payload for /api/cart/{customer_id}/item. Payload: {data}")
+        return _error("Invalid JSON payload. 'product_id' and 'quantity' are required.")
+
+    product_id = data.get('product_id')
+    quantity = data.get('quantity')
+
+    if not isinstance(quantity, int):
+        return _error("'quantity' must be an integer.")
+
+    cursor = conn.cursor()
+
+    if quantity > 0:
+        cursor.execute(CART_ADD_SQL + " RETURNING quantity", (customer_id, quantity, product_id, quantity))
+        row = cursor.fetchone()
+        if row is None:
+            # Nothing was written; look up why only on this (rare) path.
+            conn.rollback()
+            cursor.execute("SELECT stock FROM products WHERE id = ?", (product_id,))
+            product_stock_row = cursor.fetchone()
+            if not product_stock_row:
+                return _error(f"Product {product_id} not found.", 404)
+            current_stock = product_stock_row['stock']
+            cursor.execute("SELECT quantity FROM cart_items WHERE customer_id = ? AND product_id = ?", (customer_id, product_id))
+            cart_item = cursor.fetchone()
+            if cart_item:
+                return _error(f"Not enough stock for {product_id} to increase quantity to {cart_item['quantity'] + quantity}. Available: {current_stock}, Current in cart: {cart_item['quantity']}")
+            return _error(f"Not enough stock for {product_id}. Available: {current_stock}, Requested: {quantity}")
+        new_quantity = row['quantity']
+        if new_quantity == quantity: # Lines are always positive, so an existing line would now exceed `quantity`
+            message = f"Product {product_id} added to cart with quantity {quantity}."
+        else:
+            message = f"Quantity for product {product_id} updated to {new_quantity}."
+    else: # Quantity is 0 or negative, remove item (though DELETE endpoint is better for full removal)
+        cursor.execute("DELETE FROM cart_items WHERE customer_id = ? AND product_id = ?", (customer_id, product_id))
+        if cursor.rowcount > 0:
+            message = f"Product {product_id} removed from cart due to quantity <= 0."
+        else:
+            cursor.execute("SELECT 1 FROM products WHERE id = ?", (product_id,))
+            if cursor.fetchone() is None:
+                return _error(f"Product {product_id} not found.", 404)
+            # Trying to set non-existent item to 0 or less quantity - no action needed.
+            message = f"Product {product_id} not in cart, no action taken for quantity <= 0."
+            return ServiceResult({"status": "no_action", "message": message})
+
+    conn.commit()
+    logger.info(f"Cart item operation for customer {customer_id}, product {product_id} (quantity {quantity}) resulted in: {message}")
+    return ServiceResult({"status": "success", "message": message})
+
+
+def remove_cart_item(conn, customer_id, product_id):
+    """Removes an entire product line from the customer's cart."""
+    cursor = conn.execute("DELETE FROM cart_items WHERE customer_id = ? AND product_id = ?", (customer_id, product_id))
+    conn.commit()
+
+    if cursor.rowcount > 0:
+        logger.info(f"Product {product_id} removed from cart for customer {customer_id}.")
+        return ServiceResult({"status": "success", "message": f"Product {product_id} removed from cart."})
+    logger.warning(f"Product {product_id} not found in cart for customer {customer_id} during DELETE, or already removed.")
+    return ServiceResult({"status": "not_found", "message": f"Product {product_id} not found in cart or already removed."}, 404)
+
+
+def clear_cart(conn, customer_id):
+    """Clears all items from the customer's cart."""
+    cursor = conn.execute("DELETE FROM cart_items WHERE customer_id = ?", (customer_id,))
+    conn.commit()
+
+    items_deleted_count = cursor.rowcount
+    logger.info(f"Cart cleared for customer {customer_id}. Items deleted: {items_deleted_count}.")
+    # We can return success even if cart was already empty, as the state is achieved.
+    return ServiceResult({"status": "success", "message": "Cart cleared.", "items_deleted": items_deleted_count})
+
+
+# --- Checkout ---
+
+def place_order(conn, data, on_stock_change=None):
+    """
+    Simulates placing an order: reserves stock for every line and clears the cart.
+    Expects JSON: { "customer_id": "...", "items": [...], "shipping_details": {...}, "total_amount": ... }
+
+    `on_stock_change` is called after stock was committed (e.g. CatalogCache.invalidate).
+    A successful order returns the ETag of the now-empty cart in X-Cart-ETag.
+    """
+    customer_id = data.get('customer_id')
+    items = data.get('items')
+    shipping_details = data.get('shipping_details')
+    total_amount = data.get('total_amount')
+
+    if not all([customer_id, items, shipping_details, total_amount is not None]):
+        return _error("Missing required fields for order (customer_id, items, shipping_details, total_amount)")
+
+    logger.info(f"Simulating order placement for customer_id: {customer_id}")
+    logger.info(f"Order Items: {json.dumps(items, indent=2)}")
+    logger.info(f"Shipping Details: {json.dumps(shipping_details, indent=2)}")
+    logger.info(f"Total Amount: {total_amount}")
+
+    # Merge the order into one quantity per product, preserving line order.
+    order_lines = {}
+    invalid_items = []
+    for item in items if isinstance(items, list) else []:
+        product_id = item.get('product_id') if isinstance(item, dict) else None
+        quantity = item.get('quantity') if isinstance(item, dict) else None
+        if not product_id or not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+            invalid_items.append(item)
+            continue
+        order_lines[product_id] = order_lines.get(product_id, 0) + quantity
+    if invalid_items or not order_lines:
+        return _error("Each order item needs a 'product_id' and a positive integer 'quantity'.",
+                      invalid_items=invalid_items)
+
+    # Reserve inventory and clear the cart in one short write transaction.
+    # BEGIN IMMEDIATE takes the write lock up front, so the conditional
+    # decrements below cannot race with another checkout and never need a
+    # separate read of the stock level.
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    failed_product_ids = []
+    for product_id, quantity in order_lines.items():
+        cursor.execute(STOCK_RESERVE_SQL, (quantity, product_id, quantity))
+        if cursor.rowcount == 0:
+            failed_product_ids.append(product_id)
+
+    if failed_product_ids:
+        conn.rollback()
+        # Explain each failed line; this read runs after the lock is released.
+        placeholders = ', '.join('?' * len(failed_product_ids))
+        cursor.execute(f"SELECT id, stock FROM products WHERE id IN ({placeholders})", failed_product_ids)
+        available = {row['id']: row['stock'] for row in cursor.fetchall()}
+        failed_items = [
+            {
+                "product_id": product_id,
+                "requested": order_lines[product_id],
+                "available": available.get(product_id),
+                "error": "insufficient_stock" if product_id in available else "product_not_found",
+            }
+            for product_id in failed_product_ids
+        ]
+        logger.warning(f"Order for customer {customer_id} rejected, no stock reserved. Failed lines: {failed_items}")
+        return ServiceResult({
+            "status": "error",
+            "message": "Some items could not be reserved. No changes were made to your order or cart.",
+            "failed_items": failed_items,
+        }, 409)
+
+    cursor.execute("DELETE FROM cart_items WHERE customer_id = ?", (customer_id,))
+    cart_tag = cart_etag(conn, customer_id)
+    conn.commit()
+    if on_stock_change is not None:
+        on_stock_change()
+    logger.info(f"Stock reserved for {len(order_lines)} product(s) and cart cleared for customer {customer_id}.")
+
+    # In a real app, you'd save the order to a new 'orders' table,
+    # interact with payment gateways, trigger shipping processes, etc.
+
+    return ServiceResult({
+        "status": "success",
+        "message": "Order placed successfully (Simulated). Thank you for your purchase!",
+        "order_id": f"SIM_{time.time()}" # Generate a pseudo-unique simulated order ID
+    }, 201, {'X-Cart-ETag': cart_tag} if cart_tag else None) # 201 Created is often used for successful resource creation
+
+
+def conceptual_order(data):
+    """
+    Phase 4: Conceptual order placement.
+    Logs received order data and returns a mock success response.
+    """
+    # For MVP, just log the whole thing
+    logger.info(f"Conceptual Order Data Received for /api/orders/place_order: {json.dumps(data, indent=2)}")
+
+    # No database interaction or payment processing in this phase for this endpoint.
+    mock_order_id = f"MOCK_ORDER_{int(time.time())}"
+    logger.info(f"Conceptual order {mock_order_id} processed for /api/orders/place_order.")
+
+    return ServiceResult({
+        "success": True,
+        "message": "Order received (conceptual)",
+        "order_id": mock_order_id
+    }, 201)
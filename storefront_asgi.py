@@ -0,0 +1,247 @@
+# cymbal_home_garden_backend/storefront_asgi.py
+
+import os
+import logging
+from urllib.parse import urlencode
+
+import anyio
+import jinja2
+from fastapi import APIRouter, FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.staticfiles import StaticFiles
+
+import storefront
+from app import app as flask_app, catalog_cache, db_pool, fts_search_ids
+from single_flight import AsyncSingleFlight
+
+logger = logging.getLogger(__name__)
+
+# ASGI adapter for the storefront API and pages, so they can be served from the
+# same uvicorn process (and event loop) as the agent's WebSocket endpoint:
+#
+#     from storefront_asgi import mount_storefront
+#     mount_storefront(app)   # app = the streaming server's FastAPI instance
+#
+# Endpoint logic is shared with the Flask app through storefront.py, as are the
+# catalog snapshot and the SQLite connection pool. Catalog reads are answered
+# from memory on the event loop; anything that touches SQLite (including the
+# snapshot's periodic version check and reload) runs on a worker thread, so the
+# loop never blocks on the database. Routes without an async version here (image identification,
+# Retail API search) fall through to the Flask app.
+
+router = APIRouter()
+
+_db_limiter = None
+
+# Identical concurrent reads share one worker-thread query (see single_flight.py).
+_reads = AsyncSingleFlight()
+
+
+async def _run_db(service_fn, *args, **kwargs):
+    """Runs `service_fn(conn, *args, **kwargs)` on a worker thread with a pooled connection."""
+    global _db_limiter
+    if _db_limiter is None:
+        _db_limiter = anyio.CapacityLimiter(db_pool.size) # No more threads than connections
+
+    def call():
+        with db_pool.connection() as conn:
+            return service_fn(conn, *args, **kwargs)
+    return await anyio.to_thread.run_sync(call, limiter=_db_limiter)
+
+
+async def _catalog():
+    """The current catalog snapshot; a due version check or reload runs on a worker thread."""
+    snapshot = catalog_cache.peek()
+    if snapshot is None:
+        snapshot = await _reads.do(('catalog',), lambda: anyio.to_thread.run_sync(catalog_cache.get))
+    return snapshot
+
+
+def _respond(result):
+    """Turns a storefront.ServiceResult into a JSON response (same bytes as Flask's jsonify)."""
+    if result.status == 304:
+        return Response(status_code=304, headers=result.headers)
+    body = flask_app.json.response(result.payload).get_data()
+    return Response(body, status_code=result.status, headers=result.headers, media_type=flask_app.json.mimetype)
+
+
+async def _json_body(request):
+    """Parsed JSON body, or None when it is missing or malformed."""
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+def _bad_json(request):
+    if request.headers.get('content-type', '').startswith('application/json'):
+        return JSONResponse({"error": "Bad Request", "message": "Invalid JSON payload provided."}, 400)
+    return JSONResponse({"error": "Bad Request", "message": "Invalid JSON payload or missing Content-Type: application/json."}, 400)
+
+
+# --- Products ---
+
+@router.get('/api/products')
+async def get_products(request: Request):
+    """Async GET /api/products; see app.get_products for the query parameters."""
+    args = request.query_params
+    snapshot = await _catalog()
+    search_query = args.get('q')
+    if search_query:
+        # Full-text search needs the database: run the match off the loop, then filter in memory.
+        ids = await _reads.do(('fts', search_query), lambda: _run_db(fts_search_ids, search_query))
+        result = storefront.list_products(snapshot, args, lambda text: ids)
+    else:
+        result = storefront.list_products(snapshot, args, search_ids=None)
+    if result.payload is snapshot.products:
+        body = snapshot.memoize('products:all', lambda: flask_app.json.dumps(snapshot.products))
+        return Response(f"{body}\n", media_type=flask_app.json.mimetype)
+    response = _respond(result)
+    next_cursor = (result.headers or {}).get('X-Next-Cursor')
+    if next_cursor:
+        next_args = [(k, v) for k, v in args.multi_items() if k != 'after'] + [('after', next_cursor)]
+        base_url = str(request.url.replace(query=''))
+        response.headers['Link'] = f'<{base_url}?{urlencode(next_args)}>; rel="next"'
+    return response
+
+
+@router.post('/api/products/batch')
+async def get_products_batch(request: Request):
+    return _respond(storefront.batch_products(await _catalog(), await _json_body(request)))
+
+
+@router.get('/api/products/availability/{product_id}/{store_id}')
+async def check_product_availability(product_id: str, store_id: str):
+    return _respond(await _reads.do(('availability', product_id, store_id),
+                                    lambda: _run_db(storefront.product_availability, product_id, store_id)))
+
+
+@router.get('/api/products/{product_id}')
+async def get_product_detail(product_id: str, request: Request):
+    """Async GET /api/products/<id>, sharing the snapshot's cached bodies and ETags with Flask."""
+    detail = (await _catalog()).product_detail(product_id, flask_app.json.dumps)
+    if detail is None:
+        return JSONResponse({"error": "Product not found"}, 404)
+    etag, body = detail
+    headers = {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache'}
+    if_none_match = request.headers.get('if-none-match', '')
+    if if_none_match.strip() == '*' or f'"{etag}"' in [t.strip().removeprefix('W/') for t in if_none_match.split(',')]:
+        return Response(status_code=304, headers=headers)
+    return Response(body, headers=headers, media_type=flask_app.json.mimetype)
+
+
+# --- Shopping cart ---
+
+@router.get('/api/cart/{customer_id}')
+async def get_cart(customer_id: str, request: Request):
+    return _respond(await _run_db(storefront.get_cart, customer_id, request.headers.get('if-none-match')))
+
+
+@router.post('/api/cart/modify/{customer_id}')
+async def modify_cart(customer_id: str, request: Request):
+    data = await _json_body(request)
+    if data is None:
+        return _bad_json(request)
+    return _respond(await _run_db(storefront.modify_cart, customer_id, data))
+
+
+@router.post('/api/cart/{customer_id}/item')
+async def add_or_update_cart_item(customer_id: str, request: Request):
+    data = await _json_body(request)
+    if data is None:
+        return _bad_json(request)
+    return _respond(await _run_db(storefront.set_cart_item, customer_id, data))
+
+
+@router.delete('/api/cart/{customer_id}/item/{product_id}')
+async def remove_cart_item_completely(customer_id: str, product_id: str):
+    return _respond(await _run_db(storefront.remove_cart_item, customer_id, product_id))
+
+
+@router.delete('/api/cart/{customer_id}/clear')
+async def clear_customer_cart(customer_id: str):
+    return _respond(await _run_db(storefront.clear_cart, customer_id))
+
+
+# --- Checkout ---
+
+@router.post('/api/checkout/place_order')
+async def place_order(request: Request):
+    data = await _json_body(request)
+    if data is None:
+        return _bad_json(request)
+    return _respond(await _run_db(storefront.place_order, data, on_stock_change=catalog_cache.invalidate))
+
+
+@router.post('/api/orders/place_order')
+async def conceptual_place_order(request: Request):
+    data = await _json_body(request)
+    if data is None:
+        return _bad_json(request)
+    return _respond(storefront.conceptual_order(data))
+
+
+@router.get('/api/stats/db-pool')
+async def get_db_pool_stats():
+    return JSONResponse(db_pool.stats())
+
+
+@router.get('/api/stats/single-flight')
+async def get_single_flight_stats():
+    return JSONResponse(_reads.stats())
+
+
+# --- Pages ---
+
+_PAGE_ENDPOINTS = {'index': '/', 'agent_widget': '/agent-widget'}
+
+
+def _url_for(endpoint, **values):
+    """The subset of Flask's url_for() the storefront templates use."""
+    if endpoint == 'static':
+        return f"{flask_app.static_url_path}/{values['filename']}"
+    if endpoint == 'product_detail_page':
+        return f"/products/{values['product_id']}"
+    return _PAGE_ENDPOINTS[endpoint]
+
+
+_templates = jinja2.Environment(
+    loader=jinja2.FileSystemLoader(os.path.join(flask_app.root_path, flask_app.template_folder)),
+    autoescape=jinja2.select_autoescape(['html']),
+)
+_templates.globals['url_for'] = _url_for
+
+
+def _render(template_name, status_code=200, **context):
+    return HTMLResponse(_templates.get_template(template_name).render(**context), status_code=status_code)
+
+
+@router.get('/')
+async def index():
+    return _render('index.html')
+
+
+@router.get('/agent-widget')
+async def agent_widget():
+    return _render('agent_widget.html')
+
+
+@router.get('/products/{product_id}')
+async def product_detail_page(product_id: str):
+    product_data = storefront.product_page_context(await _catalog(), product_id)
+    if product_data is None:
+        return _render('404.html', 404, error_message=f"Product with ID {product_id} not found.")
+    return _render('product_detail.html', product=product_data)
+
+
+def mount_storefront(app: FastAPI):
+    """Serves the storefront API, pages and static files from `app`.
+
+    Call after the app's own routes are registered: the Flask app is mounted at
+    "/" as a catch-all for the routes that only exist there.
+    """
+    app.include_router(router)
+    app.mount(flask_app.static_url_path, StaticFiles(directory=flask_app.static_folder), name="static")
+    app.mount("/", WSGIMiddleware(flask_app))
+    logger.info("Storefront API and pages mounted on the ASGI app.")
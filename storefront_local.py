@@ -0,0 +1,118 @@
+# cymbal_home_garden_backend/storefront_local.py
+
+import re
+import logging
+
+from werkzeug.datastructures import MultiDict
+
+import storefront
+from app import catalog_cache, db_pool, fts_search_ids, reads
+from db_pool import PoolTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# In-process entry point to the storefront API for callers in the same process
+# as the backend (the agent tools' "inprocess" transport):
+#
+#     result = storefront_local.call('GET', '/api/cart/cust_1')
+#     result.payload, result.status   # same dict shapes as the HTTP API
+#
+# Requests are routed straight to the storefront.py service functions with a
+# pooled connection and the current catalog snapshot; nothing is serialized.
+# Payloads may be shared with the catalog snapshot, so callers must treat them
+# as read-only. call() returns None for routes that only exist in the Flask app
+# (image identification, Retail API search); send those over HTTP.
+
+
+def _products(snapshot, params, body, headers):
+    return storefront.list_products(snapshot, params, _search_ids)
+
+
+def _product_detail(snapshot, params, body, headers, product_id):
+    products, _ = snapshot.product_details([product_id])
+    if not products:
+        return storefront.ServiceResult({"error": "Product not found"}, 404)
+    return storefront.ServiceResult(products[0])
+
+
+def _with_conn(service_fn, *args, **kwargs):
+    with db_pool.connection() as conn:
+        return service_fn(conn, *args, **kwargs)
+
+
+# Reads coalesce with identical ones in flight, including those from Flask requests.
+def _search_ids(text):
+    return reads.do(('fts', text), lambda: _with_conn(fts_search_ids, text))
+
+
+def _availability(snapshot, params, body, headers, product_id, store_id):
+    return reads.do(('availability', product_id, store_id),
+                    lambda: _with_conn(storefront.product_availability, product_id, store_id))
+
+
+# The order endpoints reject a missing body themselves rather than in the service function.
+_BAD_JSON = storefront.ServiceResult(
+    {"error": "Bad Request", "message": "Invalid JSON payload or missing Content-Type: application/json."}, 400)
+
+
+def _place_order(snapshot, params, body, headers):
+    if body is None:
+        return _BAD_JSON
+    return _with_conn(storefront.place_order, body, on_stock_change=catalog_cache.invalidate)
+
+
+def _conceptual_order(snapshot, params, body, headers):
+    if body is None:
+        return _BAD_JSON
+    return storefront.conceptual_order(body)
+
+
+# (method, path pattern, handler(snapshot, params, body, headers, *path_args)); first match wins.
+_ROUTES = [
+    ('GET', r'/api/products', _products),
+    ('POST', r'/api/products/batch', lambda snapshot, params, body, headers: storefront.batch_products(snapshot, body)),
+    ('GET', r'/api/products/availability/([^/]+)/([^/]+)', _availability),
+    ('GET', r'/api/products/([^/]+)', _product_detail),
+    ('GET', r'/api/cart/([^/]+)',
+     lambda snapshot, params, body, headers, cid: _with_conn(storefront.get_cart, cid, headers.get('If-None-Match'))),
+    ('POST', r'/api/cart/modify/([^/]+)', lambda snapshot, params, body, headers, cid: _with_conn(storefront.modify_cart, cid, body)),
+    ('POST', r'/api/cart/([^/]+)/item', lambda snapshot, params, body, headers, cid: _with_conn(storefront.set_cart_item, cid, body)),
+    ('DELETE', r'/api/cart/([^/]+)/item/([^/]+)',
+     lambda snapshot, params, body, headers, cid, pid: _with_conn(storefront.remove_cart_item, cid, pid)),
+    ('DELETE', r'/api/cart/([^/]+)/clear', lambda snapshot, params, body, headers, cid: _with_conn(storefront.clear_cart, cid)),
+    ('POST', r'/api/checkout/place_order', _place_order),
+    ('POST', r'/api/orders/place_order', _conceptual_order),
+]
+_ROUTES = [(method, re.compile(pattern + r'/?'), handler) for method, pattern, handler in _ROUTES]
+
+
+def handles(method, path):
+    """True if call() serves this route in process."""
+    return any(m == method and pattern.fullmatch(path) for m, pattern, _ in _ROUTES)
+
+
+def call(method, path, params=None, body=None, headers=None):
+    """Runs one storefront API request in process.
+
+    Args:
+        method: HTTP method, e.g. 'GET'.
+        path: Request path including the /api prefix, e.g. '/api/cart/cust_1'.
+        params: Query parameters (dict or list of pairs), for GET /api/products.
+        body: The already-decoded JSON body for POST routes.
+        headers: Request headers (a case-insensitive mapping), e.g. If-None-Match for GET /api/cart.
+
+    Returns:
+        A storefront.ServiceResult, or None if the route is not served in process.
+        An exhausted connection pool is reported as a 503, as over HTTP.
+    """
+    for route_method, pattern, handler in _ROUTES:
+        match = pattern.fullmatch(path) if route_method == method else None
+        if match is None:
+            continue
+        try:
+            return handler(catalog_cache.get(), MultiDict(params or {}), body, headers or {}, *match.groups())
+        except PoolTimeoutError as e:
+            logger.error(f"Database connection pool exhausted: {e} Stats: {db_pool.stats()}")
+            return storefront.ServiceResult(
+                {"error": "Service Unavailable", "message": "The database is busy, please retry."}, 503)
+    return None